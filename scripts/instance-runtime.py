@@ -24,12 +24,15 @@ from ec2_gha.log_constants import (
     LOG_STREAM_JOB_STARTED,
     LOG_STREAM_JOB_COMPLETED,
     LOG_STREAM_TERMINATION,
+    LOG_STREAM_SPOT_INTERRUPTION,
+    LOG_STREAM_BOOT_PROFILE,
     LOG_PREFIX_JOB_STARTED,
     LOG_PREFIX_JOB_COMPLETED,
     LOG_MSG_TERMINATION_PROCEEDING,
     LOG_MSG_RUNNER_REMOVED,
     DEFAULT_CLOUDWATCH_LOG_GROUP,
 )
+from ec2_gha.stats import percentile
 
 err = partial(print, file=sys.stderr)
 
@@ -117,7 +120,45 @@ def extract_timestamp_from_log(message: str) -> datetime | None:
     return None
 
 
-def analyze_instance(instance_id: str, log_group: str = None) -> dict:
+def summary_phase(name: str) -> str:
+    """Boot phase name for summaries (per-runner ``runner-config-N`` phases are combined)."""
+    return re.sub(r'-\d+$', '', name)
+
+
+def current_boot_phases(phases: list[dict]) -> list[dict]:
+    """Phases of an instance's latest boot (a resumed warm-pool instance logs one ``boot`` phase per boot)."""
+    boots = [i for i, phase in enumerate(phases) if phase["phase"] == "boot"]
+    return phases[boots[-1]:] if boots else phases
+
+
+def boot_phase_durations(phases: list[dict]) -> dict[str, float]:
+    """Duration of each phase of an instance's latest boot (the slowest runner, for per-runner phases)."""
+    durations = {}
+    for phase in current_boot_phases(phases):
+        name = summary_phase(phase["phase"])
+        durations[name] = max(durations.get(name, 0), phase.get("duration", 0))
+    return durations
+
+
+def get_instance_info(instance_id: str, region: str = "us-east-1") -> dict:
+    """Get an instance's type, AZ, lifecycle and tags from EC2 (empty if no longer visible)."""
+    cmd = [
+        "aws", "ec2", "describe-instances",
+        "--instance-ids", instance_id,
+        "--region", region,
+        "--query", "Reservations[0].Instances[0].{InstanceType: InstanceType, AvailabilityZone: Placement.AvailabilityZone, Lifecycle: InstanceLifecycle, Tags: Tags}",
+        "--output", "json"
+    ]
+    output = run_command(cmd)
+    if output:
+        try:
+            return json.loads(output) or {}
+        except json.JSONDecodeError:
+            return {}
+    return {}
+
+
+def analyze_instance(instance_id: str, log_group: str = None, region: str = "us-east-1") -> dict:
     if log_group is None:
         log_group = DEFAULT_CLOUDWATCH_LOG_GROUP
     """Analyze runtime and job execution for an instance."""
@@ -130,9 +171,23 @@ def analyze_instance(instance_id: str, log_group: str = None) -> dict:
         "jobs": [],
         "state": "unknown",
         "instance_type": "unknown",
+        "market": "on-demand",
+        "availability_zone": None,
         "tags": {}
     }
 
+    # The `Market` tag (set by ec2-gha when `spot` is enabled) records the market the instance launched on
+    info = get_instance_info(instance_id, region)
+    if info:
+        result["tags"].update({tag["Key"]: tag["Value"] for tag in info.get("Tags") or []})
+        if info.get("InstanceType"):
+            result["instance_type"] = info["InstanceType"]
+        result["availability_zone"] = info.get("AvailabilityZone")
+        if result["tags"].get("Market") in ("spot", "on-demand"):
+            result["market"] = result["tags"]["Market"]
+        elif info.get("Lifecycle") == "spot":
+            result["market"] = "spot"
+
 
     # Get CloudWatch logs
     log_streams = get_log_streams(instance_id, log_group)
@@ -213,6 +268,28 @@ def analyze_instance(instance_id: str, log_group: str = None) -> dict:
                     if ts and not result["termination_time"]:
                         result["termination_time"] = ts
 
+    # Spot interruption notices / rebalance recommendations (JSON lines)
+    for stream in log_streams:
+        if f"/{LOG_STREAM_SPOT_INTERRUPTION}" in stream["logStreamName"]:
+            for event in get_log_events(log_group, stream["logStreamName"], start_from_head=True):
+                try:
+                    interruption = json.loads(event.get("message", ""))
+                except json.JSONDecodeError:
+                    continue
+                if interruption.get("event") in ("instance-action", "rebalance-recommendation"):
+                    result.setdefault("interruptions", []).append(interruption)
+
+    # Boot phase timings (JSON lines, with start/end in seconds since boot)
+    for stream in log_streams:
+        if f"/{LOG_STREAM_BOOT_PROFILE}" in stream["logStreamName"]:
+            for event in get_log_events(log_group, stream["logStreamName"], start_from_head=True):
+                try:
+                    phase = json.loads(event.get("message", ""))
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(phase, dict) and "phase" in phase:
+                    result.setdefault("boot_phases", []).append(phase)
+
     # Determine state based on termination time
     if result["termination_time"]:
         result["state"] = "terminated"
@@ -421,6 +498,47 @@ def get_instance_price(instance_type: str, region: str = "us-east-1") -> float:
     return 0
 
 
+def get_spot_price(
+    instance_type: str,
+    region: str = "us-east-1",
+    availability_zone: str | None = None,
+    start_time: datetime | None = None,
+) -> float:
+    """Get the average spot price for an instance type since ``start_time`` (in one AZ, if known)."""
+    cache_key = f"spot:{instance_type}:{region}:{availability_zone}:{start_time}"
+    if cache_key in _price_cache:
+        return _price_cache[cache_key]
+
+    cmd = [
+        "aws", "ec2", "describe-spot-price-history",
+        "--instance-types", instance_type,
+        "--product-descriptions", "Linux/UNIX",
+        "--region", region,
+        "--query", "SpotPriceHistory[].SpotPrice",
+        "--output", "json"
+    ]
+    if availability_zone:
+        cmd += ["--availability-zone", availability_zone]
+    if start_time:
+        cmd += ["--start-time", start_time.isoformat()]
+    else:
+        cmd += ["--max-items", "10"]
+
+    price = 0
+    output = run_command(cmd)
+    if output:
+        try:
+            prices = [float(p) for p in json.loads(output)]
+            if prices:
+                price = sum(prices) / len(prices)
+                err(f"Got spot price for {instance_type} in {availability_zone or region}: ${price:.4f}/hour")
+        except (json.JSONDecodeError, TypeError, ValueError):
+            pass
+
+    _price_cache[cache_key] = price
+    return price
+
+
 def get_region_name(region_code: str) -> str:
     """Convert region code to region name for pricing API.
 
@@ -467,9 +585,15 @@ def calculate_cost(
     instance_type: str,
     runtime_seconds: int,
     region: str = "us-east-1",
+    market: str = "on-demand",
+    availability_zone: str | None = None,
+    launch_time: datetime | None = None,
 ) -> float:
-    """Calculate cost based on instance type and runtime."""
-    hourly_cost = get_instance_price(instance_type, region)
+    """Calculate cost based on instance type, market (spot or on-demand) and runtime."""
+    if market == "spot":
+        hourly_cost = get_spot_price(instance_type, region, availability_zone, launch_time)
+    else:
+        hourly_cost = get_instance_price(instance_type, region)
     if hourly_cost == 0:
         return 0
 
@@ -506,7 +630,7 @@ Examples:
     parser.add_argument(
         "--region",
         default="us-east-1",
-        help="AWS region for pricing (default: us-east-1)"
+        help="AWS region for instance lookups and pricing (default: us-east-1)"
     )
 
     parser.add_argument(
@@ -559,7 +683,7 @@ Examples:
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Submit all tasks
         future_to_instance = {
-            executor.submit(analyze_instance, instance_id, args.log_group): instance_id
+            executor.submit(analyze_instance, instance_id, args.log_group, args.region): instance_id
             for instance_id in instance_ids
         }
 
@@ -570,7 +694,14 @@ Examples:
                 result = future.result(timeout=30)  # 30 second timeout per instance
 
                 # Calculate cost
-                cost = calculate_cost(result["instance_type"], result["total_runtime_seconds"], args.region)
+                cost = calculate_cost(
+                    result["instance_type"],
+                    result["total_runtime_seconds"],
+                    args.region,
+                    market=result["market"],
+                    availability_zone=result["availability_zone"],
+                    launch_time=result["launch_time"],
+                )
                 result["estimated_cost"] = cost
 
                 # Add to results
@@ -589,6 +720,7 @@ Examples:
                     "job_runtime_seconds": 0,
                     "estimated_cost": 0,
                     "instance_type": "unknown",
+                    "market": "on-demand",
                     "state": "error",
                     "launch_time": None,
                     "termination_time": None,
@@ -599,6 +731,20 @@ Examples:
     # Sort results by instance ID for consistent output
     results.sort(key=lambda x: x.get("instance_id", ""))
 
+    # Boot phase p50/p95 across instances (in order of first appearance)
+    phase_durations = {}
+    for result in results:
+        for name, duration in boot_phase_durations(result.get("boot_phases", [])).items():
+            phase_durations.setdefault(name, []).append(duration)
+    boot_phase_summary = {
+        name: {
+            "count": len(durations),
+            "p50_seconds": round(percentile(durations, 50), 2),
+            "p95_seconds": round(percentile(durations, 95), 2),
+        }
+        for name, durations in phase_durations.items()
+    }
+
     if args.json:
         # JSON output
         output = {
@@ -608,7 +754,8 @@ Examples:
                 "total_runtime_seconds": total_runtime,
                 "total_job_runtime_seconds": total_job_runtime,
                 "total_idle_seconds": total_runtime - total_job_runtime,
-                "estimated_total_cost": round(total_cost, 4)
+                "estimated_total_cost": round(total_cost, 4),
+                "boot_phases": boot_phase_summary,
             }
         }
         print(json.dumps(output, indent=2, default=str))
@@ -618,6 +765,7 @@ Examples:
         for result in results:
             print(f"\nInstance: {result['instance_id']}")
             print(f"  Type: {result['instance_type']}")
+            print(f"  Market: {result.get('market', 'on-demand')}")
             print(f"  State: {result['state']}")
 
             if result.get("tags", {}).get("Name"):
@@ -645,6 +793,16 @@ Examples:
             if result.get("estimated_cost", 0) > 0:
                 print(f"  Estimated Cost: ${result['estimated_cost']:.4f}")
 
+            for interruption in result.get("interruptions", []):
+                busy = interruption.get("busy_runners") or []
+                print(f"  Spot {interruption['event']} at {interruption.get('time')} ({len(busy)} runner(s) busy)")
+
+            if result.get("boot_phases"):
+                print("  Boot Phases:")
+                for phase in result["boot_phases"]:
+                    status = f" ({phase['status']})" if phase.get("status", "ok") != "ok" else ""
+                    print(f"    - {phase['phase']}: {phase.get('start', 0):.1f}s → {phase.get('end', 0):.1f}s, {phase.get('duration', 0):.1f}s{status}")
+
             if result["jobs"]:
                 print(f"  Jobs ({len(result['jobs'])}):")
                 for job in result["jobs"]:
@@ -664,6 +822,11 @@ Examples:
         if total_cost > 0:
             print(f"  Estimated Total Cost: ${total_cost:.4f} (from AWS Pricing API)")
 
+        if boot_phase_summary:
+            print("  Boot Phases (p50 / p95 across instances):")
+            for name, stats in boot_phase_summary.items():
+                print(f"    - {name}: {stats['p50_seconds']:.1f}s / {stats['p95_seconds']:.1f}s (n={stats['count']})")
+
 
 if __name__ == "__main__":
     main()
@@ -1,18 +1,19 @@
-from ec2_gha.start import StartAWS
+from ec2_gha import profiling
 from ec2_gha.defaults import (
     EC2_INSTANCE_TYPE,
     INSTANCE_COUNT,
     INSTANCE_NAME,
     MAX_INSTANCE_LIFETIME,
+    MIN_READY,
+    PIPELINE,
     RUNNER_GRACE_PERIOD,
     RUNNER_INITIAL_GRACE_PERIOD,
     RUNNER_POLL_INTERVAL,
     RUNNER_REGISTRATION_TIMEOUT,
 )
-from gha_runner.gh import GitHubInstance
-from gha_runner.clouddeployment import DeployInstance
 from gha_runner.helper.input import EnvVarBuilder, check_required
 from os import environ
+import sys
 
 
 def main():
@@ -23,6 +24,10 @@ def main():
     # Timeout for waiting for runner to register with GitHub
     timeout_str = environ.get("INPUT_RUNNER_REGISTRATION_TIMEOUT", "").strip()
     timeout = int(timeout_str) if timeout_str else int(RUNNER_REGISTRATION_TIMEOUT)
+    min_ready = environ.get("INPUT_MIN_READY", "").strip() or MIN_READY
+    pipeline = environ.get("INPUT_PIPELINE", "").strip() or PIPELINE
+    if pipeline not in ("sequential", "async"):
+        raise ValueError(f"Invalid pipeline '{pipeline}', expected 'sequential' or 'async'")
 
     token = environ["GH_PAT"]
     # Make a copy of environment variables for immutability
@@ -30,26 +35,44 @@ def main():
 
     builder = (
         EnvVarBuilder(env)
+        .update_state("INPUT_AMI_CACHE_DIR", "ami_cache_dir")
+        .update_state("INPUT_AMI_CACHE_TTL", "ami_cache_ttl")
         .update_state("INPUT_AWS_SUBNET_ID", "subnet_id")
+        .update_state("INPUT_AWS_SUBNET_IDS", "subnet_ids")
         .update_state("INPUT_AWS_TAGS", "tags", is_json=True)
         .update_state("INPUT_CLOUDWATCH_LOGS_GROUP", "cloudwatch_logs_group")
+        .update_state("INPUT_CLOUDWATCH_LOGS_REQUIRED", "cloudwatch_logs_required")
         .update_state("INPUT_DEBUG", "debug")
         .update_state("INPUT_EC2_HOME_DIR", "home_dir")
         .update_state("INPUT_EC2_IMAGE_ID", "image_id")
         .update_state("INPUT_EC2_INSTANCE_PROFILE", "iam_instance_profile")
         .update_state("INPUT_EC2_INSTANCE_TYPE", "instance_type")
+        .update_state("INPUT_EC2_INSTANCE_TYPES", "instance_types")
         .update_state("INPUT_EC2_KEY_NAME", "key_name")
         .update_state("INPUT_EC2_ROOT_DEVICE_SIZE", "root_device_size", type_hint=str)
         .update_state("INPUT_EC2_SECURITY_GROUP_ID", "security_group_id")
         .update_state("INPUT_EC2_USERDATA", "userdata")
+        .update_state("INPUT_USERDATA_MODE", "userdata_mode")
+        .update_state("INPUT_WARM_POOL", "warm_pool")
+        .update_state("INPUT_WARM_POOL_MAX_AGE", "warm_pool_max_age")
+        .update_state("INPUT_WARM_POOL_SIZE", "warm_pool_size")
         .update_state("INPUT_EXTRA_GH_LABELS", "labels")
+        .update_state("INPUT_FLEET_ALLOCATION_STRATEGY", "fleet_allocation_strategy")
         .update_state("INPUT_INSTANCE_COUNT", "instance_count", type_hint=int)
         .update_state("INPUT_INSTANCE_NAME", "instance_name")
+        .update_state("INPUT_JIT_CONFIG", "jit_config")
+        .update_state("INPUT_LAUNCH_CONCURRENCY", "launch_concurrency", type_hint=int)
+        .update_state("INPUT_LAUNCH_TEMPLATE", "launch_template")
         .update_state("INPUT_MAX_INSTANCE_LIFETIME", "max_instance_lifetime")
         .update_state("INPUT_RUNNER_GRACE_PERIOD", "runner_grace_period")
         .update_state("INPUT_RUNNER_INITIAL_GRACE_PERIOD", "runner_initial_grace_period")
+        .update_state("INPUT_RUNNER_MIRROR", "runner_mirror")
         .update_state("INPUT_RUNNER_POLL_INTERVAL", "runner_poll_interval")
         .update_state("INPUT_RUNNERS_PER_INSTANCE", "runners_per_instance", type_hint=int)
+        .update_state("INPUT_SPOT", "spot")
+        .update_state("INPUT_SPOT_FALLBACK", "spot_fallback")
+        .update_state("INPUT_SPOT_MAX_PRICE", "spot_max_price")
+        .update_state("INPUT_SPOT_TIMEOUT", "spot_timeout")
         .update_state("INPUT_SSH_PUBKEY", "ssh_pubkey")
         .update_state("AWS_REGION", "region_name")        # default
         .update_state("INPUT_AWS_REGION", "region_name")  # input override
@@ -80,35 +103,55 @@ def main():
     if not params.get("image_id"):
         raise Exception("EC2 AMI ID (ec2_image_id) must be provided via input or vars.EC2_IMAGE_ID")
     # home_dir will be set to AUTO in start.py if not provided
+    profiling.mark("inputs validated")
 
-    gh = GitHubInstance(token=token, repo=repo)
+    # Import the heavy modules (boto3, botocore, requests) only once the inputs are known to be valid
+    from ec2_gha.start import StartAWS
+    from ec2_gha.gh import PooledGitHubInstance
+    from ec2_gha.pipeline import AsyncDeployInstance, PrefetchDeployInstance
+    profiling.mark("imported ec2_gha.start, gha_runner")
+
+    gh = PooledGitHubInstance(token=token, repo=repo)
 
     # Pass runners_per_instance to StartAWS
     params["runners_per_instance"] = runners_per_instance
 
-    # Generate all the tokens we need upfront
-    # Each instance needs runners_per_instance tokens
-    total_runners = instance_count * runners_per_instance
-    if runners_per_instance > 1:
-        # Generate all tokens upfront
-        all_tokens = gh.create_runner_tokens(total_runners)
-        # Group tokens by instance (each instance gets runners_per_instance tokens)
-        grouped_tokens = []
-        for i in range(0, total_runners, runners_per_instance):
-            grouped_tokens.append(all_tokens[i:i+runners_per_instance])
-        params["grouped_runner_tokens"] = grouped_tokens
+    if pipeline == "async":
+        # Each instance creates its own runner tokens, launches, and waits independently
+        deployment = AsyncDeployInstance(
+            provider_type=StartAWS,
+            cloud_params=params,
+            gh=gh,
+            count=instance_count,
+            timeout=timeout,
+            min_ready=min_ready,
+        )
+        deployment.start_runner_instances()
+        profiling.mark("runners registered")
+        return
 
-    # This will create a new instance of StartAWS and configure it correctly
-    deployment = DeployInstance(
+    # This will create a new instance of StartAWS and configure it correctly. Each instance's
+    # runners_per_instance tokens are created concurrently, and each instance is launched as
+    # soon as its tokens are available
+    deployment = PrefetchDeployInstance(
         provider_type=StartAWS,
         cloud_params=params,
         gh=gh,
         count=instance_count,
         timeout=timeout,
+        min_ready=min_ready,
     )
+    profiling.mark("runner release resolved")
     # This will output the instance ids for using workflow syntax
     deployment.start_runner_instances()
+    profiling.mark("runners registered")
 
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["bake"]:
+        from ec2_gha.bake import main as bake
+        bake(sys.argv[2:])
+        sys.exit()
+    if "--profile-startup" in sys.argv[1:]:
+        environ["EC2_GHA_PROFILE_STARTUP"] = "1"
     main()
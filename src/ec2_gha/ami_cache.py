@@ -0,0 +1,134 @@
+"""Cache of AMI metadata used for root-disk sizing.
+
+An AMI's root device name and block-device mappings never change, so they are
+fetched at most once per run (in memory) and, optionally, persisted on disk with
+a TTL so that subsequent workflow runs can skip the ``describe_images`` calls
+entirely.
+"""
+
+import json
+import os
+import time
+from copy import deepcopy
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+
+class AmiMetadataCache:
+    """In-memory (and optionally on-disk) cache of ``describe_images`` results.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory for persistent cache entries. Empty disables the on-disk cache.
+    ttl : int
+        Maximum age in seconds of on-disk entries.
+
+    """
+
+    def __init__(self, cache_dir: str = "", ttl: int = 86400):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.ttl = ttl
+        self._images: dict[tuple[str, str], dict] = {}
+        self._permitted: set[str] = set()
+
+    def _path(self, region: str, name: str) -> Path:
+        return self.cache_dir / region / name
+
+    def _read(self, path: Path) -> dict | None:
+        """Read a JSON entry from disk, ignoring missing, corrupt or expired files."""
+        try:
+            with path.open() as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("fetched_at", 0) > self.ttl:
+            return None
+        return entry
+
+    def _write(self, path: Path, entry: dict):
+        """Atomically write a JSON entry to disk; failures are non-fatal."""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp.open("w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Warning: could not write AMI cache entry {path}: {e}")
+
+    def _check_permission(self, client, region: str, image_id: str) -> bool:
+        """Probe ``describe_images`` permissions with a DryRun call (once per region).
+
+        The result is only kept in memory: the cache directory may be shared by runs using
+        different AWS credentials, and a permission granted to one says nothing about another.
+
+        Returns
+        -------
+        bool
+            Whether the probe confirmed access (a ``DryRunOperation`` error).
+
+        Raises
+        ------
+        botocore.exceptions.ClientError
+            If the caller is not allowed to describe images.
+        """
+        if region in self._permitted:
+            return True
+        try:
+            client.describe_images(ImageIds=[image_id], DryRun=True)
+        except ClientError as e:
+            # This is the case where we DO have access
+            if "DryRunOperation" not in str(e):
+                raise e
+        else:
+            # A DryRun call should never succeed; don't trust (or cache) this result
+            return False
+        self._permitted.add(region)
+        return True
+
+    def describe_image(self, client, region: str, image_id: str) -> dict | None:
+        """Return the root device name and block-device mappings of an AMI.
+
+        Parameters
+        ----------
+        client
+            The EC2 client object.
+        region : str
+            The region the AMI lives in.
+        image_id : str
+            The AMI ID.
+
+        Returns
+        -------
+        dict | None
+            A copy of the cached ``RootDeviceName``/``BlockDeviceMappings`` (and ``Architecture``)
+            entry, or None if the permission probe was inconclusive.
+
+        Raises
+        ------
+        botocore.exceptions.ClientError
+           If the user does not have permissions to describe images.
+        """
+        key = (region, image_id)
+        if key not in self._images:
+            entry = self._read(self._path(region, f"{image_id}.json")) if self.cache_dir else None
+            if entry:
+                print(f"Using cached metadata for {image_id} ({region})")
+                image = entry["image"]
+            else:
+                if not self._check_permission(client, region, image_id):
+                    return None
+                image_options = client.describe_images(ImageIds=[image_id])
+                full = image_options["Images"][0]
+                image = {
+                    "RootDeviceName": full["RootDeviceName"],
+                    "BlockDeviceMappings": full["BlockDeviceMappings"],
+                }
+                if "Architecture" in full:
+                    image["Architecture"] = full["Architecture"]
+                if self.cache_dir:
+                    self._write(self._path(region, f"{image_id}.json"), {"fetched_at": time.time(), "image": image})
+            self._images[key] = image
+        return deepcopy(self._images[key])
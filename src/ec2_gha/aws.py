@@ -0,0 +1,66 @@
+"""Shared AWS clients.
+
+Creating a boto3 client resolves credentials, loads the endpoint and service
+models and opens a new connection pool, which costs hundreds of milliseconds.
+Clients are thread-safe once created, so a single client per (service, region)
+is cached for the lifetime of the process and shared by every ``StartAWS``
+method (and the concurrent launch threads).
+
+Set ``EC2_GHA_CLIENT_CACHE=0`` to create a fresh client on every call (e.g. to
+benchmark the difference).
+"""
+
+from os import environ
+from threading import Lock
+
+import boto3
+from botocore.config import Config
+
+from ec2_gha.defaults import LAUNCH_CONCURRENCY
+
+# Adaptive retries back off (client-side) on throttling, which parallel launches can trigger;
+# the pool is sized so that concurrent launches and polls don't wait for connections
+CLIENT_CONFIG = Config(
+    retries={"mode": "adaptive", "max_attempts": 10},
+    max_pool_connections=max(2 * LAUNCH_CONCURRENCY, 10),
+    tcp_keepalive=True,
+)
+
+_clients = {}
+_lock = Lock()
+
+
+def client_cache_enabled() -> bool:
+    """Whether clients are cached (disabled by ``EC2_GHA_CLIENT_CACHE=0``)."""
+    return environ.get("EC2_GHA_CLIENT_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def get_client(service: str, region_name: str):
+    """Return the shared boto3 client for ``service`` in ``region_name``.
+
+    Parameters
+    ----------
+    service : str
+        The AWS service name (e.g. "ec2").
+    region_name : str
+        The AWS region.
+
+    Returns
+    -------
+    botocore.client.BaseClient
+        A client configured with ``CLIENT_CONFIG``.
+    """
+    if not client_cache_enabled():
+        return boto3.client(service, region_name=region_name, config=CLIENT_CONFIG)
+    key = (service, region_name)
+    # Client creation (unlike client use) is not thread-safe
+    with _lock:
+        if key not in _clients:
+            _clients[key] = boto3.client(service, region_name=region_name, config=CLIENT_CONFIG)
+        return _clients[key]
+
+
+def clear_clients():
+    """Drop all cached clients (e.g. after credentials change)."""
+    with _lock:
+        _clients.clear()
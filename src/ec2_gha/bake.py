@@ -0,0 +1,196 @@
+"""Bake runner AMIs with the boot-time provisioning already done.
+
+``python -m ec2_gha bake`` launches a builder instance from a base AMI, with
+UserData that runs ``runner-setup.sh`` in bake mode: it downloads the runner
+tarball (to ``/opt/ec2-gha/runner.tar.gz``), installs the runner's
+dependencies and the CloudWatch agent, writes ``/opt/ec2-gha/manifest.json``
+listing the phases it completed, and stops the instance. An AMI is then
+created from the stopped builder, which is terminated.
+
+Instances launched from the baked AMI (via ``ec2_image_id``) find the manifest
+and skip every phase it lists (the runner download only if the launch's runner
+release matches the baked one), leaving just the runner registration.
+"""
+
+import argparse
+import base64
+import time
+from os import environ
+
+from ec2_gha.defaults import EC2_INSTANCE_TYPE
+
+# Console output lines written by runner-setup.sh in bake mode
+BAKE_COMPLETE = "EC2-GHA-BAKE: complete"
+BAKE_FAILED = "EC2-GHA-BAKE: failed"
+# How long to wait for the completion line to show up in the (lagging) console output, in seconds
+CONSOLE_TIMEOUT = 120
+CONSOLE_POLL_INTERVAL = 10
+
+
+def console_output(ec2, instance_id: str) -> str:
+    """The instance's (latest) console output, decoded ("" if unavailable)."""
+    try:
+        output = ec2.get_console_output(InstanceId=instance_id, Latest=True).get("Output", "")
+    except Exception as e:
+        print(f"Could not read console output of {instance_id}: {e}")
+        return ""
+    try:
+        return base64.b64decode(output, validate=True).decode(errors="replace")
+    except ValueError:
+        # Some SDK versions return it already decoded
+        return output
+
+
+def bake(aws, name: str, timeout: float = 1800, force: bool = False) -> str:
+    """Bake an AMI from ``aws.image_id`` (see module docstring).
+
+    Parameters
+    ----------
+    aws : ec2_gha.start.StartAWS
+        Builder configuration (base AMI, instance type, region, subnet, security group, ...);
+        ``runner_release`` is the runner release to bake.
+    name : str
+        Name of the AMI (and the builder's ``Name`` tag).
+    timeout : float
+        Maximum seconds for the builder to provision and stop. Defaults to 1800.
+    force : bool
+        Create the AMI even if the builder's console never shows bake completion. Defaults to False.
+
+    Returns
+    -------
+    str
+        The ID of the new AMI.
+
+    Raises
+    ------
+    RuntimeError
+        If provisioning failed (as reported on the builder's console), or (without ``force``)
+        its completion never showed up on the console.
+    botocore.exceptions.WaiterError
+        If the builder doesn't stop, or the AMI doesn't become available, in time.
+    """
+    ec2, plan = aws.prepare_launch(1)
+    user_data_params = dict(plan.user_data_params) | {
+        "bake": "true",
+        "instance_name": name,
+        "runner_tokens": "",
+        "runner_labels": "",
+    }
+    params = aws._build_aws_params(user_data_params, shared_tags=list(plan.shared_tags))
+    # The builder stops when it's done, so the AMI is created from a cleanly shut down disk
+    params["InstanceInitiatedShutdownBehavior"] = "stop"
+    if plan.block_device_mappings:
+        params["BlockDeviceMappings"] = list(plan.block_device_mappings)
+    aws._check_user_data_size(params["UserData"])
+
+    instance_id = ec2.run_instances(**params)["Instances"][0]["InstanceId"]
+    print(f"Launched builder {instance_id} from {aws.image_id}")
+    try:
+        start = time.monotonic()
+        delay = 15
+        ec2.get_waiter("instance_stopped").wait(
+            InstanceIds=[instance_id],
+            WaiterConfig={"Delay": delay, "MaxAttempts": max(1, int(timeout // delay))},
+        )
+        print(f"Builder {instance_id} provisioned and stopped in {time.monotonic() - start:.0f}s")
+
+        # Console output lags behind the instance, so poll it for a while
+        console_deadline = time.monotonic() + CONSOLE_TIMEOUT
+        while True:
+            console = console_output(ec2, instance_id)
+            for line in console.splitlines():
+                if BAKE_FAILED in line:
+                    raise RuntimeError(f"Bake failed on {instance_id}: {line.split(BAKE_FAILED, 1)[1].lstrip(': ')}")
+            if BAKE_COMPLETE in console or time.monotonic() > console_deadline:
+                break
+            time.sleep(CONSOLE_POLL_INTERVAL)
+        if BAKE_COMPLETE not in console:
+            if not force:
+                raise RuntimeError(
+                    f"Bake completion not found in {instance_id}'s console output after {CONSOLE_TIMEOUT}s "
+                    "(it may have stopped before provisioning finished); pass --force to create the AMI anyway"
+                )
+            # The manifest in the AMI only lists phases that completed
+            print(f"Warning: bake completion not visible in {instance_id}'s console output, creating the AMI anyway (--force)")
+
+        image_id = ec2.create_image(
+            InstanceId=instance_id,
+            Name=name,
+            Description=f"ec2-gha runner AMI baked from {aws.image_id}",
+            TagSpecifications=[{
+                "ResourceType": "image",
+                "Tags": [
+                    {"Key": "Name", "Value": name},
+                    {"Key": "ec2-gha:base-image", "Value": aws.image_id},
+                    {"Key": "ec2-gha:runner-release", "Value": aws.runner_release},
+                ],
+            }],
+        )["ImageId"]
+        print(f"Creating AMI {image_id} ({name})")
+        ec2.get_waiter("image_available").wait(
+            ImageIds=[image_id],
+            WaiterConfig={"Delay": delay, "MaxAttempts": max(1, int(timeout // delay))},
+        )
+        print(f"AMI {image_id} available")
+        return image_id
+    finally:
+        ec2.terminate_instances(InstanceIds=[instance_id])
+        print(f"Terminated builder {instance_id}")
+
+
+def latest_runner_release(architecture: str = "x64") -> str:
+    """Download URL of the latest Linux runner release (requires ``GH_PAT``)."""
+    from ec2_gha.gh import PooledGitHubInstance
+    token = environ.get("GH_PAT")
+    if not token:
+        raise ValueError("Pass --runner-release, or set GH_PAT to look up the latest runner release")
+    repo = environ.get("GITHUB_REPOSITORY", "actions/runner")
+    return PooledGitHubInstance(token=token, repo=repo).get_latest_runner_release(platform="linux", architecture=architecture)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ec2_gha bake",
+        description="Bake an AMI with the runner, its dependencies and the CloudWatch agent preinstalled",
+    )
+    parser.add_argument("-i", "--image-id", required=True, help="Base AMI ID")
+    parser.add_argument("-n", "--name", help="AMI name (default: ec2-gha-<base AMI>-<timestamp>)")
+    parser.add_argument("-t", "--instance-type", default=EC2_INSTANCE_TYPE, help=f"Builder instance type (default: {EC2_INSTANCE_TYPE})")
+    parser.add_argument("-r", "--region", default=environ.get("AWS_REGION", "us-east-1"), help="AWS region (default: $AWS_REGION, then us-east-1)")
+    parser.add_argument("-R", "--runner-release", help="Runner tarball URL to bake (default: the latest release, looked up with $GH_PAT)")
+    parser.add_argument("-a", "--action-ref", default=environ.get("INPUT_ACTION_REF", "HEAD"), help="ec2-gha Git ref whose runner-setup.sh to run (default: HEAD)")
+    parser.add_argument("-s", "--subnet-id", default="", help="Subnet for the builder")
+    parser.add_argument("-g", "--security-group-id", default="", help="Security group for the builder")
+    parser.add_argument("-p", "--instance-profile", default="", help="Instance profile for the builder")
+    parser.add_argument("-k", "--key-name", default="", help="EC2 key pair for the builder")
+    parser.add_argument("-d", "--root-device-size", default="0", help="Root disk size in GB (0 = base AMI default, +N = base AMI + N GB)")
+    parser.add_argument("-u", "--userdata", default="", help="Additional provisioning script to run on the builder (before runner setup)")
+    parser.add_argument("-m", "--userdata-mode", default="fetch", choices=["fetch", "embedded"], help="How the builder gets the runner scripts (default: fetch)")
+    parser.add_argument("-T", "--timeout", type=float, default=1800, help="Maximum seconds for provisioning, and for AMI creation (default: 1800)")
+    parser.add_argument("-f", "--force", action="store_true", help="Create the AMI even if the builder's console output never shows bake completion")
+    args = parser.parse_args(argv)
+
+    from ec2_gha.start import StartAWS
+    environ["INPUT_ACTION_REF"] = args.action_ref
+    name = args.name or f"ec2-gha-{args.image_id}-{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}"
+    aws = StartAWS(
+        image_id=args.image_id,
+        instance_type=args.instance_type,
+        region_name=args.region,
+        repo=environ.get("GITHUB_REPOSITORY", ""),
+        iam_instance_profile=args.instance_profile,
+        instance_name=name,
+        key_name=args.key_name,
+        root_device_size=args.root_device_size,
+        runner_release=args.runner_release or latest_runner_release(),
+        security_group_id=args.security_group_id,
+        subnet_id=args.subnet_id,
+        userdata=args.userdata,
+        userdata_mode=args.userdata_mode,
+    )
+    image_id = bake(aws, name, timeout=args.timeout, force=args.force)
+    print(image_id)
+
+
+if __name__ == "__main__":
+    main()
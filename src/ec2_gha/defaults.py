@@ -16,5 +16,54 @@ INSTANCE_NAME = "$repo/$name#$run"
 # Default instance count
 INSTANCE_COUNT = 1
 
+# Maximum number of concurrent `run_instances` calls
+LAUNCH_CONCURRENCY = 16
+
+# On-demand CreateFleet allocation strategy (with `ec2_instance_types` / `aws_subnet_ids`)
+FLEET_ALLOCATION_STRATEGY = "lowest-price"
+
+# Spot instances: disabled by default; when enabled, retry spot capacity for up to
+# SPOT_TIMEOUT seconds, then fall back to on-demand
+SPOT = "false"
+SPOT_FALLBACK = "true"
+SPOT_TIMEOUT = "60"
+
+# Register runners with just-in-time configs (created before launch) instead of
+# registration tokens (exchanged by `config.sh` on the instance)
+JIT_CONFIG = "false"
+# Runner group for JIT runners (1 = "Default")
+JIT_RUNNER_GROUP_ID = 1
+
+# Maximum number of concurrent GitHub API requests (e.g. runner token creation)
+GITHUB_CONCURRENCY = 8
+
+# How many runners must register before outputs are published: a count, or a fraction of
+# all runners (e.g. "0.75"); empty means all
+MIN_READY = ""
+
+# Start pipeline: "sequential" (each phase completes for all instances before the next)
+# or "async" (each instance progresses through token → launch → running → registered independently)
+PIPELINE = "sequential"
+
+# Launch from a (config-hash-keyed, reused) EC2 Launch Template
+LAUNCH_TEMPLATE = "false"
+
+# Warm pool: idle instances stop (rather than terminate), and later runs with the same
+# configuration resume them; at most WARM_POOL_SIZE stopped instances are kept, for up to
+# WARM_POOL_MAX_AGE minutes after they were first launched
+WARM_POOL = "false"
+WARM_POOL_SIZE = "4"
+WARM_POOL_MAX_AGE = "1440"  # 1 day (in minutes)
+
+# CloudWatch agent setup runs in the background on instances; by default a failure only
+# stops log shipping, "true" makes it terminate the instance (before runners register)
+CLOUDWATCH_LOGS_REQUIRED = "false"
+
+# How long (in seconds) persisted AMI metadata stays valid
+AMI_CACHE_TTL = "86400"  # 1 day
+
+# How the UserData delivers the runner scripts: "fetch" (from GitHub) or "embedded" (gzipped inline)
+USERDATA_MODE = "fetch"
+
 # Home directory auto-detection sentinel
 AUTO = "AUTO"
@@ -0,0 +1,262 @@
+"""GitHub API client with pooled connections, concurrent token creation and rate-limit backoff.
+
+``gha_runner.gh.GitHubInstance`` opens a new HTTPS connection for every request,
+and creates runner registration tokens one POST at a time; with 100+ runners
+that adds many seconds before the first EC2 call. ``PooledGitHubInstance``
+sends every request over one keep-alive ``requests.Session``, creates tokens
+concurrently, and retries rate-limited (403/429) and transient (5xx) responses,
+honoring ``Retry-After`` and ``X-RateLimit-Reset``. It can also create
+just-in-time (JIT) runner configs, which register a runner before its instance
+exists.
+"""
+
+import random
+import time
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from json import JSONDecodeError
+from threading import Lock
+
+import requests
+from gha_runner.gh import GitHubInstance, TokenRetrievalError
+from requests.adapters import HTTPAdapter
+
+from ec2_gha.defaults import GITHUB_CONCURRENCY, JIT_RUNNER_GROUP_ID
+
+RETRY_STATUSES = (502, 503, 504)
+# Don't wait out a rate limit whose reset is further away than this
+MAX_RATE_LIMIT_WAIT = 120
+
+
+def retry_delay(resp: requests.Response, attempt: int, now: float | None = None) -> float | None:
+    """How long to wait before retrying ``resp``, or None if it shouldn't be retried.
+
+    Parameters
+    ----------
+    resp : requests.Response
+        The response to a GitHub API request.
+    attempt : int
+        Number of retries so far (for exponential backoff).
+    now : float | None
+        Current epoch time (defaults to ``time.time()``).
+
+    Returns
+    -------
+    float | None
+        Seconds to wait: ``Retry-After`` if given, else until ``X-RateLimit-Reset`` when the
+        primary rate limit is exhausted, else exponential backoff with jitter. None if the
+        response isn't a rate-limit or transient error, or the wait exceeds ``MAX_RATE_LIMIT_WAIT``.
+    """
+    headers = resp.headers
+    rate_limited = resp.status_code == 429 or (
+        resp.status_code == 403 and ("Retry-After" in headers or headers.get("X-RateLimit-Remaining") == "0")
+    )
+    if not rate_limited and resp.status_code not in RETRY_STATUSES:
+        return None
+    if "Retry-After" in headers:
+        try:
+            delay = float(headers["Retry-After"])
+        except ValueError:
+            delay = None
+    elif headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in headers:
+        now = time.time() if now is None else now
+        delay = max(0.0, float(headers["X-RateLimit-Reset"]) - now) + 1
+    else:
+        delay = None
+    if delay is None:
+        delay = min(2 ** attempt, 30) * (1 + random.random() / 2)
+    return delay if delay <= MAX_RATE_LIMIT_WAIT else None
+
+
+@dataclass(frozen=True)
+class JitRunnerConfig:
+    """A just-in-time runner config: the runner is already registered, with ``label``.
+
+    Parameters
+    ----------
+    label : str
+        The runner's unique (random) label; the runner is named ``ec2-<label>``.
+    encoded : str
+        The ``encoded_jit_config`` to pass to ``run.sh --jitconfig``.
+    runner_id : int
+        The registered runner's ID (0 if unknown).
+    """
+
+    label: str
+    encoded: str
+    runner_id: int = 0
+
+
+def gather_futures(futures: list[Future]) -> Future:
+    """Return a future that resolves to the results of ``futures`` (in order), or the first error."""
+    combined = Future()
+    remaining = [len(futures)]
+    lock = Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            combined.set_result([future.result() for future in futures])
+        except Exception as e:
+            combined.set_exception(e)
+
+    if not futures:
+        combined.set_result([])
+    for future in futures:
+        future.add_done_callback(on_done)
+    return combined
+
+
+class PooledGitHubInstance(GitHubInstance):
+    """``GitHubInstance`` that reuses connections, creates tokens concurrently, and backs off on rate limits.
+
+    Parameters
+    ----------
+    token : str
+        GitHub API token for authentication.
+    repo : str
+        Full name of the GitHub repository in the format "owner/repo".
+    concurrency : int
+        Maximum number of concurrent requests (and pooled connections). Defaults to 8.
+    max_retries : int
+        Maximum number of retries of rate-limited or transient errors per request. Defaults to 5.
+
+    """
+
+    def __init__(self, token: str, repo: str, concurrency: int = GITHUB_CONCURRENCY, max_retries: int = 5):
+        super().__init__(token=token, repo=repo)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Worker threads for concurrent token creation (created on first use)."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="gh")
+            return self._executor
+
+    def _do_request(self, func, endpoint, **kwargs):
+        """Make a request to the GitHub API, retrying rate-limited and transient errors."""
+        endpoint_url = urllib.parse.urljoin(self.BASE_URL, endpoint)
+        for attempt in range(self.max_retries + 1):
+            resp: requests.Response = func(endpoint_url, headers=self.headers, **kwargs)
+            delay = retry_delay(resp, attempt) if attempt < self.max_retries else None
+            if delay is None:
+                break
+            print(f"GitHub API returned {resp.status_code} for {endpoint}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+        if not resp.ok:
+            raise RuntimeError(
+                f"Error in API call for {endpoint_url}: " f"{resp.content}"
+            )
+        try:
+            return resp.json()
+        except JSONDecodeError:
+            return resp.content
+
+    def post(self, endpoint, **kwargs):
+        return self._do_request(self.session.post, endpoint, **kwargs)
+
+    def get(self, endpoint, **kwargs):
+        return self._do_request(self.session.get, endpoint, **kwargs)
+
+    def delete(self, endpoint, **kwargs):
+        return self._do_request(self.session.delete, endpoint, **kwargs)
+
+    def _submit_groups(self, func, count: int, group_size: int) -> list[Future]:
+        """Start ``count * group_size`` calls of ``func`` concurrently, with one future per group of results."""
+        futures = [self.executor.submit(func) for _ in range(count * group_size)]
+        return [gather_futures(futures[i:i + group_size]) for i in range(0, len(futures), group_size)]
+
+    def submit_runner_tokens(self, count: int, group_size: int = 1) -> list[Future]:
+        """Start creating ``count`` groups of ``group_size`` runner tokens, concurrently.
+
+        Requests are issued in group order, so the first groups' tokens tend to be
+        available first, and callers can start using them without waiting for the rest.
+
+        Parameters
+        ----------
+        count : int
+            The number of token groups (e.g. instances).
+        group_size : int
+            The number of tokens per group (e.g. runners per instance).
+
+        Returns
+        -------
+        list[Future]
+            One future per group, resolving to its list of tokens (or raising
+            ``TokenRetrievalError``).
+        """
+        return self._submit_groups(self.create_runner_token, count, group_size)
+
+    def create_runner_tokens(self, count: int) -> list[str]:
+        """Generate ``count`` registration tokens for GitHub Actions runners, concurrently.
+
+        Raises
+        ------
+        TokenRetrievalError
+            If there is an error generating a token.
+        """
+        return [group.result()[0] for group in self.submit_runner_tokens(count)]
+
+    def create_jit_config(self, labels: str = "") -> JitRunnerConfig:
+        """Register a just-in-time runner, with a new random label.
+
+        JIT runners are ephemeral: they run one job, and are then removed by GitHub.
+
+        Parameters
+        ----------
+        labels : str
+            Comma-separated extra labels (in addition to ``self-hosted``, ``linux`` and the random label).
+
+        Returns
+        -------
+        JitRunnerConfig
+            The runner's label and encoded JIT config.
+
+        Raises
+        ------
+        TokenRetrievalError
+            If there is an error creating the JIT config.
+        """
+        label = self.generate_random_label()
+        extra_labels = [extra.strip() for extra in labels.split(",") if extra.strip()]
+        body = {
+            "name": f"ec2-{label}",
+            "runner_group_id": JIT_RUNNER_GROUP_ID,
+            "labels": ["self-hosted", "linux", *extra_labels, label],
+            "work_folder": "_work",
+        }
+        try:
+            res = self.post(f"repos/{self.repo}/actions/runners/generate-jitconfig", json=body)
+            return JitRunnerConfig(label=label, encoded=res["encoded_jit_config"], runner_id=res.get("runner", {}).get("id", 0))
+        except Exception as e:
+            raise TokenRetrievalError(f"Error creating JIT runner config: {e}")
+
+    def add_runner_labels(self, runner_id: int, labels: list[str]):
+        """Add custom labels to a registered runner (e.g. a JIT runner, once its instance is known)."""
+        self.post(f"repos/{self.repo}/actions/runners/{runner_id}/labels", json={"labels": labels})
+
+    def delete_runner(self, runner_id: int):
+        """Remove a registered runner (e.g. a JIT runner whose instance was never launched)."""
+        self.delete(f"repos/{self.repo}/actions/runners/{runner_id}")
+
+    def submit_jit_configs(self, count: int, group_size: int = 1, labels: str = "") -> list[Future]:
+        """Start creating ``count`` groups of ``group_size`` JIT runner configs, concurrently.
+
+        See ``submit_runner_tokens`` and ``create_jit_config``.
+        """
+        return self._submit_groups(lambda: self.create_jit_config(labels), count, group_size)
+
+    def create_jit_configs(self, count: int, labels: str = "") -> list[JitRunnerConfig]:
+        """Create ``count`` JIT runner configs, concurrently (see ``create_jit_config``)."""
+        return self.submit_jit_configs(1, count, labels)[0].result() if count else []
@@ -11,6 +11,8 @@ LOG_STREAM_JOB_STARTED = "job-started"
 LOG_STREAM_JOB_COMPLETED = "job-completed"
 LOG_STREAM_TERMINATION = "termination"
 LOG_STREAM_RUNNER_DIAG = "runner-diag"
+LOG_STREAM_SPOT_INTERRUPTION = "spot-interruption"
+LOG_STREAM_BOOT_PROFILE = "boot-profile"
 
 # Log message prefixes
 LOG_PREFIX_JOB_STARTED = "Job started:"
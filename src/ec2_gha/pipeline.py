@@ -0,0 +1,518 @@
+"""Start pipelines: how instances move from runner tokens to registered runners.
+
+``PrefetchDeployInstance`` (the default, ``sequential`` pipeline) runs each phase
+for every instance before starting the next: launch all instances, wait for all
+of them to be running, then wait for each runner to register. Only runner token
+creation overlaps with launching, so each instance is launched as soon as its
+tokens exist. One slow launch or boot still delays every other instance.
+
+``AsyncDeployInstance`` instead moves each instance through
+token → launch → running → registered as its own asyncio task. Blocking GitHub
+and EC2 calls run in worker threads, and the "running" and "registered" checks
+are shared pollers, so one ``describe_instances`` (or runner-list) call per
+interval covers every instance waiting at that stage. Outputs are published once
+every runner has registered, followed by a per-stage latency histogram.
+"""
+
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Type
+
+from gha_runner.clouddeployment import DeployInstance
+from gha_runner.gh import GitHubInstance, RunnerListError
+from gha_runner.helper.workflow_cmds import warning
+
+from ec2_gha.defaults import LAUNCH_CONCURRENCY, MIN_READY
+from ec2_gha.gh import PooledGitHubInstance
+from ec2_gha.start import FAILED_INSTANCE_STATES, StartAWS, check_jit_user_data_size, is_truthy, remove_jit_runners
+from ec2_gha.stats import percentile
+
+STAGES = ("token", "launch", "running", "registered", "total")
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, math.inf)
+RUNNING_POLL_INTERVAL = 2
+REGISTRATION_POLL_INTERVAL = 5
+
+
+def format_histogram(latencies: dict[str, list[float]], width: int = 30) -> str:
+    """Render per-stage latency summaries (p50/p95/max) and histograms as text.
+
+    Parameters
+    ----------
+    latencies : dict[str, list[float]]
+        Durations in seconds, per stage. Stages without samples are omitted.
+    width : int
+        Length of the longest histogram bar.
+
+    Returns
+    -------
+    str
+        The rendered report.
+    """
+    lines = ["Stage latencies (seconds):"]
+    for stage, values in latencies.items():
+        if not values:
+            continue
+        lines.append(
+            f"  {stage:<10} n={len(values):<4} p50={percentile(values, 50):7.2f}"
+            f"  p95={percentile(values, 95):7.2f}  max={max(values):7.2f}"
+        )
+        counts = [0] * len(HISTOGRAM_BUCKETS)
+        for value in values:
+            counts[next(i for i, bound in enumerate(HISTOGRAM_BUCKETS) if value <= bound)] += 1
+        peak = max(counts)
+        lower = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS, counts):
+            if count:
+                label = f"<={bound:g}s" if bound != math.inf else f">{lower:g}s"
+                lines.append(f"    {label:>7} {'#' * max(1, round(count / peak * width))} {count}")
+            lower = bound
+    return "\n".join(lines)
+
+
+def resolve_min_ready(min_ready: str, total: int) -> int:
+    """Resolve the ``min_ready`` input to a number of runners.
+
+    Parameters
+    ----------
+    min_ready : str
+        A count (e.g. "15"), or a fraction of all runners (e.g. "0.75", or "75%").
+        Empty (or "all") means all runners.
+    total : int
+        The total number of runners.
+
+    Returns
+    -------
+    int
+        The number of runners that must register, between 1 and ``total``.
+
+    Raises
+    ------
+    ValueError
+        If ``min_ready`` is not a positive count or fraction.
+    """
+    value = str(min_ready or "").strip().lower()
+    if value in ("", "all"):
+        return total
+    try:
+        if value.endswith("%"):
+            required = math.ceil(float(value[:-1]) / 100 * total)
+        elif "." in value:
+            required = math.ceil(float(value) * total)
+        else:
+            required = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid min_ready '{min_ready}', expected a count or a fraction (e.g. 15, 0.75 or 75%)")
+    if required < 1:
+        raise ValueError(f"Invalid min_ready '{min_ready}', must be positive")
+    return min(required, total)
+
+
+@dataclass
+class PrefetchDeployInstance(DeployInstance):
+    """``DeployInstance`` that launches each instance as soon as its runner tokens exist.
+
+    ``DeployInstance`` creates every runner token before the provider is even
+    constructed. Here, token creation is only started (concurrently, see
+    ``PooledGitHubInstance.submit_runner_tokens``), and the per-instance futures are
+    passed to the provider as ``grouped_runner_tokens``; the runner release lookup
+    and launch plan are computed while the tokens are being created. With
+    ``jit_config``, JIT runner configs are created instead of registration tokens.
+
+    With ``min_ready`` (see ``resolve_min_ready``), the mapping (of every launched
+    runner, including those still booting) is published as soon as that many have registered.
+    """
+
+    gh: PooledGitHubInstance
+    min_ready: str = MIN_READY
+    required: int = field(init=False)
+
+    def __post_init__(self):
+        runners_per_instance = self.cloud_params.get("runners_per_instance", 1)
+        self.required = resolve_min_ready(self.min_ready, self.count * runners_per_instance)
+        jit = is_truthy(self.cloud_params.get("jit_config"))
+        if jit:
+            # Before any JIT config is created (which registers its runner)
+            check_jit_user_data_size(runners_per_instance, self.cloud_params.get("userdata", ""), self.cloud_params.get("script", ""))
+            self.cloud_params["runner_labeler"] = self.gh.add_runner_labels
+            self.cloud_params["runner_remover"] = self.gh.delete_runner
+            self.cloud_params["grouped_runner_tokens"] = self.gh.submit_jit_configs(
+                self.count, runners_per_instance, labels=self.cloud_params.get("labels") or "",
+            )
+        else:
+            self.cloud_params["grouped_runner_tokens"] = self.gh.submit_runner_tokens(self.count, runners_per_instance)
+        try:
+            architecture = self.cloud_params.get("arch", "x64")
+            self.cloud_params["runner_release"] = self.gh.get_latest_runner_release(
+                platform="linux", architecture=architecture
+            )
+            self.provider = self.provider_type(**self.cloud_params)
+        except Exception:
+            if jit:
+                # No instance will use the (already registered) JIT runners
+                remove_jit_runners(self.cloud_params["grouped_runner_tokens"], self.gh.delete_runner)
+            raise
+
+    def start_runner_instances(self):
+        """Start the runner instances, and wait for (``min_ready`` of) their runners to register."""
+        required = self.required
+        if required >= self.count * self.cloud_params.get("runners_per_instance", 1):
+            super().start_runner_instances()
+            # Every launched instance's runners registered
+            self.provider.admit_to_pool(list(self.provider.launched_at))
+            return
+
+        print("Starting up...")
+        mappings = self.provider.create_instances()
+        labels = [label for value in mappings.values() for label in (value if isinstance(value, list) else [value])]
+        if len(labels) < required:
+            self.provider.set_instance_mapping(mappings)
+            raise RuntimeError(f"Only {len(labels)} runner(s) launched, fewer than min_ready ({required})")
+
+        print(f"Waiting for {required} of {len(labels)} runners to register...")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                runners = self.gh.get_runners() or []
+            except RunnerListError as e:
+                print(f"Error checking registered runners (will retry): {e}")
+                runners = []
+            online = {label for runner in runners for label in runner.labels}
+            ready = {label for label in labels if label in online}
+            if len(ready) >= required:
+                break
+            if time.monotonic() > deadline:
+                # Including runners that aren't ready, so the stop job cleans them up
+                self.provider.set_instance_mapping(mappings)
+                raise RuntimeError(f"Timeout reached: {len(ready)} of min_ready ({required}) runners registered")
+            time.sleep(REGISTRATION_POLL_INTERVAL)
+        # Including stragglers, which keep booting; jobs targeting their labels queue until they register
+        self.provider.set_instance_mapping(mappings)
+        self.provider.admit_to_pool([
+            instance_id
+            for instance_id, value in mappings.items()
+            if all(label in ready for label in (value if isinstance(value, list) else [value]))
+        ])
+        print(f"{len(ready)} of {len(labels)} runners registered (min_ready: {required}), not waiting for the rest")
+
+
+class BatchPoller:
+    """Resolve many concurrent waits with one batched lookup per interval.
+
+    Parameters
+    ----------
+    lookup : Callable[[list], dict]
+        Blocking function (run in a worker thread) that takes the pending keys and
+        returns ``{key: result}`` for those that are done. A result that is an
+        exception fails that key's wait. Errors from the lookup itself are
+        reported and retried at the next interval.
+    interval : float
+        Seconds between lookups.
+    name : str
+        What is being waited for (used in messages).
+    """
+
+    def __init__(self, lookup: Callable[[list], dict], interval: float, name: str):
+        self.lookup = lookup
+        self.interval = interval
+        self.name = name
+        self._waiters: dict[object, tuple[asyncio.Future, float]] = {}
+        self._task: asyncio.Task | None = None
+
+    async def wait(self, key, timeout: float):
+        """Wait until ``key`` is done (or ``timeout`` seconds elapse), and return its result.
+
+        Raises
+        ------
+        TimeoutError
+            If ``key`` is not done within ``timeout`` seconds.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[key] = (future, time.monotonic() + timeout)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        while self._waiters:
+            keys = list(self._waiters)
+            try:
+                results = await asyncio.to_thread(self.lookup, keys)
+            except Exception as e:
+                print(f"Error checking {self.name} (will retry): {e}")
+                results = {}
+            now = time.monotonic()
+            for key in keys:
+                future, deadline = self._waiters[key]
+                if key in results:
+                    result = results[key]
+                elif now > deadline:
+                    result = TimeoutError(f"Timeout reached: {key} not {self.name}")
+                else:
+                    continue
+                del self._waiters[key]
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            if self._waiters:
+                await asyncio.sleep(self.interval)
+
+
+@dataclass
+class AsyncDeployInstance:
+    """Deploy instances and runners, with each instance progressing independently.
+
+    Takes the same parameters as ``gha_runner.clouddeployment.DeployInstance``, but
+    runner tokens are created per instance, as part of its pipeline, rather than
+    all up front.
+
+    Parameters
+    ----------
+    provider_type : Type[StartAWS]
+        The type of cloud provider to use.
+    cloud_params : dict
+        The parameters to pass to the cloud provider.
+    gh : GitHubInstance
+        The GitHub instance to use.
+    count : int
+        The number of instances to create.
+    timeout : int
+        Timeout in seconds for each instance to be running, and for its runners to register.
+    min_ready : str
+        How many runners must register before the mapping is published: a count, or a
+        fraction of all runners (see ``resolve_min_ready``). Defaults to all of them.
+
+    Attributes
+    ----------
+    provider : StartAWS
+        The cloud provider instance.
+    required : int
+        The number of runners that must register (``min_ready``, resolved).
+    latencies : dict[str, list[float]]
+        Per-stage durations in seconds, one sample per instance that completed the stage.
+    """
+
+    provider_type: Type[StartAWS]
+    cloud_params: dict
+    gh: GitHubInstance
+    count: int
+    timeout: int
+    min_ready: str = MIN_READY
+    provider: StartAWS = field(init=False)
+    required: int = field(init=False)
+    latencies: dict[str, list[float]] = field(init=False)
+
+    def __post_init__(self):
+        if is_truthy(self.cloud_params.get("jit_config")):
+            self.cloud_params["runner_labeler"] = self.gh.add_runner_labels
+            self.cloud_params["runner_remover"] = self.gh.delete_runner
+        self.provider = self.provider_type(**self.cloud_params)
+        self.required = resolve_min_ready(self.min_ready, self.count * self.provider.runners_per_instance)
+        self.latencies = {stage: [] for stage in STAGES}
+        self._launched: dict[int, tuple[str, list[dict]]] = {}
+        # Per launched instance: the wait for it to be running, and for its runners to register
+        self._readiness: dict[int, asyncio.Future] = {}
+        self._registered_labels: set[str] = set()
+        self._ready_count = 0
+
+    def start_runner_instances(self):
+        """Start the runner instances, and wait for (``min_ready`` of) their runners to register.
+
+        The instance mapping (of every launched instance, including those still
+        starting) is published once every instance has launched and ``min_ready``
+        runners are registered. If some instances fail to launch, a warning is
+        emitted for each; if ``min_ready`` isn't reached, the mapping is published
+        (so the stop job cleans the instances up) and an error is raised.
+        """
+        print("Starting up...")
+        start = time.monotonic()
+        try:
+            asyncio.run(self._start())
+            print(f"{self._ready_count} runner(s) registered in {time.monotonic() - start:.1f}s")
+        finally:
+            print(format_histogram(self.latencies))
+
+    def _record(self, stage: str, start: float) -> float:
+        """Record a stage's duration (since ``start``); returns the current time."""
+        now = time.monotonic()
+        self.latencies[stage].append(now - start)
+        return now
+
+    def _setup(self):
+        """Fetch the runner release and compute the launch plan (shared by all instances)."""
+        architecture = self.cloud_params.get("arch", "x64")
+        self.provider.runner_release = self.gh.get_latest_runner_release(platform="linux", architecture=architecture)
+        return self.provider.prepare_launch(self.count)
+
+    def _running(self, ids: list[str]) -> dict:
+        states, _ = self.provider._describe_states(ids)
+        results = {}
+        for instance_id, state in states.items():
+            if state == "running":
+                results[instance_id] = state
+            elif state in FAILED_INSTANCE_STATES:
+                results[instance_id] = RuntimeError(f"Instance {instance_id} entered state '{state}'")
+        return results
+
+    def _registered(self, labels: list[str]) -> dict:
+        runners = self.gh.get_runners() or []
+        online = {label for runner in runners for label in runner.labels}
+        return {label: True for label in labels if label in online}
+
+    async def _start(self):
+        loop = asyncio.get_running_loop()
+        concurrency = max(1, int(self.provider.launch_concurrency or LAUNCH_CONCURRENCY))
+        # Worker threads for blocking calls: token creation, launches, and the pollers' lookups
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=max(8, 2 * concurrency)))
+        self._running_poller = BatchPoller(self._running, RUNNING_POLL_INTERVAL, "running")
+        self._registered_poller = BatchPoller(self._registered, REGISTRATION_POLL_INTERVAL, "registered")
+        self._enough = asyncio.Event()
+        # The release lookup and launch plan are shared; compute them while the first tokens are created
+        setup = asyncio.ensure_future(asyncio.to_thread(self._setup))
+
+        unfilled = {}
+        if self.provider.use_fleet:
+            # Fleet instances launch together, in one CreateFleet call, once every instance has its tokens
+            tokens = await asyncio.gather(*(self._create_tokens() for _ in range(self.count)))
+            try:
+                ec2, plan = await setup
+                start = time.monotonic()
+                results = await asyncio.to_thread(self.provider._launch_fleet, ec2, plan, list(tokens))
+            except Exception:
+                await asyncio.to_thread(remove_jit_runners, tokens, self.provider.runner_remover)
+                raise
+            for idx, result in enumerate(results):
+                if result is None:
+                    unfilled[idx] = RuntimeError("Not launched by the fleet (insufficient capacity)")
+                    await asyncio.to_thread(remove_jit_runners, [tokens[idx]], self.provider.runner_remover)
+                    continue
+                self._on_launch(idx, result, start)
+                self._readiness[idx] = asyncio.ensure_future(self._until_ready(idx, start))
+            launches = {}
+        else:
+            launch_slots = asyncio.Semaphore(concurrency)
+            launches = {idx: asyncio.ensure_future(self._launch(idx, setup, launch_slots)) for idx in range(self.count)}
+        failures = unfilled | await self._wait(launches)
+        if not setup.done():
+            setup.cancel()
+        self._finish(failures)
+
+    async def _wait(self, launches: dict[int, asyncio.Future]) -> dict[int, BaseException]:
+        """Wait for every instance to launch, then for their runners to register (or only ``min_ready`` of them).
+
+        Token creation and launches always run to completion, so every launched
+        instance is published; only the waits for stragglers to be running and
+        registered are cut short.
+
+        Returns
+        -------
+        dict[int, BaseException]
+            Errors of the instances whose pipelines failed, by instance index.
+        """
+        results = await asyncio.gather(*launches.values(), return_exceptions=True)
+        failures = {idx: result for idx, result in zip(launches, results) if isinstance(result, BaseException)}
+        if not self._readiness:
+            return failures
+        enough = asyncio.ensure_future(self._enough.wait())
+        done = asyncio.gather(*self._readiness.values(), return_exceptions=True)
+        await asyncio.wait([enough, done], return_when=asyncio.FIRST_COMPLETED)
+        enough.cancel()
+        if not done.done():
+            # Stragglers keep booting (and registering) on their own; stop waiting for them
+            print(f"{self._ready_count} runner(s) registered (min_ready: {self.required}), not waiting for the rest")
+            for task in self._readiness.values():
+                task.cancel()
+            await asyncio.gather(done, return_exceptions=True)
+        for idx, task in self._readiness.items():
+            if not task.cancelled() and task.exception() is not None:
+                failures[idx] = task.exception()
+        return failures
+
+    async def _create_tokens(self) -> list:
+        start = time.monotonic()
+        if is_truthy(self.provider.jit_config):
+            tokens = await asyncio.to_thread(self.gh.create_jit_configs, self.provider.runners_per_instance, self.provider.labels)
+        else:
+            tokens = await asyncio.to_thread(self.gh.create_runner_tokens, self.provider.runners_per_instance)
+        self._record("token", start)
+        return tokens
+
+    async def _launch(self, idx: int, setup: asyncio.Future, launch_slots: asyncio.Semaphore):
+        """Move one instance through token → launch, then start its running → registered wait (see ``_until_ready``)."""
+        start = time.monotonic()
+        tokens = await self._create_tokens()
+        try:
+            ec2, plan = await setup
+            async with launch_slots:
+                launch_start = time.monotonic()
+                result = await asyncio.to_thread(self.provider._launch_instance, ec2, plan, idx, tokens)
+        except Exception:
+            await asyncio.to_thread(remove_jit_runners, [tokens], self.provider.runner_remover)
+            raise
+        self._on_launch(idx, result, launch_start)
+        self._readiness[idx] = asyncio.ensure_future(self._until_ready(idx, start))
+
+    def _on_launch(self, idx: int, result: tuple[str, list[dict]], launch_start: float):
+        instance_id, _ = result
+        self._launched[idx] = result
+        now = self._record("launch", launch_start)
+        self.provider.launch_latencies[instance_id] = now - launch_start
+        self.provider.launched_at[instance_id] = now
+        print(f"Launched instance {idx} ({instance_id}) in {now - launch_start:.2f}s")
+
+    async def _until_ready(self, idx: int, start: float):
+        """Wait for a launched instance to be running, then for its runners to register."""
+        instance_id, runner_configs = self._launched[idx]
+        launched_at = self.provider.launched_at[instance_id]
+        await self._running_poller.wait(instance_id, self.timeout)
+        running_at = self._record("running", launched_at)
+        self.provider.ready_latencies[instance_id] = running_at - launched_at
+        print(f"Instance {idx} ({instance_id}) running after {running_at - launched_at:.1f}s")
+
+        labels = [config["labels"] for config in runner_configs]
+        await asyncio.gather(*(self._until_registered(label) for label in labels))
+        registered_at = self._record("registered", running_at)
+        self._record("total", start)
+        await asyncio.to_thread(self.provider.admit_to_pool, [instance_id])
+        print(f"Instance {idx} runner(s) registered after {registered_at - running_at:.1f}s: {', '.join(labels)}")
+
+    async def _until_registered(self, label: str):
+        await self._registered_poller.wait(label, self.timeout)
+        self._registered_labels.add(label)
+        self._ready_count += 1
+        if self._ready_count >= self.required:
+            self._enough.set()
+
+    def _finish(self, failures: dict[int, BaseException]):
+        """Publish the instance mapping, and report failures."""
+        if not self._launched:
+            if failures:
+                raise failures[min(failures)]
+            raise RuntimeError("No instances launched")
+        mapping = {
+            instance_id: self.provider.runner_labels(runner_configs)
+            for _, (instance_id, runner_configs) in sorted(self._launched.items())
+        }
+        # Including runners that aren't ready: with min_ready, jobs targeting stragglers queue until
+        # they register; otherwise, the stop job cleans them up
+        self.provider.set_instance_mapping(mapping)
+
+        not_ready = {idx: e for idx, e in failures.items() if idx in self._launched}
+        for idx, e in sorted(failures.items()):
+            if idx not in not_ready:
+                warning(title=f"Failed to launch instance {idx}", message=e)
+        if self._enough.is_set():
+            for idx, e in sorted(not_ready.items()):
+                warning(title=f"Instance {idx} not ready", message=e)
+        elif not_ready:
+            details = "; ".join(f"{self._launched[idx][0]}: {e}" for idx, e in sorted(not_ready.items()))
+            raise RuntimeError(f"{len(not_ready)} instance(s) launched but not ready: {details}")
+        elif self.required < self.count * self.provider.runners_per_instance and self._ready_count < self.required:
+            # An explicit min_ready is a floor, as in ``PrefetchDeployInstance`` (without one, failed
+            # launches are only warnings)
+            raise RuntimeError(f"Only {self._ready_count} runner(s) registered, fewer than min_ready ({self.required})")
@@ -0,0 +1,79 @@
+"""Startup profiling for ``python -m ec2_gha``.
+
+Enabled by ``--profile-startup`` or ``EC2_GHA_PROFILE_STARTUP=1``. Records when
+each startup phase (interpreter startup, imports, validation, token minting,
+...) completes, up to the first EC2 launch call, and prints a report when the
+process exits. Disabled, ``mark`` is a no-op.
+"""
+
+import atexit
+import os
+import sys
+import time
+from os import environ
+from threading import Lock
+
+_start = time.perf_counter()
+_marks: list[tuple[str, float]] = []
+_lock = Lock()
+_registered = False
+
+
+def enabled() -> bool:
+    """Whether startup profiling is enabled."""
+    return environ.get("EC2_GHA_PROFILE_STARTUP", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _process_age() -> float | None:
+    """Seconds since this process started (Linux only), i.e. including interpreter startup."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the (parenthesized, possibly space-containing) command name; starttime is field 22
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+_interpreter_startup = _process_age()
+
+
+def mark(label: str, once: bool = False):
+    """Record that startup phase ``label`` just completed.
+
+    Parameters
+    ----------
+    label : str
+        Name of the phase.
+    once : bool
+        Only record the first occurrence (e.g. "first run_instances", from concurrent launch threads).
+    """
+    global _registered
+    if not enabled():
+        return
+    now = time.perf_counter() - _start
+    with _lock:
+        if once and any(existing == label for existing, _ in _marks):
+            return
+        _marks.append((label, now))
+        if not _registered:
+            atexit.register(report)
+            _registered = True
+
+
+def report(file=None):
+    """Print the recorded phases, with the time each took and the total elapsed time."""
+    file = file or sys.stderr
+    with _lock:
+        marks = list(_marks)
+    if not marks:
+        return
+    print("Startup profile (seconds since ec2_gha was imported):", file=file)
+    if _interpreter_startup is not None:
+        print(f"  {'(interpreter startup, before import)':<40} {_interpreter_startup:8.3f}s", file=file)
+    prev = 0.0
+    for label, t in marks:
+        print(f"  {label:<40} {t:8.3f}s  (+{t - prev:.3f}s)", file=file)
+        prev = t
@@ -0,0 +1,125 @@
+"""Runner tarball mirror, with SHA-256 verification on the instances.
+
+Every instance otherwise downloads the ~200MB runner tarball from github.com
+(through the NAT gateway, for instances in private subnets). With
+``runner_mirror`` set, instances download it from the mirror instead, and
+verify it against a SHA-256 computed when the mirror was populated:
+
+- ``s3://bucket/prefix``: the launcher checks for ``<prefix>/<tarball name>``;
+  on first use it downloads the release, computes its SHA-256 and uploads it
+  (with the checksum in the object metadata, and in a ``.sha256`` sidecar).
+  Instances get a presigned URL, so they need no S3 permissions.
+- ``https://host/path``: a read-only mirror (e.g. CloudFront in front of such a
+  bucket) holding ``<tarball name>`` and, optionally, ``<tarball name>.sha256``.
+
+If the mirror can't be used, instances fall back to the GitHub release.
+"""
+
+import hashlib
+import tempfile
+import urllib.request
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from botocore.exceptions import ClientError
+
+from ec2_gha.aws import get_client
+
+# How long presigned mirror URLs are valid for (instances download the runner within minutes of launch)
+PRESIGNED_URL_TTL = 3600
+CHUNK_SIZE = 1 << 20
+# Socket timeout (seconds) for the launcher's own downloads (a stalled read otherwise blocks the launch)
+DOWNLOAD_TIMEOUT = 30
+
+
+@dataclass(frozen=True)
+class RunnerSource:
+    """Where instances download the runner tarball from.
+
+    Parameters
+    ----------
+    url : str
+        Mirror URL of the tarball (tried before the GitHub release).
+    sha256 : str
+        Expected SHA-256 of the tarball, or empty to skip verification.
+    """
+
+    url: str
+    sha256: str = ""
+
+
+def tarball_name(release_url: str) -> str:
+    """File name of a runner release URL (e.g. ``actions-runner-linux-x64-2.328.0.tar.gz``)."""
+    return urlparse(release_url).path.rsplit("/", 1)[-1]
+
+
+def _download(url: str, fileobj) -> str:
+    """Stream ``url`` into ``fileobj``, returning its SHA-256."""
+    sha256 = hashlib.sha256()
+    with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as resp:
+        while chunk := resp.read(CHUNK_SIZE):
+            sha256.update(chunk)
+            fileobj.write(chunk)
+    return sha256.hexdigest()
+
+
+def _s3_source(bucket: str, prefix: str, release_url: str, region_name: str) -> RunnerSource:
+    s3 = get_client("s3", region_name)
+    key = "/".join(part for part in (prefix.strip("/"), tarball_name(release_url)) if part)
+    try:
+        sha256 = s3.head_object(Bucket=bucket, Key=key).get("Metadata", {}).get("sha256", "")
+        print(f"Runner mirror hit: s3://{bucket}/{key}")
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+            raise
+        print(f"Runner mirror miss: populating s3://{bucket}/{key} from {release_url}")
+        with tempfile.TemporaryFile() as f:
+            sha256 = _download(release_url, f)
+            f.seek(0)
+            s3.upload_fileobj(f, bucket, key, ExtraArgs={"Metadata": {"sha256": sha256}})
+        s3.put_object(Bucket=bucket, Key=f"{key}.sha256", Body=f"{sha256}  {tarball_name(release_url)}\n".encode())
+    url = s3.generate_presigned_url("get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=PRESIGNED_URL_TTL)
+    return RunnerSource(url=url, sha256=sha256)
+
+
+def _http_source(mirror: str, release_url: str) -> RunnerSource:
+    url = f"{mirror.rstrip('/')}/{tarball_name(release_url)}"
+    try:
+        with urllib.request.urlopen(f"{url}.sha256", timeout=DOWNLOAD_TIMEOUT) as resp:
+            sha256 = resp.read().decode().split()[0]
+    except (OSError, IndexError):
+        print(f"No checksum at {url}.sha256, instances won't verify the mirrored runner")
+        sha256 = ""
+    return RunnerSource(url=url, sha256=sha256)
+
+
+@lru_cache(maxsize=None)
+def resolve_runner_source(mirror: str, release_url: str, region_name: str) -> RunnerSource:
+    """Resolve (and, for S3 mirrors, populate) the mirror of a runner release.
+
+    Parameters
+    ----------
+    mirror : str
+        ``s3://bucket/prefix`` or an HTTP(S) base URL.
+    release_url : str
+        The GitHub runner release tarball URL.
+    region_name : str
+        AWS region for the S3 client.
+
+    Returns
+    -------
+    RunnerSource
+        The mirror URL of the tarball, and its SHA-256 (if known).
+
+    Raises
+    ------
+    ValueError
+        If ``mirror`` is neither an S3 nor an HTTP(S) URL.
+    """
+    parsed = urlparse(mirror)
+    if parsed.scheme == "s3":
+        return _s3_source(parsed.netloc, parsed.path, release_url, region_name)
+    if parsed.scheme in ("http", "https"):
+        return _http_source(mirror, release_url)
+    raise ValueError(f"Invalid runner_mirror '{mirror}', expected s3://bucket/prefix or an http(s) URL")
@@ -18,5 +18,6 @@ echo "[$(date)] Runner-$I: LOG_PREFIX_JOB_COMPLETED ${GITHUB_JOB}"
 # Remove the job tracking file to indicate this runner no longer has an active job
 rm -f $RUNNER_STATE_DIR/jobs/${GITHUB_RUN_ID}-${GITHUB_JOB}-$I.job
 
-# Update activity timestamp to reset the idle timer
+# Update activity timestamp to reset the idle timer, and have the termination daemon re-check now
 touch $RUNNER_STATE_DIR/last-activity
+notify_termination_daemon "job-completed $I"
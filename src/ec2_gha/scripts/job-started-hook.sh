@@ -20,5 +20,9 @@ echo "[$(date)] Runner-$I: LOG_PREFIX_JOB_STARTED Runner-$I: ${GITHUB_JOB}"
 mkdir -p $RUNNER_STATE_DIR/jobs
 echo '{"status":"running","runner":"'$I'"}' > $RUNNER_STATE_DIR/jobs/${GITHUB_RUN_ID}-${GITHUB_JOB}-$I.job
 
-# Update activity timestamps to reset the idle timer
+# End the boot profile's `first-job` phase (a no-op after the instance's first job)
+phase_end first-job
+
+# Update activity timestamps to reset the idle timer, and have the termination daemon re-check now
 touch $RUNNER_STATE_DIR/last-activity $RUNNER_STATE_DIR/has-run-job
+notify_termination_daemon "job-started $I"
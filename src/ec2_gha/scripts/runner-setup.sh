@@ -1,7 +1,7 @@
 #!/bin/bash
 set -e
 
-# This script is fetched and executed by the minimal userdata script
+# This script is fetched (or, with `userdata_mode: embedded`, written) and executed by the minimal userdata script
 # All variables are already exported by the userdata script
 
 # Enable debug tracing to a file for troubleshooting
@@ -50,13 +50,17 @@ BIN_DIR=/usr/local/bin
 RUNNER_STATE_DIR=/var/run/github-runner
 mkdir -p $RUNNER_STATE_DIR
 
-# Fetch shared functions from GitHub
-echo "[$(date '+%Y-%m-%d %H:%M:%S')] Fetching shared functions from GitHub (SHA: ${action_sha})" | tee -a /var/log/runner-setup.log
-FUNCTIONS_URL="https://raw.githubusercontent.com/Open-Athena/ec2-gha/${action_sha}/src/ec2_gha/templates/shared-functions.sh"
-if ! curl -sSL "$FUNCTIONS_URL" -o /tmp/shared-functions.sh && ! wget -q "$FUNCTIONS_URL" -O /tmp/shared-functions.sh; then
-  echo "[$(date '+%Y-%m-%d %H:%M:%S')] ERROR: Failed to download shared functions" | tee -a /var/log/runner-setup.log
-  shutdown -h now
-  exit 1
+# Fetch shared functions from GitHub (unless they were embedded in the userdata)
+if [ -n "${scripts_embedded:-}" ] && [ -s /tmp/shared-functions.sh ]; then
+  echo "[$(date '+%Y-%m-%d %H:%M:%S')] Using embedded shared functions (SHA: ${action_sha})" | tee -a /var/log/runner-setup.log
+else
+  echo "[$(date '+%Y-%m-%d %H:%M:%S')] Fetching shared functions from GitHub (SHA: ${action_sha})" | tee -a /var/log/runner-setup.log
+  FUNCTIONS_URL="https://raw.githubusercontent.com/Open-Athena/ec2-gha/${action_sha}/src/ec2_gha/templates/shared-functions.sh"
+  if ! curl -sSL "$FUNCTIONS_URL" -o /tmp/shared-functions.sh && ! wget -q "$FUNCTIONS_URL" -O /tmp/shared-functions.sh; then
+    echo "[$(date '+%Y-%m-%d %H:%M:%S')] ERROR: Failed to download shared functions" | tee -a /var/log/runner-setup.log
+    shutdown -h now
+    exit 1
+  fi
 fi
 
 # Write shared functions that will be used by multiple scripts
@@ -76,6 +80,11 @@ cat /tmp/shared-functions.sh >> $BIN_DIR/runner-common.sh
 chmod +x $BIN_DIR/runner-common.sh
 source $BIN_DIR/runner-common.sh
 
+# Boot profile (see `phase_begin`): from kernel start to this point (cloud-init, userdata, fetching
+# this script), then each setup phase
+phase_begin boot 0
+phase_end boot
+
 logger "EC2-GHA: Starting userdata script"
 trap 'logger "EC2-GHA: Script failed at line $LINENO with exit code $?"' ERR
 trap 'terminate_instance "Setup script failed with error on line $LINENO"' ERR
@@ -87,34 +96,112 @@ REGISTRATION_TIMEOUT="$runner_registration_timeout"
 if ! [[ "$REGISTRATION_TIMEOUT" =~ ^[0-9]+$ ]]; then
   REGISTRATION_TIMEOUT=300
 fi
-# Create a marker file for watchdog termination request
-touch $RUNNER_STATE_DIR/watchdog-active
-(
-  sleep $REGISTRATION_TIMEOUT
-  if [ ! -f $RUNNER_STATE_DIR/registered ]; then
-    touch $RUNNER_STATE_DIR/watchdog-terminate
-    kill -TERM $$ 2>/dev/null || true
-  fi
-  rm -f $RUNNER_STATE_DIR/watchdog-active
-) &
-REGISTRATION_WATCHDOG_PID=$!
-echo $REGISTRATION_WATCHDOG_PID > $RUNNER_STATE_DIR/watchdog.pid
+# Bake mode registers no runners
+if [ "$bake" != "true" ]; then
+  # Create a marker file for watchdog termination request
+  touch $RUNNER_STATE_DIR/watchdog-active
+  (
+    sleep $REGISTRATION_TIMEOUT
+    if [ ! -f $RUNNER_STATE_DIR/registered ]; then
+      touch $RUNNER_STATE_DIR/watchdog-terminate
+      kill -TERM $$ 2>/dev/null || true
+    fi
+    rm -f $RUNNER_STATE_DIR/watchdog-active
+  ) &
+  REGISTRATION_WATCHDOG_PID=$!
+  echo $REGISTRATION_WATCHDOG_PID > $RUNNER_STATE_DIR/watchdog.pid
+fi
 
 # Run any custom user data script provided by the user
 if [ -n "$userdata" ]; then
   echo "[$(date '+%Y-%m-%d %H:%M:%S')] Running custom userdata" | tee -a /var/log/runner-setup.log
+  phase_begin userdata
   eval "$userdata"
+  phase_end userdata
 fi
 
 exec >> /var/log/runner-setup.log 2>&1
 log "Starting runner setup"
 
+# Warm pool: the instance stops (rather than terminates) when idle, and a later run may resume it
+# after replacing its userdata (with fresh runner tokens). cloud-init only runs userdata on an
+# instance's first boot, so install a unit that re-runs it on every later boot (which also rewrites
+# the termination service below, with the new run's settings).
+if [ "$warm_pool" = "true" ]; then
+  if ls -d $homedir/runner-* >/dev/null 2>&1; then
+    # Resumed from the pool; the previous run's runners were deregistered before it stopped
+    log "Resumed from warm pool, removing previous runners"
+    rm -rf $homedir/runner-*
+  fi
+  cat > $BIN_DIR/warm-pool-resume.sh << 'EOF'
+#!/bin/bash
+# Fetch the (possibly replaced) userdata from instance metadata, and run it
+U=/var/lib/ec2-gha-userdata
+T=$(curl -sf -X PUT -H "X-aws-ec2-metadata-token-ttl-seconds: 300" http://169.254.169.254/latest/api/token || true)
+curl -sf ${T:+-H "X-aws-ec2-metadata-token: $T"} http://169.254.169.254/latest/user-data -o $U.raw
+# Embedded-mode userdata is gzipped (cloud-init decompresses it transparently on first boot)
+gunzip -c $U.raw > $U 2>/dev/null || cp $U.raw $U
+chmod +x $U
+exec $U
+EOF
+  chmod +x $BIN_DIR/warm-pool-resume.sh
+  cat > /etc/systemd/system/warm-pool-resume.service << EOF
+[Unit]
+Description=Re-run ec2-gha userdata when a warm-pool instance is resumed
+After=network-online.target
+Wants=network-online.target
+[Service]
+Type=oneshot
+RemainAfterExit=yes
+TimeoutStartSec=0
+# Runners are started in the background, and must outlive the setup script
+KillMode=process
+ExecStart=$BIN_DIR/warm-pool-resume.sh
+[Install]
+WantedBy=multi-user.target
+EOF
+  systemctl daemon-reload
+  # Enabled (not started): it takes over from cloud-init on the next boot
+  systemctl enable warm-pool-resume.service
+fi
+
 # Fetch instance metadata for labeling and logging
-INSTANCE_TYPE=$(get_metadata "instance-type")
-INSTANCE_ID=$(get_metadata "instance-id")
-REGION=$(get_metadata "placement/region")
-AZ=$(get_metadata "placement/availability-zone")
+phase_begin imds-metadata
+if ! load_instance_identity; then
+  log "WARNING: Instance identity document unavailable, fetching metadata individually"
+  INSTANCE_TYPE=$(get_metadata "instance-type")
+  INSTANCE_ID=$(get_metadata "instance-id")
+  REGION=$(get_metadata "placement/region")
+  AZ=$(get_metadata "placement/availability-zone")
+fi
 log "Instance metadata: Type=${INSTANCE_TYPE} ID=${INSTANCE_ID} Region=${REGION} AZ=${AZ}"
+phase_end imds-metadata
+
+# Fleet launches share one userdata, without runner tokens (and with only the user labels). After
+# the fleet is created, the launcher tags each instance with its index, Name, and each runner's token
+# and generated label (`ec2-gha:runner-N`: "TOKEN LABEL"), read from the instance's own metadata tags.
+if [ -z "$runner_tokens" ]; then
+  log "Fleet launch: waiting for runner tags"
+  FLEET_INDEX=""
+  for i in {1..60}; do
+    FLEET_INDEX=$(get_instance_tag "ec2-gha:index")
+    [[ "$FLEET_INDEX" =~ ^[0-9]+$ ]] && break
+    sleep 2
+  done
+  if ! [[ "$FLEET_INDEX" =~ ^[0-9]+$ ]]; then
+    terminate_instance "No fleet index tag found"
+  fi
+  fleet_labels=""
+  for ((r = 0; r < ${runners_per_instance:-1}; r++)); do
+    read -r token label <<< "$(get_instance_tag "ec2-gha:runner-$r")"
+    [ -n "$token" ] || break
+    runner_tokens="${runner_tokens:+$runner_tokens }$token"
+    fleet_labels="${fleet_labels:+$fleet_labels|}${runner_labels:+$runner_labels,}$label"
+  done
+  runner_labels=$fleet_labels
+  instance_name=$(get_instance_tag "Name")
+  log "Fleet index: $FLEET_INDEX (Name: $instance_name)"
+fi
 
 # Set up maximum lifetime timeout - instance will terminate after this time regardless of job status
 MAX_LIFETIME_MINUTES=$max_instance_lifetime
@@ -139,8 +226,8 @@ nohup bash -c "
   }
 " > /var/log/max-lifetime.log 2>&1 &
 
-# Configure CloudWatch Logs if a log group is specified
-if [ "$cloudwatch_logs_group" != "" ]; then
+# Download and install the CloudWatch agent package
+install_cloudwatch_agent() {
   log "Installing CloudWatch agent"
 
   # Detect architecture for CloudWatch agent
@@ -151,20 +238,33 @@ if [ "$cloudwatch_logs_group" != "" ]; then
     CW_ARCH="amd64"
   fi
 
+  # Chained, so a failed step fails the install (this runs in `if` contexts, where `set -e` is off)
   if command -v dpkg >/dev/null 2>&1; then
     wait_for_dpkg_lock
-    wget -q https://s3.amazonaws.com/amazoncloudwatch-agent/ubuntu/${CW_ARCH}/latest/amazon-cloudwatch-agent.deb
-    dpkg -i -E ./amazon-cloudwatch-agent.deb
-    rm amazon-cloudwatch-agent.deb
+    wget -q https://s3.amazonaws.com/amazoncloudwatch-agent/ubuntu/${CW_ARCH}/latest/amazon-cloudwatch-agent.deb -O /tmp/amazon-cloudwatch-agent.deb &&
+      dpkg -i -E /tmp/amazon-cloudwatch-agent.deb &&
+      rm /tmp/amazon-cloudwatch-agent.deb
   elif command -v rpm >/dev/null 2>&1; then
     # Note: For RPM-based systems, the path structure might differ
-    wget -q https://s3.amazonaws.com/amazoncloudwatch-agent/amazon_linux/${CW_ARCH}/latest/amazon-cloudwatch-agent.rpm
-    rpm -U ./amazon-cloudwatch-agent.rpm
-    rm amazon-cloudwatch-agent.rpm
+    wget -q https://s3.amazonaws.com/amazoncloudwatch-agent/amazon_linux/${CW_ARCH}/latest/amazon-cloudwatch-agent.rpm -O /tmp/amazon-cloudwatch-agent.rpm &&
+      rpm -U /tmp/amazon-cloudwatch-agent.rpm &&
+      rm /tmp/amazon-cloudwatch-agent.rpm
+  else
+    return 1
+  fi
+}
+
+# Install (unless baked), configure and start the CloudWatch agent. The agent reads each log
+# file from its beginning when it first sees it, so lines logged before it started are backfilled.
+setup_cloudwatch_logs() {
+  if is_baked cloudwatch; then
+    log "CloudWatch agent baked into AMI, skipping install"
+  else
+    install_cloudwatch_agent || return 1
   fi
 
   # Build CloudWatch config
-  cat > /opt/aws/amazon-cloudwatch-agent/etc/amazon-cloudwatch-agent.json << EOF
+  cat > /opt/aws/amazon-cloudwatch-agent/etc/amazon-cloudwatch-agent.json << EOF || return 1
 {
   "agent": {
     "run_as_user": "cwagent"
@@ -178,6 +278,8 @@ if [ "$cloudwatch_logs_group" != "" ]; then
           { "file_path": "/tmp/job-started-hook.log"   , "log_group_name": "$cloudwatch_logs_group", "log_stream_name": "{instance_id}/job-started"  , "timezone": "UTC" },
           { "file_path": "/tmp/job-completed-hook.log" , "log_group_name": "$cloudwatch_logs_group", "log_stream_name": "{instance_id}/job-completed", "timezone": "UTC" },
           { "file_path": "/tmp/termination-check.log"  , "log_group_name": "$cloudwatch_logs_group", "log_stream_name": "{instance_id}/termination"  , "timezone": "UTC" },
+          { "file_path": "/var/log/spot-interruption.log", "log_group_name": "$cloudwatch_logs_group", "log_stream_name": "{instance_id}/spot-interruption", "timezone": "UTC" },
+          { "file_path": "/var/log/runner-boot-profile.log", "log_group_name": "$cloudwatch_logs_group", "log_stream_name": "{instance_id}/boot-profile", "timezone": "UTC" },
           { "file_path": "/tmp/runner-*-config.log"    , "log_group_name": "$cloudwatch_logs_group", "log_stream_name": "{instance_id}/runner-config", "timezone": "UTC" },
           { "file_path": "$homedir/_diag/Runner_**.log", "log_group_name": "$cloudwatch_logs_group", "log_stream_name": "{instance_id}/runner-diag"  , "timezone": "UTC" },
           { "file_path": "$homedir/_diag/Worker_**.log", "log_group_name": "$cloudwatch_logs_group", "log_stream_name": "{instance_id}/worker-diag"  , "timezone": "UTC" }
@@ -188,12 +290,30 @@ if [ "$cloudwatch_logs_group" != "" ]; then
 }
 EOF
 
-  if ! /opt/aws/amazon-cloudwatch-agent/bin/amazon-cloudwatch-agent-ctl -a fetch-config -m ec2 -c file:/opt/aws/amazon-cloudwatch-agent/etc/amazon-cloudwatch-agent.json -s; then
-    log_error "Failed to start CloudWatch agent"
-    terminate_instance "CloudWatch agent startup failed"
-  fi
+  /opt/aws/amazon-cloudwatch-agent/bin/amazon-cloudwatch-agent-ctl -a fetch-config -m ec2 -c file:/opt/aws/amazon-cloudwatch-agent/etc/amazon-cloudwatch-agent.json -s
+}
 
-  log "CloudWatch agent started successfully"
+# Configure CloudWatch Logs if a log group is specified, in the background (concurrently with the
+# runner download and configuration). A failure only stops log shipping, unless
+# `cloudwatch_logs_required` is set (in which case runners are registered only once it's running).
+if [ "$cloudwatch_logs_group" != "" ]; then
+  (
+    trap - ERR
+    phase_begin cloudwatch
+    if setup_cloudwatch_logs; then
+      log "CloudWatch agent started successfully"
+      phase_end cloudwatch
+    elif [ "$cloudwatch_logs_required" = "true" ]; then
+      log_error "Failed to start CloudWatch agent"
+      phase_end cloudwatch failed
+      exit 1
+    else
+      log "WARNING: Failed to start CloudWatch agent, continuing without CloudWatch Logs"
+      phase_end cloudwatch failed
+    fi
+  ) &
+  CLOUDWATCH_PID=$!
+  log "Setting up CloudWatch agent in background (PID: $CLOUDWATCH_PID)"
 fi
 
 # Configure SSH access if public key provided (useful for debugging)
@@ -235,15 +355,103 @@ else
   log "x64 detected, using: $RUNNER_URL"
 fi
 
-if command -v curl >/dev/null 2>&1; then
-  curl -L $RUNNER_URL -o /tmp/runner.tar.gz
-elif command -v wget >/dev/null 2>&1; then
-  wget -q $RUNNER_URL -O /tmp/runner.tar.gz
+# The mirror and checksum (see `runner_mirror`) are for the x64 release resolved by the launcher
+if [ "$RUNNER_URL" != "$runner_release" ]; then
+  runner_mirror_url=""
+  runner_sha256=""
+fi
+RUNNER_NAME=$(basename "${RUNNER_URL%%\?*}")
+
+# Pre-baked AMIs hold the runner tarball for the release they were baked with, and other AMIs
+# may have it pre-staged in /opt
+RUNNER_TARBALL=/tmp/runner.tar.gz
+NEED_RUNNER_DOWNLOAD=true
+if [ "$bake" = "true" ]; then
+  mkdir -p $BAKE_DIR
+  RUNNER_TARBALL=$BAKE_DIR/runner.tar.gz
+elif is_baked runner && [ -s $BAKE_DIR/runner.tar.gz ] && grep -qF "\"runner_release\": \"$RUNNER_URL\"" $BAKE_MANIFEST; then
+  RUNNER_TARBALL=$BAKE_DIR/runner.tar.gz
+  NEED_RUNNER_DOWNLOAD=false
+  log "Runner baked into AMI, skipping download"
 else
-  log_error "Neither curl nor wget found. Cannot download runner."
-  terminate_instance "No download tool available"
+  for staged in $BAKE_DIR/runners/$RUNNER_NAME /opt/$RUNNER_NAME /opt/actions-runner/$RUNNER_NAME; do
+    if [ -s "$staged" ] && verify_sha256 "$staged" "$runner_sha256"; then
+      RUNNER_TARBALL=$staged
+      NEED_RUNNER_DOWNLOAD=false
+      log "Using pre-staged runner tarball $staged, skipping download"
+      break
+    fi
+  done
+fi
+export RUNNER_TARBALL
+
+# Install the runner's dependencies once per instance, concurrently with the runner download
+# (rather than in each runner's configuration, where they'd contend for the dpkg lock)
+if [ "$bake" != "true" ]; then
+  rm -f $RUNNER_DEPS_STATUS
+  (
+    trap - ERR
+    prepare_runner_dependencies
+  ) &
+  DEPS_PID=$!
+  log "Preparing runner dependencies in background (PID: $DEPS_PID)"
+fi
+
+phase_begin runner-download
+if [ "$NEED_RUNNER_DOWNLOAD" = "true" ]; then
+  if ! command -v curl >/dev/null 2>&1 && ! command -v wget >/dev/null 2>&1; then
+    log_error "Neither curl nor wget found. Cannot download runner."
+    terminate_instance "No download tool available"
+  fi
+  # Try the mirror (if any) first, then the GitHub release
+  downloaded=false
+  for url in ${runner_mirror_url:+"$runner_mirror_url"} "$RUNNER_URL"; do
+    if download_file "$url" $RUNNER_TARBALL && verify_sha256 $RUNNER_TARBALL "$runner_sha256"; then
+      downloaded=true
+      break
+    fi
+    log "WARNING: Runner download from ${url%%\?*} failed or didn't match SHA-256 ${runner_sha256:-(none)}"
+    rm -f $RUNNER_TARBALL
+  done
+  if [ "$downloaded" != "true" ]; then
+    phase_end runner-download failed
+    terminate_instance "Failed to download runner $RUNNER_NAME"
+  fi
+  log "Downloaded runner binary${runner_sha256:+ (SHA-256 verified)}"
+  phase_end runner-download
+else
+  phase_end runner-download cached
+fi
+
+# Bake mode (`python -m ec2_gha bake`): run the provisioning phases, record them in a manifest
+# (read by instances launched from the resulting AMI), and stop so the AMI can be created
+if [ "$bake" = "true" ]; then
+  BAKED_PHASES=("runner")
+  log "Bake: installing runner dependencies"
+  BAKE_RUNNER_DIR=$(mktemp -d)
+  tar -xzf $RUNNER_TARBALL -C $BAKE_RUNNER_DIR
+  install_runner_dependencies $BAKE_RUNNER_DIR
+  rm -rf $BAKE_RUNNER_DIR
+  BAKED_PHASES+=("deps")
+  if install_cloudwatch_agent; then
+    BAKED_PHASES+=("cloudwatch")
+  else
+    log "WARNING: CloudWatch agent install failed, not baking it"
+  fi
+  PHASES_JSON=$(printf '"%s", ' "${BAKED_PHASES[@]}")
+  cat > $BAKE_MANIFEST << EOF
+{"version": 1, "created": "$(date -u '+%Y-%m-%dT%H:%M:%SZ')", "action_sha": "$action_sha", "runner_release": "$RUNNER_URL", "phases": [${PHASES_JSON%, }]}
+EOF
+  log "Bake complete: $(cat $BAKE_MANIFEST)"
+  # Don't ship the builder's logs and runner state to every instance launched from the AMI
+  truncate -s 0 $BOOT_PROFILE_LOG /var/log/runner-setup.log
+  rm -rf "${RUNNER_STATE_DIR:?}"/*
+  # The bake command checks the console output for this line before creating the AMI
+  echo "EC2-GHA-BAKE: complete" > /dev/console 2>/dev/null || true
+  sync
+  shutdown -h now
+  exit 0
 fi
-log "Downloaded runner binary"
 
 # Helper function to fetch scripts
 fetch_script() {
@@ -251,6 +459,11 @@ fetch_script() {
   local url="${BASE_URL}/${script_name}"
   local dest="${BIN_DIR}/${script_name}"
 
+  # Scripts embedded in the userdata were already written to $BIN_DIR
+  if [ -n "${scripts_embedded:-}" ] && [ -s "$dest" ]; then
+    return 0
+  fi
+
   if command -v curl >/dev/null 2>&1; then
     curl -fsSL "$url" -o "$dest" || {
       log_error "Failed to fetch $script_name"
@@ -267,54 +480,74 @@ fetch_script() {
   fi
 }
 
-# Fetch job tracking scripts from GitHub
+# Fetch job tracking scripts from GitHub (no-op for scripts embedded in the userdata)
 # These scripts are called by GitHub runner hooks
 log "Fetching runner hook scripts"
 BASE_URL="https://raw.githubusercontent.com/Open-Athena/ec2-gha/${action_sha}/src/ec2_gha/scripts"
 
 fetch_script "job-started-hook.sh"
 fetch_script "job-completed-hook.sh"
-fetch_script "check-runner-termination.sh"
+fetch_script "runner-termination-daemon.sh"
 
 # Replace log prefix placeholders with actual values
 sed -i "s/LOG_PREFIX_JOB_STARTED/${log_prefix_job_started}/g" $BIN_DIR/job-started-hook.sh
 sed -i "s/LOG_PREFIX_JOB_COMPLETED/${log_prefix_job_completed}/g" $BIN_DIR/job-completed-hook.sh
 
-chmod +x $BIN_DIR/job-started-hook.sh $BIN_DIR/job-completed-hook.sh $BIN_DIR/check-runner-termination.sh
+chmod +x $BIN_DIR/job-started-hook.sh $BIN_DIR/job-completed-hook.sh $BIN_DIR/runner-termination-daemon.sh
 
 # Set up job tracking directory
 mkdir -p $RUNNER_STATE_DIR/jobs
 touch $RUNNER_STATE_DIR/last-activity
 
-# Set up periodic termination check using systemd
-cat > /etc/systemd/system/runner-termination-check.service << EOF
+# Run the termination daemon (see runner-termination-daemon.sh) for the instance's lifetime
+cat > /etc/systemd/system/runner-termination.service << EOF
 [Unit]
-Description=Check GitHub runner termination conditions
+Description=Terminate the instance when its GitHub runners are idle
 After=network.target
 [Service]
-Type=oneshot
+Type=simple
 Environment="RUNNER_GRACE_PERIOD=$runner_grace_period"
 Environment="RUNNER_INITIAL_GRACE_PERIOD=$runner_initial_grace_period"
 Environment="RUNNER_POLL_INTERVAL=$runner_poll_interval"
-ExecStart=$BIN_DIR/check-runner-termination.sh
+ExecStart=$BIN_DIR/runner-termination-daemon.sh
+Restart=always
+RestartSec=5
+[Install]
+WantedBy=multi-user.target
 EOF
 
-cat > /etc/systemd/system/runner-termination-check.timer << EOF
+systemctl daemon-reload
+if [ "$warm_pool" = "true" ]; then
+  # Not enabled: on resume, it's (re)started here, from the new userdata, rather than at boot
+  # with the previous run's settings
+  systemctl restart runner-termination.service
+else
+  systemctl enable --now runner-termination.service
+fi
+
+# On spot instances, watch for interruption notices / rebalance recommendations, and drain
+if [ "$(get_metadata "instance-life-cycle")" = "spot" ]; then
+  log "Spot instance: starting interruption watcher"
+  fetch_script "spot-interruption-watcher.sh"
+  chmod +x $BIN_DIR/spot-interruption-watcher.sh
+  cat > /etc/systemd/system/spot-interruption-watcher.service << EOF
 [Unit]
-Description=Periodic GitHub runner termination check
-Requires=runner-termination-check.service
-[Timer]
-OnBootSec=60s
-OnUnitActiveSec=${runner_poll_interval}s
+Description=Drain GitHub runners on spot interruption notices
+After=network.target
+[Service]
+Type=simple
+ExecStart=$BIN_DIR/spot-interruption-watcher.sh
+Restart=always
+RestartSec=5
 [Install]
-WantedBy=timers.target
+WantedBy=multi-user.target
 EOF
+  systemctl daemon-reload
+  systemctl enable --now spot-interruption-watcher.service
+fi
 
-systemctl daemon-reload
-systemctl enable runner-termination-check.timer
-systemctl start runner-termination-check.timer
-
-# Build metadata labels (these will be added to the runner labels)
+# Build metadata labels (these will be added to the runner labels; JIT runners are registered
+# before launch, and the launcher adds these labels to them via the GitHub API)
 METADATA_LABELS=",${INSTANCE_ID},${INSTANCE_TYPE}"
 # Add instance name as a label if provided
 if [ -n "$instance_name" ]; then
@@ -322,17 +555,46 @@ if [ -n "$instance_name" ]; then
   METADATA_LABELS="${METADATA_LABELS},${INSTANCE_NAME_LABEL}"
 fi
 
+# With `cloudwatch_logs_required`, no runner is registered (and picks up a job) without log shipping
+if [ "$cloudwatch_logs_required" = "true" ] && [ -n "${CLOUDWATCH_PID:-}" ] && ! wait $CLOUDWATCH_PID; then
+  terminate_instance "CloudWatch agent startup failed"
+fi
+
 log "Setting up $RUNNERS_PER_INSTANCE runner(s)"
 
+# Extract the runner once; each runner directory is cloned from it (see `clone_runner`)
+RUNNER_BASE_DIR=$homedir/.runner-base
+phase_begin runner-extract
+extract_runner_base $RUNNER_TARBALL $RUNNER_BASE_DIR
+phase_end runner-extract
+export RUNNER_BASE_DIR
+log "Extracted runner into $RUNNER_BASE_DIR"
+
+# Wait for the dependency phase (and finish it with the runner's own installer, if needed)
+wait $DEPS_PID || log "WARNING: Dependency preparation exited with status $?"
+if [ ! -s $RUNNER_DEPS_STATUS ]; then
+  echo pending > $RUNNER_DEPS_STATUS
+fi
+finish_runner_dependencies $RUNNER_BASE_DIR
+phase_end dependencies "$(cat $RUNNER_DEPS_STATUS)"
+
 # Export functions for subprocesses (variables already exported from runner-common.sh)
 export -f configure_runner
 export -f log
 export -f log_error
+export -f imds_token
+export -f imds_fetch
 export -f get_metadata
 export -f flush_cloudwatch_logs
 export -f deregister_all_runners
 export -f debug_sleep_and_shutdown
 export -f wait_for_dpkg_lock
+export -f is_baked
+export -f install_runner_dependencies
+export -f clone_runner
+export -f uptime_s
+export -f phase_begin
+export -f phase_end
 
 # Parse space-delimited tokens and pipe-delimited labels
 IFS=' ' read -ra tokens <<< "$runner_tokens"
@@ -353,7 +615,7 @@ for i in ${!tokens[@]}; do
   (
     # Override ERR trap in subshell to prevent global side effects
     trap 'echo "Subshell error on line $LINENO" >&2; exit 1' ERR
-    configure_runner $i "$token" "${label}$METADATA_LABELS" "$homedir" "$repo" "$INSTANCE_ID" "$runner_grace_period" "$runner_initial_grace_period"
+    configure_runner $i "$token" "${label}$METADATA_LABELS" "$homedir" "$repo" "$INSTANCE_ID" "$runner_grace_period" "$runner_initial_grace_period" "${runner_jit:-false}"
     echo $? > /tmp/runner-$i-status
   ) &
   pids+=($!)
@@ -388,6 +650,8 @@ fi
 if [ $succeeded -gt 0 ]; then
   log "$succeeded runner(s) registered and started successfully"
   touch $RUNNER_STATE_DIR/registered
+  # Ended by the job-started hook, when a runner picks up the instance's first job
+  phase_begin first-job
 else
   log_error "No runners registered successfully"
   terminate_instance "No runners registered successfully"
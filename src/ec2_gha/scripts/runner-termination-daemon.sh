@@ -0,0 +1,173 @@
+#!/bin/bash
+# GitHub Actions runner termination daemon
+# Runs as a systemd service for the instance's lifetime, and shuts the instance down once no jobs
+# are running and it has been idle for longer than the grace period. Termination conditions are
+# evaluated when something changes (rather than on a timer): a hook reports a job starting or
+# completing (see `notify_termination_daemon`), a job file is created or removed, the activity
+# timestamp is touched, a runner process exits, or the idle deadline (last activity + grace) is
+# reached.
+
+exec >> /tmp/termination-check.log 2>&1
+
+# Source common functions and variables
+source /usr/local/bin/runner-common.sh
+
+# File paths for tracking
+A="$RUNNER_STATE_DIR/last-activity"
+J="$RUNNER_STATE_DIR/jobs"
+H="$RUNNER_STATE_DIR/has-run-job"
+Q="$TERMINATION_EVENTS"  # FIFO of events that trigger an evaluation
+
+# Without inotifywait (inotify-tools), file changes not reported by the hooks are only noticed by
+# polling at this interval
+POLL=${RUNNER_POLL_INTERVAL:-10}
+# While jobs are running, runner processes are re-checked at least this often, in case an event
+# was missed
+RECHECK=60
+
+mkdir -p $J
+if [ ! -p $Q ]; then
+  rm -f $Q
+  mkfifo -m 600 $Q
+fi
+# Opened read-write, so reads wait for events (rather than seeing EOF) while no writer is open
+exec 3<> $Q
+
+# Event sources write one line per event to the FIFO
+if command -v inotifywait > /dev/null 2>&1; then
+  EVENT_DRIVEN=true
+  inotifywait -m -q -e create,delete,moved_to,moved_from --format 'job %e %f' $J > $Q &
+  inotifywait -m -q -e create,attrib,close_write --format 'state %e %f' --exclude termination-events $RUNNER_STATE_DIR > $Q &
+  log "Termination daemon started (inotify)"
+else
+  EVENT_DRIVEN=false
+  log "Termination daemon started (inotifywait not found, checking every ${POLL}s)"
+fi
+trap 'kill $(jobs -p) 2> /dev/null' EXIT
+
+# Runner process exits (waitpid uses a pidfd; `tail --pid` polls once a second)
+declare -A watched
+watch_exit() {
+  local pid=$1
+  [ -n "${watched[$pid]:-}" ] && return 0
+  watched[$pid]=1
+  (
+    waitpid $pid 2> /dev/null || tail --pid=$pid -f /dev/null
+    echo "exit $pid" > $Q
+  ) &
+}
+
+handle_event() {
+  case "$1" in
+    exit\ *) unset "watched[${1#exit }]" ;;
+  esac
+}
+
+# Milliseconds as seconds, for logs and `read -t`
+ms_to_s() { printf '%d.%03d' $(($1 / 1000)) $(($1 % 1000)); }
+
+# Evaluate the termination conditions; shut down, or set $TIMEOUT to when to evaluate next
+evaluate() {
+  local N pid cmd f name idx status
+  # Current time in milliseconds ($EPOCHREALTIME needs no fork, but bash 5)
+  if [ -n "${EPOCHREALTIME:-}" ]; then
+    N=${EPOCHREALTIME/[.,]/}
+    N=$((10#$N / 1000))
+  else
+    N=$(date +%s%3N)
+  fi
+
+  # Runner processes by runner index (one pgrep for all runners). For a job to be truly running,
+  # we need BOTH Listener AND Worker processes; Listener alone means the runner is idle.
+  local -A listener=() worker=()
+  while read -r pid cmd; do
+    [[ "$cmd" =~ runner-([0-9]+)/.*Runner\.(Listener|Worker) ]] || continue
+    if [ "${BASH_REMATCH[2]}" = "Listener" ]; then
+      listener[${BASH_REMATCH[1]}]=$pid
+    else
+      worker[${BASH_REMATCH[1]}]=$pid
+    fi
+  done < <(pgrep -af 'Runner\.(Listener|Worker)')
+  for pid in "${listener[@]}" "${worker[@]}"; do
+    watch_exit $pid
+  done
+
+  # Check job files against runner processes (format: RUNID-JOBNAME-RUNNER.job)
+  local R=0
+  for f in $J/*.job; do
+    [ -f "$f" ] || continue
+    status=""
+    read -r status < "$f" || true
+    [[ "$status" == *'"status":"running"'* ]] || continue
+    name=${f##*/}
+    idx=${name%.job}
+    idx=${idx##*-}
+    if [ -n "${listener[$idx]:-}" ] && [ -n "${worker[$idx]:-}" ]; then
+      # Job is truly running; update its heartbeat. If that fails (likely disk full), the hooks
+      # can't be relied on either, so stop tracking the job.
+      if touch "$f" 2> /dev/null; then
+        R=$((R + 1))
+      else
+        log "ERROR: Can't update job file $name (disk full?) - removing it"
+        rm -f "$f"
+      fi
+    elif [ -n "${listener[$idx]:-}" ]; then
+      # Listener exists but no Worker - job has likely failed/completed but hook couldn't run
+      log "WARNING: Runner $idx Listener alive but Worker dead - job likely completed"
+      rm -f "$f"
+      touch "$A"  # Update last activity since we just cleaned up a job
+    else
+      # No Listener at all - runner is completely dead
+      log "WARNING: Job file $name exists but runner $idx is dead"
+      rm -f "$f"
+    fi
+  done
+
+  # Ensure activity file exists and get its timestamp (in milliseconds)
+  [ ! -f "$A" ] && touch "$A"
+  local L=$(date -r "$A" +%s%3N 2> /dev/null || echo 0)
+  local I=$((N - L))
+
+  # Determine grace period based on whether any job has run yet
+  local G
+  [ -f "$H" ] && G=${RUNNER_GRACE_PERIOD:-60} || G=${RUNNER_INITIAL_GRACE_PERIOD:-180}
+  # Draining after a spot interruption notice: no grace period, shut down as soon as jobs finish
+  [ -f "$RUNNER_STATE_DIR/draining" ] && G=0
+
+  if [ $R -eq 0 ] && [ $I -ge $((G * 1000)) ]; then
+    log "TERMINATING: idle $(ms_to_s $I) > grace $G"
+    deregister_all_runners
+    flush_cloudwatch_logs
+    debug_sleep_and_shutdown
+    exit 0
+  fi
+
+  # Next check, unless an event comes first: a re-check while jobs are running, otherwise exactly
+  # at the idle deadline
+  local next
+  if [ $R -gt 0 ]; then
+    log "$R job(s) running"
+    next=$((RECHECK * 1000))
+  else
+    log "Idle $((I / 1000))/$G sec"
+    next=$((G * 1000 - I))
+  fi
+  if [ "$EVENT_DRIVEN" != "true" ] && [ $next -gt $((POLL * 1000)) ]; then
+    next=$((POLL * 1000))
+  fi
+  [ $next -lt 10 ] && next=10
+  TIMEOUT=$(ms_to_s $next)
+  return 0
+}
+
+evaluate
+while true; do
+  if read -r -t $TIMEOUT event <&3; then
+    handle_event "$event"
+    # Coalesce bursts of events (e.g. a job file removed, and the activity timestamp touched)
+    while read -r -t 0.2 event <&3; do
+      handle_event "$event"
+    done
+  fi
+  evaluate
+done
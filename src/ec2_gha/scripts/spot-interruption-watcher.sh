@@ -0,0 +1,80 @@
+#!/bin/bash
+# Spot interruption watcher
+# Runs as a systemd service on spot instances, polling instance metadata for spot interruption
+# notices and rebalance recommendations. On a notice, the instance is drained: it is marked as
+# draining (so the termination check shuts it down as soon as no jobs are running), and runners
+# are deregistered as soon as they are idle, so GitHub stops assigning them jobs.
+
+exec >> /tmp/spot-interruption-watcher.log 2>&1
+
+# Source common functions and variables
+source /usr/local/bin/runner-common.sh
+
+J="$RUNNER_STATE_DIR/jobs"
+D="$RUNNER_STATE_DIR/draining"
+E=/var/log/spot-interruption.log  # Structured (JSON lines) interruption events
+POLL=${SPOT_POLL_INTERVAL:-5}
+
+# Metadata path lookups (with the shared, cached IMDSv2 token)
+imds_get() { imds_fetch "meta-data/$1"; }
+
+INSTANCE_ID=$(get_metadata instance-id)
+
+# Append a JSON event: emit_event TYPE DETAIL_JSON [EXTRA_FIELDS_JSON]
+emit_event() {
+  local detail="${2:-null}"
+  [[ "$detail" == \{* ]] || detail=null
+  echo "{\"time\":\"$(date -u +%Y-%m-%dT%H:%M:%SZ)\",\"instance_id\":\"$INSTANCE_ID\",\"event\":\"$1\",\"detail\":$detail${3:+,$3}}" >> $E
+}
+
+# Deregister runners that aren't running a job (JIT runners are only stopped, see `deregister_runner`);
+# busy runners are retried on each poll
+declare -A drained
+drain_idle_runners() {
+  local deregistered=() stopped=() busy=()
+  for RUNNER_DIR in $homedir/runner-*; do
+    [ -f "$RUNNER_DIR/config.sh" ] || continue
+    local idx=${RUNNER_DIR##*-}
+    [ -n "${drained[$idx]:-}" ] && continue
+    if ls $J/*-$idx.job >$dn 2>&1; then
+      busy+=($idx)
+      continue
+    fi
+    deregister_runner "$RUNNER_DIR"
+    drained[$idx]=1
+    if [ -f "$RUNNER_DIR/.runner-jit" ]; then
+      stopped+=($idx)
+    else
+      deregistered+=($idx)
+    fi
+  done
+  DEREGISTERED=$(IFS=,; echo "${deregistered[*]}")
+  STOPPED=$(IFS=,; echo "${stopped[*]}")
+  BUSY=$(IFS=,; echo "${busy[*]}")
+  RUNNERS_JSON="\"deregistered_runners\":[$DEREGISTERED],\"stopped_runners\":[$STOPPED],\"busy_runners\":[$BUSY]"
+}
+
+log "Watching for spot interruption notices (every ${POLL}s)"
+notice=""
+while true; do
+  # An interruption notice supersedes a rebalance recommendation
+  if [ "$notice" != "instance-action" ] && detail=$(imds_get spot/instance-action); then
+    notice="instance-action"
+  elif [ -z "$notice" ] && detail=$(imds_get events/recommendations/rebalance); then
+    notice="rebalance-recommendation"
+  else
+    detail=""
+  fi
+
+  if [ -n "$detail" ]; then
+    log "Spot $notice notice received: $detail; draining"
+    touch "$D"
+    notify_termination_daemon draining
+    drain_idle_runners
+    emit_event "$notice" "$detail" "$RUNNERS_JSON"
+  elif [ -n "$notice" ]; then
+    drain_idle_runners
+    [ -n "$DEREGISTERED$STOPPED" ] && emit_event "runners-drained" "" "$RUNNERS_JSON"
+  fi
+  sleep $POLL
+done
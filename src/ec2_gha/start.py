@@ -1,18 +1,79 @@
 import importlib.resources
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
+from functools import lru_cache
 from os import environ
 from string import Template
+from types import MappingProxyType
+from typing import Callable, Iterator, Mapping
+import base64
+import gzip
+import hashlib
 import json
+import re
 import subprocess
+import time
 
-import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError, WaiterError
 from gha_runner import gh
 from gha_runner.clouddeployment import CreateCloudInstance
-from gha_runner.helper.workflow_cmds import output
+from gha_runner.helper.workflow_cmds import output, warning
 from copy import deepcopy
 
-from ec2_gha.defaults import AUTO, RUNNER_REGISTRATION_TIMEOUT
+from ec2_gha import profiling
+from ec2_gha.ami_cache import AmiMetadataCache
+from ec2_gha.aws import get_client
+from ec2_gha.gh import JitRunnerConfig
+from ec2_gha.runner_mirror import resolve_runner_source
+from ec2_gha.defaults import AMI_CACHE_TTL, AUTO, CLOUDWATCH_LOGS_REQUIRED, FLEET_ALLOCATION_STRATEGY, JIT_CONFIG, LAUNCH_CONCURRENCY, LAUNCH_TEMPLATE, RUNNER_REGISTRATION_TIMEOUT, SPOT, SPOT_FALLBACK, SPOT_TIMEOUT, USERDATA_MODE, WARM_POOL, WARM_POOL_MAX_AGE, WARM_POOL_SIZE
+from ec2_gha.warm_pool import WarmPool, config_hash, start_claimed
+
+# UserData template for each `userdata_mode`
+USERDATA_TEMPLATES = {
+    "fetch": "templates/user-script.sh.templ",
+    "embedded": "templates/user-script-embedded.sh.templ",
+}
+
+# `run_instances` parameters that move into the Launch Template in `launch_template` mode
+LAUNCH_TEMPLATE_KEYS = (
+    "ImageId",
+    "InstanceType",
+    "InstanceInitiatedShutdownBehavior",
+    "SecurityGroupIds",
+    "IamInstanceProfile",
+    "KeyName",
+    "BlockDeviceMappings",
+)
+
+# `run_instances`/`CreateFleet` error codes that mean "no spot capacity (right now)"
+SPOT_CAPACITY_ERRORS = (
+    "InsufficientInstanceCapacity",
+    "InsufficientCapacity",
+    "MaxSpotInstanceCountExceeded",
+    "SpotMaxPriceTooLow",
+    "UnfulfillableCapacity",
+)
+
+# Approximate size of one encoded JIT runner config, and of the rest of the (`fetch`-mode) UserData
+JIT_CONFIG_SIZE = 2200
+USER_DATA_BASE_SIZE = 3000
+
+# EC2 limits on the tags of one resource (fleet instances receive their runner tokens as tags)
+MAX_TAGS = 50
+MAX_TAG_VALUE_LENGTH = 256
+
+# Instance states from which an instance will never reach "running" (as in boto's `instance_running` waiter)
+FAILED_INSTANCE_STATES = ("shutting-down", "terminated", "stopping")
+
+# Packaged scripts embedded in the UserData in `embedded` mode, and where the instance expects them.
+# Only those needed before the runners register; runner-setup.sh fetches the termination daemon and
+# spot interruption watcher (which start after the runner download) like in `fetch` mode.
+EMBEDDED_SCRIPTS = {
+    "scripts/runner-setup.sh": "/tmp/runner-setup.sh",
+    "templates/shared-functions.sh": "/tmp/shared-functions.sh",
+    "scripts/job-started-hook.sh": "/usr/local/bin/job-started-hook.sh",
+    "scripts/job-completed-hook.sh": "/usr/local/bin/job-completed-hook.sh",
+}
 
 
 def resolve_ref_to_sha(ref: str) -> str:
@@ -35,9 +96,10 @@ def resolve_ref_to_sha(ref: str) -> str:
     """
     # Handle Docker container ownership issues by marking directory as safe
     # This is needed when running in GitHub Actions Docker containers where
-    # the workspace is owned by a different user than the container user
+    # the workspace is owned by a different user than the container user.
+    # `--replace-all` (rather than `--add`) keeps a single entry no matter how often this runs.
     subprocess.run(
-        ['git', 'config', '--global', '--add', 'safe.directory', '/github/workspace'],
+        ['git', 'config', '--global', '--replace-all', 'safe.directory', '/github/workspace', '^/github/workspace$'],
         capture_output=True,
         text=True,
         check=True  # Fail if this doesn't work - we need it for the next command
@@ -67,6 +129,207 @@ def resolve_ref_to_sha(ref: str) -> str:
         )
 
 
+def resolve_tokens(tokens: list[str | JitRunnerConfig] | Future) -> list[str | JitRunnerConfig]:
+    """Return an instance's runner tokens, waiting for them if they are still being created."""
+    return tokens.result() if isinstance(tokens, Future) else tokens
+
+
+def remove_jit_runners(token_groups, remover: Callable[[int], object] | None):
+    """Remove the JIT runners of instances that weren't launched (they're registered before launch).
+
+    Parameters
+    ----------
+    token_groups : Iterable[list[str | JitRunnerConfig] | Future]
+        Runner tokens of each such instance (or futures resolving to them; failed futures,
+        and registration tokens, are skipped).
+    remover : Callable[[int], object] | None
+        Removes a runner by ID (``PooledGitHubInstance.delete_runner``). Errors are printed, not raised.
+    """
+    if remover is None:
+        return
+    for tokens in token_groups:
+        try:
+            tokens = resolve_tokens(tokens)
+        except Exception:
+            continue
+        for token in tokens:
+            if not isinstance(token, JitRunnerConfig) or not token.runner_id:
+                continue
+            try:
+                remover(token.runner_id)
+                print(f"Removed JIT runner {token.runner_id} ({token.label}), whose instance wasn't launched")
+            except Exception as e:
+                print(f"Warning: could not remove JIT runner {token.runner_id} ({token.label}): {e}")
+
+
+def is_truthy(value) -> bool:
+    """Interpret a boolean-ish action input ("true", "1", "yes", "on")."""
+    return str(value).strip().lower() in ("true", "1", "yes", "on")
+
+
+def split_list(value: str) -> list[str]:
+    """Split a comma-separated action input into its non-empty, stripped items."""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def with_market(params: dict, market: str, max_price: str = "") -> dict:
+    """Return a copy of ``run_instances`` params for the given market ("spot" or "on-demand").
+
+    Adds ``InstanceMarketOptions`` for spot launches, and records the market in a ``Market`` tag.
+    """
+    params = deepcopy(params)
+    params.pop("InstanceMarketOptions", None)
+    if market == "spot":
+        spot_options = {"SpotInstanceType": "one-time", "InstanceInterruptionBehavior": "terminate"}
+        if max_price:
+            spot_options["MaxPrice"] = max_price
+        params["InstanceMarketOptions"] = {"MarketType": "spot", "SpotOptions": spot_options}
+    specs = params.setdefault("TagSpecifications", [{"ResourceType": "instance", "Tags": []}])
+    specs[0]["Tags"] = [tag for tag in specs[0]["Tags"] if tag["Key"] != "Market"] + [{"Key": "Market", "Value": market}]
+    return params
+
+
+def check_jit_user_data_size(runners_per_instance: int, userdata: str = "", script: str = ""):
+    """Raise if ``runners_per_instance`` JIT runner configs (with ``userdata`` and ``script``) won't fit in 16KB of UserData.
+
+    Checked before any JIT config is created, since creating one registers a runner.
+
+    Raises
+    ------
+    ValueError
+        If the estimated UserData size exceeds the limit.
+    """
+    size = USER_DATA_BASE_SIZE + len(userdata or "") + len(script or "") + runners_per_instance * JIT_CONFIG_SIZE
+    if size > 16384:
+        raise ValueError(
+            f"jit_config with runners_per_instance={runners_per_instance} needs ~{size} bytes of UserData "
+            f"(~{JIT_CONFIG_SIZE} per runner), over the 16KB limit; use fewer runners per instance, or jit_config: false"
+        )
+
+
+def metadata_labels(instance_id: str, instance_type: str, instance_name: str = "") -> list[str]:
+    """The instance labels ``runner-setup.sh`` adds to each runner: instance ID, type, and (sanitized) name."""
+    labels = [instance_id, instance_type]
+    name_label = re.sub(r"[^A-Za-z0-9_#-]", "", re.sub(r"[ /]", "-", instance_name))
+    if name_label:
+        labels.append(name_label)
+    return labels
+
+
+def verify_packaged_scripts(sha: str):
+    """Verify that the packaged scripts match those committed at ``sha``.
+
+    Compares the Git blob hash of each packaged script in ``EMBEDDED_SCRIPTS``
+    against ``git ls-tree`` of the resolved SHA in the local checkout.
+
+    Parameters
+    ----------
+    sha : str
+        The resolved ``action_ref`` commit SHA.
+
+    Raises
+    ------
+    RuntimeError
+        If the tree can't be listed, or a packaged script differs from the one at ``sha``.
+    """
+    try:
+        result = subprocess.run(
+            ['git', 'ls-tree', '-r', sha, '--', 'src/ec2_gha'],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(
+            f"Failed to list scripts at {sha} for verification. "
+            f"Error: {e.stderr or str(e)}"
+        )
+    # Lines look like "100644 blob <blob sha>\tsrc/ec2_gha/scripts/runner-setup.sh"
+    blobs = {}
+    for line in result.stdout.splitlines():
+        meta, _, path = line.partition("\t")
+        blobs[path] = meta.split()[-1]
+
+    for name in EMBEDDED_SCRIPTS:
+        content = importlib.resources.files("ec2_gha").joinpath(name).read_bytes()
+        blob = hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+        if blobs.get(f"src/ec2_gha/{name}") != blob:
+            raise RuntimeError(f"Packaged {name} does not match the version at {sha}")
+    print(f"Verified {len(EMBEDDED_SCRIPTS)} embedded script(s) against {sha}")
+
+
+@lru_cache(maxsize=None)
+def render_embedded_scripts() -> str:
+    """Render the packaged scripts as heredocs that write them to their on-instance paths.
+
+    Returns
+    -------
+    str
+        Shell snippet to be substituted into the embedded UserData template.
+    """
+    files = importlib.resources.files("ec2_gha")
+    blocks = []
+    for name, dest in EMBEDDED_SCRIPTS.items():
+        content = files.joinpath(name).read_text()
+        if not content.endswith("\n"):
+            content += "\n"
+        blocks.append(f"cat > {dest} << 'EC2_GHA_EOF'\n{content}EC2_GHA_EOF\nchmod +x {dest}")
+    return "\n".join(blocks)
+
+
+@lru_cache(maxsize=None)
+def load_template(name: str) -> Template:
+    """Load and compile a packaged template (cached for the life of the process).
+
+    Parameters
+    ----------
+    name : str
+        Path of the template relative to the ``ec2_gha`` package.
+
+    Returns
+    -------
+    Template
+        The compiled template.
+    """
+    template = importlib.resources.files("ec2_gha").joinpath(name)
+    with template.open() as f:
+        return Template(f.read())
+
+
+@dataclass(frozen=True)
+class LaunchPlan:
+    """Launch inputs shared by every instance in a run, computed once per run.
+
+    Parameters
+    ----------
+    user_data_params : Mapping[str, str]
+        Template parameters common to all instances (per-instance tokens,
+        labels and name are filled in at launch time).
+    shared_tags : tuple[dict[str, str], ...]
+        Default tags shared by all instances (everything except ``Name``).
+    block_device_mappings : tuple[dict, ...]
+        Block device mappings with the root volume resized, or empty to use the AMI defaults.
+    default_instance_name : str
+        Name pattern used when no ``instance_name`` was provided.
+    launch_template : Mapping[str, str] | None
+        ``LaunchTemplate`` specification (ID and version) to launch from, or None to
+        pass the full parameter set to every ``run_instances`` call.
+    pooled_instances : tuple[str, ...]
+        Stopped warm-pool instances claimed for this run; instance ``idx`` resumes
+        ``pooled_instances[idx]`` (if any) instead of launching a new one.
+    pool_tags : tuple[dict[str, str], ...]
+        Tags adding newly launched instances to the warm pool (empty without ``warm_pool``).
+    """
+
+    user_data_params: Mapping[str, str]
+    shared_tags: tuple[dict[str, str], ...] = ()
+    block_device_mappings: tuple[dict, ...] = ()
+    default_instance_name: str = "$repo/$name#$run"
+    launch_template: Mapping[str, str] | None = None
+    pooled_instances: tuple[str, ...] = ()
+    pool_tags: tuple[dict[str, str], ...] = ()
+
+
 @dataclass
 class StartAWS(CreateCloudInstance):
     """Class to start GitHub Actions runners on AWS.
@@ -81,42 +344,104 @@ class StartAWS(CreateCloudInstance):
         The name of the region to use.
     repo : str
         The repository to use.
+    ami_cache_dir : str
+        Directory in which to persist AMI metadata between runs. Defaults to an empty string (in-memory only).
+    ami_cache_ttl : str
+        Maximum age in seconds of persisted AMI metadata. Defaults to "86400" (1 day).
     cloudwatch_logs_group : str
         CloudWatch Logs group name for streaming runner logs. Defaults to an empty string.
+    cloudwatch_logs_required : str
+        Whether instances terminate if the CloudWatch agent fails to start (otherwise they run
+        without log shipping). Defaults to "false".
+    fleet_allocation_strategy : str
+        On-demand ``CreateFleet`` allocation strategy ("lowest-price" or "prioritized", which
+        follows the order of ``instance_types`` and ``subnet_ids``). Defaults to "lowest-price".
     gh_runner_tokens : list[str]
         A list of GitHub runner tokens. Defaults to an empty list.
+    grouped_runner_tokens : list[list[str] | Future]
+        Runner tokens per instance (takes precedence over ``gh_runner_tokens``). An entry
+        may be a future that resolves to the tokens, in which case that instance is
+        launched as soon as its tokens are available. Defaults to an empty list.
     home_dir : str
         The home directory of the user. If not provided, will be inferred from the AMI.
     iam_instance_profile : str
         The name of the IAM role to use. Defaults to an empty string.
+    jit_config : str
+        Whether runner "tokens" are just-in-time runner configs (``JitRunnerConfig``, created
+        and registered before launch), started with ``run.sh --jitconfig`` instead of being
+        registered by ``config.sh`` at boot. Defaults to "false".
+    instance_types : str
+        Comma-separated, prioritized instance types to launch with a single ``CreateFleet``
+        call (falling back across types and subnets as capacity allows). Defaults to an
+        empty string (``run_instances`` with ``instance_type``).
     key_name : str
         The name of the EC2 key pair to use for SSH access. Defaults to an empty string.
     labels : str
         A comma-separated list of labels to apply to the runner. Defaults to an empty string.
+    launch_template : str
+        Whether to launch from an EC2 Launch Template (created on first use, and reused by
+        later runs with the same configuration) instead of passing the full parameter set to
+        each ``run_instances`` call. Defaults to "false".
+    launch_concurrency : int
+        Maximum number of concurrent ``run_instances`` calls. Defaults to 16.
     max_instance_lifetime : str
         Maximum instance lifetime in minutes before automatic shutdown. Defaults to "360" (6 hours).
     root_device_size : str
         The size of the root device. Defaults to 0 which uses the default.
     runner_initial_grace_period : str
         Grace period in seconds before terminating if no jobs have started. Defaults to "180".
+    runner_labeler : Callable[[int, list[str]], object] | None
+        Adds labels to a registered runner (``PooledGitHubInstance.add_runner_labels``). Used to
+        give JIT runners, which are registered before launch, the instance ID/type/name labels
+        other runners get at boot. Defaults to None (JIT runners only get their registered labels).
+    runner_remover : Callable[[int], object] | None
+        Removes a registered runner (``PooledGitHubInstance.delete_runner``). Used to remove the
+        JIT runners of instances that fail to launch. Defaults to None (they're left registered).
     runner_grace_period : str
         Grace period in seconds before terminating instance after last job completes. Defaults to "60".
     runner_poll_interval : str
-        How often (in seconds) to check termination conditions. Defaults to "10".
+        How often (in seconds) to check termination conditions, on instances without inotify-tools
+        (otherwise they're checked on job, process and deadline events). Defaults to "10".
+    runner_mirror : str
+        Mirror of the runner tarball: ``s3://bucket/prefix`` (populated on first use) or an
+        HTTP(S) base URL (see ``ec2_gha.runner_mirror``). Instances verify its SHA-256, and fall
+        back to the GitHub release. Defaults to an empty string (download from GitHub).
     runners_per_instance : int
         Number of runners to register per instance. Defaults to 1.
     script : str
         The script to run on the instance. Defaults to an empty string.
     security_group_id : str
         The ID of the security group to use. Defaults to an empty string.
+    spot : str
+        Whether to launch spot instances (capacity-optimized, for fleet launches). Defaults to "false".
+    spot_fallback : str
+        Whether to fall back to on-demand if no spot capacity is available within
+        ``spot_timeout``. Defaults to "true".
+    spot_max_price : str
+        Maximum hourly spot price (USD). Defaults to an empty string (the on-demand price).
+    spot_timeout : str
+        How long (in seconds) to retry spot capacity errors before falling back. Defaults to "60".
     ssh_pubkey : str
         SSH public key to add to authorized_keys. Defaults to an empty string.
     subnet_id : str
         The ID of the subnet to use. Defaults to an empty string.
+    subnet_ids : str
+        Comma-separated, prioritized subnet IDs for ``CreateFleet`` launches (see
+        ``instance_types``). Defaults to an empty string.
     tags : list[dict[str, str]]
         A list of tags to apply to the instance. Defaults to an empty list.
     userdata : str
         Custom user data script to prepend to the runner setup. Defaults to an empty string.
+    userdata_mode : str
+        "fetch" (instances download the runner scripts from GitHub) or "embedded" (scripts
+        are gzip-compressed into the UserData). Defaults to "fetch".
+    warm_pool : str
+        Whether idle instances stop (rather than terminate), to be resumed by later runs
+        with the same configuration (see ``ec2_gha.warm_pool``). Defaults to "false".
+    warm_pool_max_age : str
+        Maximum age in minutes (since first launch) of pooled instances. Defaults to "1440" (1 day).
+    warm_pool_size : str
+        Maximum number of stopped instances kept in the pool. Defaults to "4".
 
     """
 
@@ -124,28 +449,75 @@ class StartAWS(CreateCloudInstance):
     instance_type: str
     region_name: str
     repo: str
+    ami_cache_dir: str = ""
+    ami_cache_ttl: str = AMI_CACHE_TTL
     cloudwatch_logs_group: str = ""
+    cloudwatch_logs_required: str = CLOUDWATCH_LOGS_REQUIRED
     debug: str = ""
+    fleet_allocation_strategy: str = FLEET_ALLOCATION_STRATEGY
     gh_runner_tokens: list[str] = field(default_factory=list)
-    grouped_runner_tokens: list[list[str]] = field(default_factory=list)
+    grouped_runner_tokens: list[list[str] | Future] = field(default_factory=list)
     home_dir: str = ""
     iam_instance_profile: str = ""
     instance_name: str = ""
+    instance_types: str = ""
+    jit_config: str = JIT_CONFIG
     key_name: str = ""
     labels: str = ""
+    launch_concurrency: int = LAUNCH_CONCURRENCY
+    launch_template: str = LAUNCH_TEMPLATE
     max_instance_lifetime: str = "360"
     root_device_size: str = "0"
     runner_grace_period: str = "60"
     runner_initial_grace_period: str = "180"
+    runner_labeler: Callable[[int, list[str]], object] | None = None
+    runner_remover: Callable[[int], object] | None = None
     runner_poll_interval: str = "10"
+    runner_mirror: str = ""
     runners_per_instance: int = 1
     runner_release: str = ""
     script: str = ""
     security_group_id: str = ""
+    spot: str = SPOT
+    spot_fallback: str = SPOT_FALLBACK
+    spot_max_price: str = ""
+    spot_timeout: str = SPOT_TIMEOUT
     ssh_pubkey: str = ""
     subnet_id: str = ""
+    subnet_ids: str = ""
     tags: list[dict[str, str]] = field(default_factory=list)
     userdata: str = ""
+    userdata_mode: str = USERDATA_MODE
+    warm_pool: str = WARM_POOL
+    warm_pool_max_age: str = WARM_POOL_MAX_AGE
+    warm_pool_size: str = WARM_POOL_SIZE
+    launch_latencies: dict[str, float] = field(default_factory=dict, init=False, repr=False)
+    launched_at: dict[str, float] = field(default_factory=dict, init=False, repr=False)
+    ready_latencies: dict[str, float] = field(default_factory=dict, init=False, repr=False)
+    pool: WarmPool | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.userdata_mode not in USERDATA_TEMPLATES:
+            raise ValueError(f"Invalid userdata_mode '{self.userdata_mode}', expected one of: {', '.join(USERDATA_TEMPLATES)}")
+        if is_truthy(self.jit_config):
+            check_jit_user_data_size(self.runners_per_instance, self.userdata, self.script)
+        if is_truthy(self.warm_pool):
+            # Stopped spot instances can't be restarted, and fleet instances share one UserData
+            if is_truthy(self.spot):
+                raise ValueError("warm_pool can't be combined with spot instances")
+            if self.use_fleet:
+                raise ValueError("warm_pool can't be combined with fleet launches (instance_types/subnet_ids)")
+        self._ami_cache = AmiMetadataCache(self.ami_cache_dir, int(self.ami_cache_ttl or AMI_CACHE_TTL))
+
+    @property
+    def use_fleet(self) -> bool:
+        """Whether instances are launched with ``CreateFleet`` (see ``instance_types``/``subnet_ids``)."""
+        return bool(split_list(self.instance_types) or split_list(self.subnet_ids))
+
+    @property
+    def shutdown_behavior(self) -> str:
+        """``InstanceInitiatedShutdownBehavior``: "stop" for warm-pool instances, otherwise "terminate"."""
+        return "stop" if is_truthy(self.warm_pool) else "terminate"
 
     def _get_template_vars(self, idx: int = None) -> dict:
         """Build template variables for instance naming.
@@ -208,13 +580,43 @@ class StartAWS(CreateCloudInstance):
 
         return template_vars
 
-    def _build_aws_params(self, user_data_params: dict, idx: int = None) -> dict:
+    def _build_shared_tags(self) -> list[dict[str, str]]:
+        """Build the default tags shared by all instances in a run.
+
+        Returns
+        -------
+        list[dict[str, str]]
+            ``Repository``, ``Workflow`` and ``URL`` tags (those not already provided by the user).
+        """
+        shared_tags = []
+        existing_keys = {tag["Key"] for tag in self.tags}
+
+        # Add repository tag if available
+        if "Repository" not in existing_keys and environ.get("GITHUB_REPOSITORY"):
+            shared_tags.append({"Key": "Repository", "Value": environ["GITHUB_REPOSITORY"]})
+
+        # Add workflow tag if available
+        if "Workflow" not in existing_keys and environ.get("GITHUB_WORKFLOW"):
+            shared_tags.append({"Key": "Workflow", "Value": environ["GITHUB_WORKFLOW"]})
+
+        # Add run URL tag if available
+        if "URL" not in existing_keys and environ.get("GITHUB_SERVER_URL") and environ.get("GITHUB_REPOSITORY") and environ.get("GITHUB_RUN_ID"):
+            gha_url = f"{environ['GITHUB_SERVER_URL']}/{environ['GITHUB_REPOSITORY']}/actions/runs/{environ['GITHUB_RUN_ID']}"
+            shared_tags.append({"Key": "URL", "Value": gha_url})
+
+        return shared_tags
+
+    def _build_aws_params(self, user_data_params: dict, idx: int = None, shared_tags: list[dict[str, str]] = None) -> dict:
         """Build the parameters for the AWS API call.
 
         Parameters
         ----------
         user_data_params : dict
             A dictionary of parameters to pass to the user
+        idx : int | None
+            Instance index for multi-instance launches
+        shared_tags : list[dict[str, str]] | None
+            Precomputed shared tags (see ``_build_shared_tags``); computed if not provided.
 
         Returns
         -------
@@ -228,7 +630,7 @@ class StartAWS(CreateCloudInstance):
             "MinCount": 1,
             "MaxCount": 1,
             "UserData": self._build_user_data(**user_data_params),
-            "InstanceInitiatedShutdownBehavior": "terminate",
+            "InstanceInitiatedShutdownBehavior": self.shutdown_behavior,
         }
         if self.subnet_id != "":
             params["SubnetId"] = self.subnet_id
@@ -248,24 +650,15 @@ class StartAWS(CreateCloudInstance):
             template_vars = self._get_template_vars(idx)
 
             # Apply the instance name template
-            from string import Template
             name_template = Template(self.instance_name)
             name_value = name_template.safe_substitute(**template_vars)
 
             default_tags.append({"Key": "Name", "Value": name_value})
 
-        # Add repository tag if available
-        if "Repository" not in existing_keys and environ.get("GITHUB_REPOSITORY"):
-            default_tags.append({"Key": "Repository", "Value": environ["GITHUB_REPOSITORY"]})
-
-        # Add workflow tag if available
-        if "Workflow" not in existing_keys and environ.get("GITHUB_WORKFLOW"):
-            default_tags.append({"Key": "Workflow", "Value": environ["GITHUB_WORKFLOW"]})
-
-        # Add run URL tag if available
-        if "URL" not in existing_keys and environ.get("GITHUB_SERVER_URL") and environ.get("GITHUB_REPOSITORY") and environ.get("GITHUB_RUN_ID"):
-            gha_url = f"{environ['GITHUB_SERVER_URL']}/{environ['GITHUB_REPOSITORY']}/actions/runs/{environ['GITHUB_RUN_ID']}"
-            default_tags.append({"Key": "URL", "Value": gha_url})
+        # Add repository, workflow and run URL tags
+        if shared_tags is None:
+            shared_tags = self._build_shared_tags()
+        default_tags.extend(shared_tags)
 
         # Combine user tags with default tags
         all_tags = self.tags + default_tags
@@ -276,7 +669,7 @@ class StartAWS(CreateCloudInstance):
 
         return params
 
-    def _build_user_data(self, **kwargs) -> str:
+    def _build_user_data(self, **kwargs) -> str | bytes:
         """Build the user data script.
 
         Parameters
@@ -286,8 +679,10 @@ class StartAWS(CreateCloudInstance):
 
         Returns
         -------
-        str
-            The user data script as a string.
+        str | bytes
+            The user data script as a string, or gzip-compressed bytes in ``embedded`` mode.
+            Embedded UserData that would exceed the 16KB limit (e.g. with many runner tokens,
+            JIT configs or a large ``userdata``) falls back to ``fetch`` mode.
 
         """
         # Import log constants to inject into template
@@ -300,17 +695,33 @@ class StartAWS(CreateCloudInstance):
         kwargs['log_prefix_job_started'] = LOG_PREFIX_JOB_STARTED
         kwargs['log_prefix_job_completed'] = LOG_PREFIX_JOB_COMPLETED
 
-        # Ensure instance_name has a default value
+        # Ensure instance_name and runner_jit have default values
         kwargs.setdefault('instance_name', '')
+        kwargs.setdefault('runner_jit', 'false')
+        kwargs.setdefault('warm_pool', 'false')
+        kwargs.setdefault('bake', 'false')
+        kwargs.setdefault('cloudwatch_logs_required', 'false')
+        kwargs.setdefault('runner_mirror_url', '')
+        kwargs.setdefault('runner_sha256', '')
 
-        template = importlib.resources.files("ec2_gha").joinpath("templates/user-script.sh.templ")
-        with template.open() as f:
-            template_content = f.read()
+        embedded = self.userdata_mode == "embedded"
+        if embedded:
+            kwargs.setdefault('embedded_scripts', render_embedded_scripts())
 
         try:
-            parsed = Template(template_content)
+            parsed = load_template(USERDATA_TEMPLATES[self.userdata_mode])
             runner_script = parsed.substitute(**kwargs)
 
+            if embedded:
+                # cloud-init transparently decompresses gzipped user data
+                compressed = gzip.compress(runner_script.encode(), mtime=0)
+                script_size = len(compressed)
+                if script_size <= 16384:
+                    print(f"UserData size: {script_size} bytes gzipped from {len(runner_script)} ({script_size/16384*100:.1f}% of 16KB limit)")
+                    return compressed
+                print(f"Embedded UserData is {script_size} bytes gzipped (over the 16KB limit), falling back to fetch mode")
+                runner_script = load_template(USERDATA_TEMPLATES["fetch"]).substitute(**kwargs)
+
             # Log the final size for informational purposes
             script_size = len(runner_script)
             print(f"UserData size: {script_size} bytes ({script_size/16384*100:.1f}% of 16KB limit)")
@@ -341,51 +752,792 @@ class StartAWS(CreateCloudInstance):
         botocore.exceptions.ClientError
            If the user does not have permissions to describe images.
         """
+        # The permission probe and AMI metadata are cached (see `AmiMetadataCache`)
+        image = self._ami_cache.describe_image(client, self.region_name, self.image_id)
+        if image is None:
+            return params
+        root_device_name = image["RootDeviceName"]
+        block_devices = image["BlockDeviceMappings"]
+        for idx, block_device in enumerate(block_devices):
+            if block_device["DeviceName"] == root_device_name:
+                size_str = self.root_device_size.strip()
+                if size_str.startswith('+'):
+                    # +N means "AMI size + N GB"
+                    # Useful for disk-full testing: +2 means AMI size + 2GB
+                    current_size = block_device.get("Ebs", {}).get("VolumeSize", 8)
+                    buffer_gb = int(size_str[1:])
+                    new_size = current_size + buffer_gb
+                    block_devices[idx]["Ebs"]["VolumeSize"] = new_size
+                    params["BlockDeviceMappings"] = block_devices
+                    print(f"Setting disk size to {new_size}GB (AMI default {current_size}GB + {buffer_gb}GB)")
+                elif size_str != "0":
+                    # Explicit size in GB
+                    new_size = int(size_str)
+                    if new_size > 0:
+                        block_devices[idx]["Ebs"]["VolumeSize"] = new_size
+                        params["BlockDeviceMappings"] = block_devices
+                # else: size_str == "0" means use AMI default, do nothing
+                break
+        return params
+
+    def _build_launch_template_data(self, block_device_mappings: tuple[dict, ...] = ()) -> dict:
+        """Build the non-secret, run-independent part of the launch parameters.
+
+        Tokens, labels, the Name tag and the per-run tags are all passed at
+        launch time, so this only changes when the instance configuration does.
+
+        Parameters
+        ----------
+        block_device_mappings : tuple[dict, ...]
+            Resized root volume mappings (see ``_build_launch_plan``), if any.
+
+        Returns
+        -------
+        dict
+            ``LaunchTemplateData`` for ``create_launch_template``.
+        """
+        data = {
+            "ImageId": self.image_id,
+            "InstanceType": self.instance_type,
+            "InstanceInitiatedShutdownBehavior": self.shutdown_behavior,
+        }
+        if self.security_group_id and self.security_group_id.strip():
+            data["SecurityGroupIds"] = [self.security_group_id.strip()]
+        if self.iam_instance_profile != "":
+            data["IamInstanceProfile"] = {"Name": self.iam_instance_profile}
+        if self.key_name != "":
+            data["KeyName"] = self.key_name
+        if block_device_mappings:
+            data["BlockDeviceMappings"] = deepcopy(list(block_device_mappings))
+        return data
+
+    def _ensure_launch_template(self, ec2, data: dict) -> dict[str, str]:
+        """Find or create the Launch Template for ``data``.
+
+        Templates are named after a hash of their data, so any run (or
+        concurrent job) with the same configuration reuses the same template.
+
+        Parameters
+        ----------
+        ec2
+            The EC2 client object.
+        data : dict
+            ``LaunchTemplateData`` (see ``_build_launch_template_data``).
+
+        Returns
+        -------
+        dict[str, str]
+            ``LaunchTemplate`` specification for ``run_instances``.
+
+        Raises
+        ------
+        botocore.exceptions.ClientError
+            If the template can't be described or created.
+        """
+        key = config_hash(data)
+        name = f"ec2-gha-{key[:16]}"
         try:
-            client.describe_images(ImageIds=[self.image_id], DryRun=True)
+            templates = ec2.describe_launch_templates(LaunchTemplateNames=[name])["LaunchTemplates"]
         except ClientError as e:
-            # This is the case where we DO have access
-            if "DryRunOperation" in str(e):
-                image_options = client.describe_images(ImageIds=[self.image_id])
-                root_device_name = image_options["Images"][0]["RootDeviceName"]
-                block_devices = deepcopy(image_options["Images"][0]["BlockDeviceMappings"])
-                for idx, block_device in enumerate(block_devices):
-                    if block_device["DeviceName"] == root_device_name:
-                        size_str = self.root_device_size.strip()
-                        if size_str.startswith('+'):
-                            # +N means "AMI size + N GB"
-                            # Useful for disk-full testing: +2 means AMI size + 2GB
-                            current_size = block_device.get("Ebs", {}).get("VolumeSize", 8)
-                            buffer_gb = int(size_str[1:])
-                            new_size = current_size + buffer_gb
-                            block_devices[idx]["Ebs"]["VolumeSize"] = new_size
-                            params["BlockDeviceMappings"] = block_devices
-                            print(f"Setting disk size to {new_size}GB (AMI default {current_size}GB + {buffer_gb}GB)")
-                        elif size_str != "0":
-                            # Explicit size in GB
-                            new_size = int(size_str)
-                            if new_size > 0:
-                                block_devices[idx]["Ebs"]["VolumeSize"] = new_size
-                                params["BlockDeviceMappings"] = block_devices
-                        # else: size_str == "0" means use AMI default, do nothing
-                        break
+            if "NotFound" not in str(e):
+                raise
+            templates = []
+        if templates:
+            print(f"Reusing launch template {name} ({templates[0]['LaunchTemplateId']})")
+            return {"LaunchTemplateId": templates[0]["LaunchTemplateId"], "Version": "$Default"}
+
+        try:
+            template = ec2.create_launch_template(
+                LaunchTemplateName=name,
+                LaunchTemplateData=data,
+                TagSpecifications=[{
+                    "ResourceType": "launch-template",
+                    "Tags": [{"Key": "ec2-gha:config-hash", "Value": key}],
+                }],
+            )["LaunchTemplate"]
+        except ClientError as e:
+            # Another run created it between our describe and create calls
+            if "AlreadyExists" not in str(e):
+                raise
+            template = ec2.describe_launch_templates(LaunchTemplateNames=[name])["LaunchTemplates"][0]
+        else:
+            print(f"Created launch template {name} ({template['LaunchTemplateId']})")
+        return {"LaunchTemplateId": template["LaunchTemplateId"], "Version": "$Default"}
+
+    def _build_launch_plan(self, ec2, instance_count: int) -> LaunchPlan:
+        """Compute everything that is shared by all instances in this run.
+
+        Resolves ``action_ref`` to a SHA, fetches the AMI block-device metadata
+        (if the root disk is being resized) and builds the shared tags exactly
+        once, so that per-instance work only fills in tokens, labels and the name.
+
+        Parameters
+        ----------
+        ec2
+            The EC2 client object.
+        instance_count : int
+            Number of instances being launched (selects the default name pattern).
+
+        Returns
+        -------
+        LaunchPlan
+            The immutable launch plan.
+        """
+        # Resolve action_ref to a SHA for security and consistency
+        action_ref = environ.get("INPUT_ACTION_REF")
+        if not action_ref:
+            raise ValueError("action_ref is required but was not provided. Check that runner.yml passes it correctly.")
+        action_sha = resolve_ref_to_sha(action_ref)
+        if self.userdata_mode == "embedded":
+            verify_packaged_scripts(action_sha)
+
+        runner_source = None
+        if self.runner_mirror:
+            try:
+                runner_source = resolve_runner_source(self.runner_mirror, self.runner_release, self.region_name)
+            except (BotoCoreError, ClientError, OSError) as e:
+                warning(title="Runner mirror unavailable", message=f"Downloading the runner from GitHub: {e}")
+
+        user_data_params = {
+            "action_sha": action_sha,  # The resolved SHA
+            "cloudwatch_logs_group": self.cloudwatch_logs_group,
+            "cloudwatch_logs_required": "true" if is_truthy(self.cloudwatch_logs_required) else "false",
+            "debug": self.debug,
+            "github_workflow": environ.get("GITHUB_WORKFLOW", ""),
+            "github_run_id": environ.get("GITHUB_RUN_ID", ""),
+            "github_run_number": environ.get("GITHUB_RUN_NUMBER", ""),
+            "homedir": self.home_dir,
+            "max_instance_lifetime": self.max_instance_lifetime,
+            "repo": self.repo,
+            "runner_grace_period": self.runner_grace_period,
+            "runner_initial_grace_period": self.runner_initial_grace_period,
+            "runner_poll_interval": self.runner_poll_interval,
+            "runner_registration_timeout": environ.get("INPUT_RUNNER_REGISTRATION_TIMEOUT", "").strip() or RUNNER_REGISTRATION_TIMEOUT,
+            "runner_jit": "true" if is_truthy(self.jit_config) else "false",
+            "warm_pool": "true" if is_truthy(self.warm_pool) else "false",
+            "runner_release": self.runner_release,
+            "runner_mirror_url": runner_source.url if runner_source else "",
+            "runner_sha256": runner_source.sha256 if runner_source else "",
+            "runners_per_instance": str(self.runners_per_instance),
+            "script": self.script,
+            "ssh_pubkey": self.ssh_pubkey,
+            "userdata": self.userdata,
+        }
+
+        block_device_mappings = ()
+        if self.root_device_size != "0":
+            block_device_mappings = tuple(self._modify_root_disk_size(ec2, {}).get("BlockDeviceMappings", ()))
+
+        # Determine default instance_name based on instance count
+        default_instance_name = "$repo/$name#$run"
+        if instance_count > 1:
+            default_instance_name = "$repo/$name#$run $idx"
+
+        launch_template = None
+        if self.use_fleet:
+            # CreateFleet can only launch from a template
+            launch_template = self._ensure_launch_template(ec2, self._build_launch_template_data(block_device_mappings))
+        elif is_truthy(self.launch_template):
+            try:
+                launch_template = self._ensure_launch_template(ec2, self._build_launch_template_data(block_device_mappings))
+            except ClientError as e:
+                warning(title="Launch template unavailable", message=f"Launching without a template: {e}")
+
+        pooled_instances = ()
+        pool_tags = ()
+        if is_truthy(self.warm_pool):
+            self.pool = pool = self._warm_pool(ec2, block_device_mappings)
+            pooled_instances = tuple(pool.acquire(instance_count))
+            trimmed = pool.trim(exclude=pooled_instances)
+            print(f"Warm pool {pool.key[:16]}: resuming {len(pooled_instances)}/{instance_count} instance(s), trimmed {len(trimmed)}")
+            pool_tags = tuple(pool.tags)
+
+        return LaunchPlan(
+            user_data_params=MappingProxyType(user_data_params),
+            shared_tags=tuple(self._build_shared_tags()),
+            block_device_mappings=block_device_mappings,
+            default_instance_name=default_instance_name,
+            launch_template=MappingProxyType(launch_template) if launch_template else None,
+            pooled_instances=pooled_instances,
+            pool_tags=pool_tags,
+        )
+
+    def admit_to_pool(self, ids: list[str]):
+        """Add instances whose runners have registered to the warm pool (see ``WarmPool.admit``).
+
+        Instances that never get here (e.g. whose setup fails) are terminated by a later run's trim,
+        rather than resumed. Does nothing without ``warm_pool``.
+        """
+        if self.pool is None or not ids:
+            return
+        try:
+            self.pool.admit(ids)
+        except ClientError as e:
+            print(f"Warning: could not add {', '.join(ids)} to the warm pool: {e}")
+
+    def _warm_pool(self, ec2, block_device_mappings: tuple[dict, ...] = ()) -> WarmPool:
+        """The warm pool of instances interchangeable with those this run would launch.
+
+        Pooled instances are keyed by a hash of their launch configuration, plus the
+        subnet, region and repository (so that instances, and whatever earlier jobs
+        left on their disks, are only reused by the same repository).
+        """
+        key = config_hash(self._build_launch_template_data(block_device_mappings) | {
+            "SubnetId": self.subnet_id,
+            "Region": self.region_name,
+            "Repository": self.repo,
+        })
+        return WarmPool(
+            ec2,
+            key,
+            size=int(self.warm_pool_size or WARM_POOL_SIZE),
+            max_age=float(self.warm_pool_max_age or WARM_POOL_MAX_AGE),
+        )
+
+    def _generate_runner_configs(self, instance_tokens: list[str | JitRunnerConfig]) -> list[dict]:
+        """Generate a unique label for each runner token on an instance.
+
+        JIT runner configs already carry the label they were registered with.
+
+        Parameters
+        ----------
+        instance_tokens : list[str | JitRunnerConfig]
+            GitHub runner tokens (or JIT runner configs) for the runners on one instance.
+
+        Returns
+        -------
+        list[dict]
+            Per-runner configs (token, labels, runner_idx).
+        """
+        runner_configs = []
+        for runner_idx, token in enumerate(instance_tokens):
+            if isinstance(token, JitRunnerConfig):
+                label, token = token.label, token.encoded
             else:
-                raise e
-        return params
+                label = gh.GitHubInstance.generate_random_label()
+            # Combine user labels with the generated runner label
+            labels = f"{self.labels},{label}" if self.labels else label
+            runner_configs.append({
+                "token": token,
+                "labels": labels,
+                "runner_idx": runner_idx
+            })
+        return runner_configs
+
+    def _instance_name(self, plan: LaunchPlan, idx: int) -> str:
+        """Render the instance name (``instance_name`` or the default pattern) for instance ``idx``."""
+        template_vars = self._get_template_vars(idx)
+        # Use provided instance_name or the smart default
+        name_pattern = self.instance_name if self.instance_name else plan.default_instance_name
+        return Template(name_pattern).safe_substitute(**template_vars)
+
+    def _label_jit_runners(self, instance_id: str, instance_name: str, instance_tokens: list[str | JitRunnerConfig]):
+        """Add the instance metadata labels (see ``metadata_labels``) to an instance's JIT runners."""
+        runner_ids = [token.runner_id for token in instance_tokens if isinstance(token, JitRunnerConfig) and token.runner_id]
+        if not runner_ids or self.runner_labeler is None:
+            return
+        labels = metadata_labels(instance_id, self.instance_type, instance_name)
+        for runner_id in runner_ids:
+            try:
+                self.runner_labeler(runner_id, labels)
+            except Exception as e:
+                print(f"Warning: could not add instance labels to runner {runner_id}: {e}")
+
+    @staticmethod
+    def _check_user_data_size(user_data: str | bytes):
+        """Raise if ``user_data`` exceeds the 16KB EC2 limit."""
+        user_data_size = len(user_data)
+        if user_data_size > 16384:
+            raise ValueError(
+                f"UserData exceeds AWS limit: {user_data_size} bytes (limit: 16384 bytes, "
+                f"over by: {user_data_size - 16384} bytes). "
+                f"Template needs to be reduced by at least {user_data_size - 16384} bytes."
+            )
+
+    def _launch_instance(self, ec2, plan: LaunchPlan, idx: int, instance_tokens: list[str]) -> tuple[str, list[dict]]:
+        """Launch a single instance and return its ID and runner configs.
+
+        Parameters
+        ----------
+        ec2
+            The EC2 client object.
+        plan : LaunchPlan
+            Launch inputs shared by all instances (see ``_build_launch_plan``).
+        idx : int
+            Index of the instance within this launch.
+        instance_tokens : list[str]
+            GitHub runner tokens for the runners on this instance.
+
+        Returns
+        -------
+        tuple[str, list[dict]]
+            The instance ID and the per-runner configs (token, labels, runner_idx).
+        """
+        # Generate labels and tokens for all runners on this instance
+        runner_configs = self._generate_runner_configs(instance_tokens)
+
+        user_data_params = dict(plan.user_data_params) | {
+            "instance_name": self._instance_name(plan, idx),  # Add the generated instance name
+            # Simplify runner configs to save template space
+            # Pass tokens as space-delimited, labels as pipe-delimited
+            "runner_tokens": " ".join(config["token"] for config in runner_configs),
+            "runner_labels": "|".join(config["labels"] for config in runner_configs),
+        }
+        params = self._build_aws_params(user_data_params, idx=idx, shared_tags=list(plan.shared_tags))
+        if plan.launch_template:
+            # Only per-instance overrides (UserData, tags, subnet) accompany the template
+            params = {k: v for k, v in params.items() if k not in LAUNCH_TEMPLATE_KEYS}
+            params["LaunchTemplate"] = dict(plan.launch_template)
+        elif plan.block_device_mappings:
+            params["BlockDeviceMappings"] = deepcopy(list(plan.block_device_mappings))
+
+        # Check UserData size before calling AWS
+        user_data_size = len(params.get("UserData", ""))
+        self._check_user_data_size(params.get("UserData", ""))
+
+        if idx < len(plan.pooled_instances):
+            instance_id = plan.pooled_instances[idx]
+            try:
+                if self._resume_instance(ec2, instance_id, params):
+                    self._label_jit_runners(instance_id, user_data_params["instance_name"], instance_tokens)
+                    return instance_id, runner_configs
+                print(f"Pooled instance {instance_id} was resumed by a concurrent run, launching a new one")
+            except ClientError as e:
+                print(f"Failed to resume pooled instance {instance_id}, launching a new one: {e}")
+        if plan.pool_tags:
+            specs = params.setdefault("TagSpecifications", [{"ResourceType": "instance", "Tags": []}])
+            specs[0]["Tags"] = specs[0]["Tags"] + list(plan.pool_tags)
+
+        profiling.mark("first run_instances call", once=True)
+        try:
+            result = self._run_with_market(ec2, params)
+        except Exception as e:
+            if "User data is limited to 16384 bytes" in str(e):
+                # This shouldn't happen if our check above works, but just in case
+                raise ValueError(
+                    f"UserData exceeds AWS limit: {user_data_size} bytes (limit: 16384 bytes, "
+                    f"over by: {user_data_size - 16384} bytes)"
+                ) from e
+            raise
+        instance_id = result["Instances"][0]["InstanceId"]
+        self._label_jit_runners(instance_id, user_data_params["instance_name"], instance_tokens)
+        return instance_id, runner_configs
+
+    @staticmethod
+    def _resume_instance(ec2, instance_id: str, params: dict) -> bool:
+        """Start a stopped warm-pool instance with this launch's UserData and tags.
+
+        The instance re-runs its UserData (with the new runner tokens) on boot.
+        Concurrent runs may both have claimed it; only the one whose UserData it
+        was started with (see ``start_claimed``) tags and uses it.
+
+        Parameters
+        ----------
+        ec2
+            The EC2 client object.
+        instance_id : str
+            ID of the stopped (and claimed) pool instance.
+        params : dict
+            The ``run_instances`` parameters the instance would otherwise have been launched with.
+
+        Returns
+        -------
+        bool
+            Whether this run resumed the instance (False if a concurrent run did).
+        """
+        user_data = params["UserData"]
+        if isinstance(user_data, str):
+            user_data = user_data.encode()
+        profiling.mark("first start_instances call", once=True)
+        if not start_claimed(ec2, instance_id, user_data):
+            return False
+        tags = [tag for spec in params.get("TagSpecifications", []) for tag in spec["Tags"]]
+        if tags:
+            ec2.create_tags(Resources=[instance_id], Tags=tags)
+        print(f"Resumed pooled instance {instance_id}")
+        return True
+
+    def _spot_retry_delay(self, deadline: float, attempt: int) -> float | None:
+        """Backoff before retrying spot capacity, or None once ``spot_timeout`` has elapsed."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return min(2 ** attempt, 10, remaining)
+
+    def _run_with_market(self, ec2, params: dict) -> dict:
+        """Call ``run_instances``, on spot capacity if ``spot`` is set.
+
+        Spot capacity errors are retried (with backoff) for up to ``spot_timeout``
+        seconds, after which the launch falls back to on-demand (unless
+        ``spot_fallback`` is disabled). The chosen market is recorded in the
+        instance's ``Market`` tag.
+
+        Parameters
+        ----------
+        ec2
+            The EC2 client object.
+        params : dict
+            ``run_instances`` parameters.
+
+        Returns
+        -------
+        dict
+            The ``run_instances`` response.
+        """
+        if not is_truthy(self.spot):
+            return ec2.run_instances(**params)
+
+        deadline = time.monotonic() + float(self.spot_timeout or SPOT_TIMEOUT)
+        attempt = 0
+        while True:
+            try:
+                return ec2.run_instances(**with_market(params, "spot", self.spot_max_price))
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code", "")
+                if code not in SPOT_CAPACITY_ERRORS:
+                    raise
+                delay = self._spot_retry_delay(deadline, attempt)
+                if delay is None:
+                    if not is_truthy(self.spot_fallback):
+                        raise
+                    print(f"No spot capacity within {self.spot_timeout}s ({code}), falling back to on-demand")
+                    return ec2.run_instances(**with_market(params, "on-demand"))
+                attempt += 1
+                print(f"No spot capacity ({code}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _run_instances(self, ec2, plan: LaunchPlan, tokens_to_use: list[list[str] | Future]) -> list[tuple[str, list[dict]] | None]:
+        """Launch one instance per token group with concurrent ``run_instances`` calls.
+
+        Instances are launched up to ``launch_concurrency`` at a time. If some
+        launches fail, a warning is emitted for each; if all fail, the first
+        error is raised.
+
+        Parameters
+        ----------
+        ec2
+            The EC2 client object.
+        plan : LaunchPlan
+            Launch inputs shared by all instances.
+        tokens_to_use : list[list[str] | Future]
+            Runner tokens for each instance (or futures resolving to them; each
+            instance is launched as soon as its tokens are available).
+
+        Returns
+        -------
+        list[tuple[str, list[dict]] | None]
+            ``(instance_id, runner_configs)`` per instance index (None for failed launches).
+        """
+        instance_count = len(tokens_to_use)
+
+        def launch(idx: int, instance_tokens: list[str] | Future):
+            instance_tokens = resolve_tokens(instance_tokens)
+            start = time.monotonic()
+            instance_id, runner_configs = self._launch_instance(ec2, plan, idx, instance_tokens)
+            return instance_id, runner_configs, time.monotonic() - start
+
+        # Launch all instances concurrently, collecting results by index
+        results = [None] * instance_count
+        failures = {}
+        max_workers = max(1, min(int(self.launch_concurrency), instance_count))
+        launch_start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_to_idx = {
+                executor.submit(launch, idx, instance_tokens): idx
+                for idx, instance_tokens in enumerate(tokens_to_use)
+            }
+            for future in as_completed(future_to_idx):
+                idx = future_to_idx[future]
+                try:
+                    instance_id, runner_configs, latency = future.result()
+                except Exception as e:
+                    print(f"Failed to launch instance {idx}: {e}")
+                    failures[idx] = e
+                    continue
+                self.launch_latencies[instance_id] = latency
+                self.launched_at[instance_id] = time.monotonic()
+                print(f"Launched instance {idx} ({instance_id}) in {latency:.2f}s")
+                results[idx] = (instance_id, runner_configs)
+        wall_time = time.monotonic() - launch_start
+        print(f"Launched {instance_count - len(failures)}/{instance_count} instance(s) in {wall_time:.2f}s (concurrency: {max_workers})")
+
+        if len(failures) == instance_count:
+            raise failures[min(failures)]
+        for idx, e in sorted(failures.items()):
+            warning(title=f"Failed to launch instance {idx}", message=e)
+        return results
+
+    def _fleet_overrides(self) -> list[dict]:
+        """Build ``CreateFleet`` overrides for each (instance type, subnet) pair, in priority order."""
+        instance_types = split_list(self.instance_types) or [self.instance_type]
+        subnet_ids = split_list(self.subnet_ids) or ([self.subnet_id] if self.subnet_id else [])
+        overrides = []
+        for instance_type in instance_types:
+            for subnet_id in subnet_ids or [None]:
+                override = {"InstanceType": instance_type, "Priority": float(len(overrides))}
+                if subnet_id:
+                    override["SubnetId"] = subnet_id
+                overrides.append(override)
+        return overrides
+
+    def _create_fleet(self, ec2, launch_template: dict[str, str], count: int, market: str) -> dict:
+        """Make one ``CreateFleet(Type=instant)`` request for ``count`` instances on ``market``.
+
+        Spot requests use a capacity-optimized allocation strategy (honoring the
+        override priorities for "prioritized"), and ``spot_max_price`` if set.
+        """
+        overrides = self._fleet_overrides()
+        kwargs = {}
+        if market == "spot":
+            if self.spot_max_price:
+                overrides = [override | {"MaxPrice": self.spot_max_price} for override in overrides]
+            strategy = "capacity-optimized-prioritized" if self.fleet_allocation_strategy == "prioritized" else "capacity-optimized"
+            kwargs["SpotOptions"] = {"AllocationStrategy": strategy, "InstanceInterruptionBehavior": "terminate"}
+            capacity = {"SpotTargetCapacity": count}
+        else:
+            kwargs["OnDemandOptions"] = {"AllocationStrategy": self.fleet_allocation_strategy}
+            capacity = {"OnDemandTargetCapacity": count}
+        return ec2.create_fleet(
+            Type="instant",
+            LaunchTemplateConfigs=[{
+                "LaunchTemplateSpecification": launch_template,
+                "Overrides": overrides,
+            }],
+            TargetCapacitySpecification={
+                "TotalTargetCapacity": count,
+                "DefaultTargetCapacityType": market,
+                **capacity,
+            },
+            **kwargs,
+        )
+
+    def _fleet_runner_tags(self, runner_configs: list[dict]) -> list[dict[str, str]]:
+        """Tags delivering an instance's runner tokens and labels, one ``ec2-gha:runner-N`` tag per runner.
 
+        Values are ``"<token> <label>"``, where the label is the runner's generated label
+        (the user ``labels``, shared by every runner, are in the UserData).
+        """
+        return [
+            {"Key": f"ec2-gha:runner-{config['runner_idx']}", "Value": f"{config['token']} {config['labels'].split(',')[-1]}"}
+            for config in runner_configs
+        ]
+
+    def _fleet_tags_unfit(self, plan: LaunchPlan, all_runner_configs: list[list[dict]]) -> str | None:
+        """Why fleet instances can't receive their runner tokens as tags (or None if they can)."""
+        # User and run tags, plus the index, Name and Market tags
+        tag_count = len(self.tags) + len(plan.shared_tags) + 3 + self.runners_per_instance
+        if tag_count > MAX_TAGS:
+            return f"{tag_count} tags per instance exceed the limit of {MAX_TAGS}"
+        for configs in all_runner_configs:
+            for tag in self._fleet_runner_tags(configs):
+                if len(tag["Value"]) > MAX_TAG_VALUE_LENGTH:
+                    return f"runner tokens (e.g. JIT configs) longer than {MAX_TAG_VALUE_LENGTH} characters don't fit in tags"
+        return None
+
+    def _launch_fleet(self, ec2, plan: LaunchPlan, tokens_to_use: list[list[str]]) -> list[tuple[str, list[dict]] | None]:
+        """Launch all instances with a single ``CreateFleet(Type=instant)`` call.
+
+        Fleet instances share one UserData, without runner tokens. After the fleet
+        is created, each instance is tagged with its index (``ec2-gha:index``),
+        Name, and runner tokens and labels (see ``_fleet_runner_tags``), which it
+        reads back from its own instance metadata tags. Each instance only sees
+        its own tokens, and the UserData doesn't grow with the instance count.
+
+        If the runner tokens don't fit in tags (JIT configs, or too many runners
+        per instance), instances are launched with ``_run_instances`` instead.
+
+        Parameters
+        ----------
+        ec2
+            The EC2 client object.
+        plan : LaunchPlan
+            Launch inputs shared by all instances (must have a ``launch_template``).
+        tokens_to_use : list[list[str]]
+            Runner tokens for each instance.
+
+        Returns
+        -------
+        list[tuple[str, list[dict]] | None]
+            ``(instance_id, runner_configs)`` per instance index (None for unfulfilled capacity).
+
+        Raises
+        ------
+        RuntimeError
+            If the fleet launched no instances.
+        """
+        instance_count = len(tokens_to_use)
+        all_runner_configs = [self._generate_runner_configs(instance_tokens) for instance_tokens in tokens_to_use]
+        unfit = self._fleet_tags_unfit(plan, all_runner_configs)
+        if unfit:
+            warning(
+                title="Fleet launch unavailable",
+                message=f"{unfit}; launching {instance_count} {self.instance_type} instance(s) with run_instances",
+            )
+            return self._run_instances(ec2, plan, tokens_to_use)
+
+        user_data_params = dict(plan.user_data_params) | {
+            # Read from the instance's tags at boot (no tokens means "wait for the runner tags")
+            "instance_name": "",
+            "runner_tokens": "",
+            "runner_labels": self.labels,
+        }
+        user_data = self._build_user_data(**user_data_params)
+        self._check_user_data_size(user_data)
+        if isinstance(user_data, str):
+            user_data = user_data.encode()
+
+        # Per-run template version: the shared UserData, run tags, and metadata tags access
+        version_data = {
+            "UserData": base64.b64encode(user_data).decode(),
+            "MetadataOptions": {"HttpEndpoint": "enabled", "InstanceMetadataTags": "enabled"},
+        }
+        tags = self.tags + list(plan.shared_tags)
+        if tags:
+            version_data["TagSpecifications"] = [{"ResourceType": "instance", "Tags": tags}]
+        template_id = plan.launch_template["LaunchTemplateId"]
+        version = ec2.create_launch_template_version(
+            LaunchTemplateId=template_id,
+            SourceVersion="$Default",
+            LaunchTemplateData=version_data,
+        )["LaunchTemplateVersion"]["VersionNumber"]
+
+        launch_template = {"LaunchTemplateId": template_id, "Version": str(version)}
+        profiling.mark("first create_fleet call", once=True)
+        launch_start = time.monotonic()
+        instance_ids = []
+        markets = []
+        errors = []
+        try:
+            market = "spot" if is_truthy(self.spot) else "on-demand"
+            deadline = time.monotonic() + float(self.spot_timeout or SPOT_TIMEOUT)
+            attempt = 0
+            while len(instance_ids) < instance_count:
+                response = self._create_fleet(ec2, launch_template, instance_count - len(instance_ids), market)
+                launched = [
+                    instance_id
+                    for instances in response.get("Instances", [])
+                    for instance_id in instances.get("InstanceIds", [])
+                ][:instance_count - len(instance_ids)]
+                instance_ids += launched
+                markets += [market] * len(launched)
+                errors = [
+                    f"{e.get('ErrorCode')}: {e.get('ErrorMessage')} ({e.get('LaunchTemplateAndOverrides', {}).get('Overrides', {})})"
+                    for e in response.get("Errors", [])
+                ]
+                if len(instance_ids) >= instance_count or market != "spot":
+                    break
+                # Retry the remaining spot capacity until `spot_timeout`, then fall back to on-demand
+                delay = self._spot_retry_delay(deadline, attempt)
+                if delay is None:
+                    if not is_truthy(self.spot_fallback):
+                        break
+                    print(f"No spot capacity for {instance_count - len(instance_ids)} instance(s) within {self.spot_timeout}s, falling back to on-demand")
+                    market = "on-demand"
+                    continue
+                attempt += 1
+                print(f"Spot fleet launched {len(instance_ids)}/{instance_count}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+        finally:
+            # The version is only needed for this launch
+            try:
+                ec2.delete_launch_template_versions(LaunchTemplateId=template_id, Versions=[str(version)])
+            except Exception as e:
+                print(f"Warning: could not delete launch template version {version}: {e}")
+        latency = time.monotonic() - launch_start
+
+        print(f"Fleet launched {len(instance_ids)}/{instance_count} instance(s) in {latency:.2f}s")
+        if not instance_ids:
+            raise RuntimeError(f"Fleet launched no instances: {'; '.join(errors) or 'no capacity'}")
+
+        # Assign each instance its runners (and Name) via tags, which it polls at boot
+        existing_keys = {tag["Key"] for tag in self.tags}
+
+        def tag(idx: int, instance_id: str, market: str):
+            instance_tags = [{"Key": "ec2-gha:index", "Value": str(idx)}] + self._fleet_runner_tags(all_runner_configs[idx])
+            if "Name" not in existing_keys:
+                instance_tags.append({"Key": "Name", "Value": self._instance_name(plan, idx)})
+            if is_truthy(self.spot):
+                instance_tags.append({"Key": "Market", "Value": market})
+            ec2.create_tags(Resources=[instance_id], Tags=instance_tags)
+
+        max_workers = max(1, min(int(self.launch_concurrency), len(instance_ids)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(tag, range(len(instance_ids)), instance_ids, markets))
+
+        results = [None] * instance_count
+        launched_at = time.monotonic()
+        for idx, instance_id in enumerate(instance_ids):
+            self.launch_latencies[instance_id] = latency
+            self.launched_at[instance_id] = launched_at
+            results[idx] = (instance_id, all_runner_configs[idx])
+        if len(instance_ids) < instance_count:
+            warning(
+                title=f"Fleet launched {len(instance_ids)}/{instance_count} instances",
+                message="; ".join(errors) or "Insufficient capacity",
+            )
+        return results
 
     def create_instances(self) -> dict[str, str]:
         """Create instances on AWS.
 
         Creates and registers instances on AWS using the provided parameters.
+        Instances are launched concurrently (up to ``launch_concurrency`` at a
+        time), or with a single ``CreateFleet`` call when ``instance_types`` or
+        ``subnet_ids`` are given; the returned mapping preserves instance-index
+        order. If some launches fail, a warning is emitted for each and the
+        successful ones are returned; if all fail, the first error is raised.
 
         Returns
         -------
         dict[str, str]
             A dictionary of instance IDs and labels.
         """
-        if not self.gh_runner_tokens:
+        if not self.gh_runner_tokens and not self.grouped_runner_tokens:
             raise ValueError("No GitHub runner tokens provided, cannot create instances.")
+        # Determine which tokens to use
+        tokens_to_use = self.grouped_runner_tokens if self.grouped_runner_tokens else [[t] for t in self.gh_runner_tokens]
+
+        instance_count = len(tokens_to_use)
+        try:
+            # Computed while any still-pending tokens are being created
+            ec2, plan = self.prepare_launch(instance_count)
+
+            if self.use_fleet:
+                # Fleet instances share one UserData, so every instance's tokens are needed up front
+                results = self._launch_fleet(ec2, plan, [resolve_tokens(tokens) for tokens in tokens_to_use])
+            else:
+                results = self._run_instances(ec2, plan, tokens_to_use)
+        except Exception:
+            remove_jit_runners(tokens_to_use, self.runner_remover)
+            raise
+        remove_jit_runners([tokens_to_use[idx] for idx, result in enumerate(results) if result is None], self.runner_remover)
+
+        id_dict = {}
+        for result in results:
+            if result is None:
+                continue
+            instance_id, runner_configs = result
+            id_dict[instance_id] = self.runner_labels(runner_configs)
+        return id_dict
+
+    def prepare_launch(self, instance_count: int) -> tuple[object, LaunchPlan]:
+        """Validate launch inputs and compute the launch plan (once, rather than once per instance).
+
+        Parameters
+        ----------
+        instance_count : int
+            Number of instances that will be launched.
+
+        Returns
+        -------
+        tuple
+            The EC2 client and the ``LaunchPlan``.
+
+        Raises
+        ------
+        ValueError
+            If a required input is missing.
+        """
         if not self.runner_release:
             raise ValueError("No runner release provided, cannot create instances.")
         if not self.image_id:
@@ -394,131 +1546,131 @@ class StartAWS(CreateCloudInstance):
             raise ValueError("No instance type provided, cannot create instances.")
         if not self.region_name:
             raise ValueError("No region name provided, cannot create instances.")
-        ec2 = boto3.client("ec2", region_name=self.region_name)
+        ec2 = get_client("ec2", self.region_name)
 
         # Use AUTO to let the instance detect its own home directory
         if not self.home_dir:
             self.home_dir = AUTO
-        id_dict = {}
-        # Determine which tokens to use
-        tokens_to_use = self.grouped_runner_tokens if self.grouped_runner_tokens else [[t] for t in self.gh_runner_tokens]
-
-        # Determine default instance_name based on instance count
-        instance_count = len(tokens_to_use)
-        default_instance_name = "$repo/$name#$run"
-        if instance_count > 1:
-            default_instance_name = "$repo/$name#$run $idx"
-
-        for idx, instance_tokens in enumerate(tokens_to_use):
-            # Generate labels and tokens for all runners on this instance
-            runner_configs = []
-            for runner_idx, token in enumerate(instance_tokens):
-                label = gh.GitHubInstance.generate_random_label()
-                # Combine user labels with the generated runner label
-                labels = f"{self.labels},{label}" if self.labels else label
-                runner_configs.append({
-                    "token": token,
-                    "labels": labels,
-                    "runner_idx": runner_idx
-                })
+        return ec2, self._build_launch_plan(ec2, instance_count)
+
+    def runner_labels(self, runner_configs: list[dict]) -> str | list[str]:
+        """Return an instance's entry in the instance mapping (see ``set_instance_mapping``)."""
+        # For multiple runners per instance, store all labels
+        if self.runners_per_instance > 1:
+            return [config["labels"] for config in runner_configs]
+        # For backward compatibility, store single label as string
+        return runner_configs[0]["labels"] if runner_configs else ""
+
+    def iter_running(
+        self,
+        ids: list[str],
+        max_attempts: int = 40,
+        max_delay: float = 15,
+        initial_delay: float = 1,
+        backoff: float = 1.5,
+    ) -> Iterator[str]:
+        """Yield instance IDs as they reach the ``running`` state.
+
+        Each attempt polls all still-pending instances with one batched
+        ``describe_instances`` call. The delay between attempts starts at
+        ``initial_delay`` and grows by ``backoff`` up to ``max_delay``, so
+        instances that come up quickly are noticed quickly, without hammering the
+        API for slow ones. Each instance's time from launch to ``running`` is
+        recorded in ``ready_latencies``.
 
-            # Simplify runner configs to save template space
-            # Pass tokens as space-delimited, labels as pipe-delimited
-            runner_tokens = " ".join(config["token"] for config in runner_configs)
-            runner_labels = "|".join(config["labels"] for config in runner_configs)
+        Parameters
+        ----------
+        ids : list[str]
+            Instance IDs to wait for.
+        max_attempts : int
+            Maximum number of polls. Defaults to 40.
+        max_delay : float
+            Maximum delay in seconds between polls. Defaults to 15.
+        initial_delay : float
+            Delay in seconds after the first poll. Defaults to 1.
+        backoff : float
+            Factor by which the delay grows after each poll. Defaults to 1.5.
+
+        Yields
+        ------
+        str
+            Each instance ID, as soon as it is running.
 
-            # Generate instance name using template variables
-            from string import Template
-            template_vars = self._get_template_vars(idx)
-            # Use provided instance_name or the smart default
-            name_pattern = self.instance_name if self.instance_name else default_instance_name
-            name_template = Template(name_pattern)
-            instance_name_value = name_template.safe_substitute(**template_vars)
-
-            # Resolve action_ref to a SHA for security and consistency
-            action_ref = environ.get("INPUT_ACTION_REF")
-            if not action_ref:
-                raise ValueError("action_ref is required but was not provided. Check that runner.yml passes it correctly.")
-            action_sha = resolve_ref_to_sha(action_ref)
-
-            user_data_params = {
-                "action_sha": action_sha,  # The resolved SHA
-                "cloudwatch_logs_group": self.cloudwatch_logs_group,
-                "debug": self.debug,
-                "github_workflow": environ.get("GITHUB_WORKFLOW", ""),
-                "github_run_id": environ.get("GITHUB_RUN_ID", ""),
-                "github_run_number": environ.get("GITHUB_RUN_NUMBER", ""),
-                "homedir": self.home_dir,
-                "instance_name": instance_name_value,  # Add the generated instance name
-                "max_instance_lifetime": self.max_instance_lifetime,
-                "repo": self.repo,
-                "runner_grace_period": self.runner_grace_period,
-                "runner_initial_grace_period": self.runner_initial_grace_period,
-                "runner_poll_interval": self.runner_poll_interval,
-                "runner_registration_timeout": environ.get("INPUT_RUNNER_REGISTRATION_TIMEOUT", "").strip() or RUNNER_REGISTRATION_TIMEOUT,
-                "runner_release": self.runner_release,
-                "runners_per_instance": str(self.runners_per_instance),
-                "runner_tokens": runner_tokens,  # Space-delimited tokens
-                "runner_labels": runner_labels,  # Pipe-delimited labels
-                "script": self.script,
-                "ssh_pubkey": self.ssh_pubkey,
-                "userdata": self.userdata,
-            }
-            params = self._build_aws_params(user_data_params, idx=idx)
-            if self.root_device_size != "0":
-                params = self._modify_root_disk_size(ec2, params)
+        Raises
+        ------
+        botocore.exceptions.WaiterError
+            If an instance enters a failed state, or instances are still pending after ``max_attempts`` polls.
+        """
+        pending = list(dict.fromkeys(ids))
+        start = time.monotonic()
+        delay = initial_delay
+        response = {}
+        for attempt in range(1, max_attempts + 1):
+            states, response = self._describe_states(pending)
+            for instance_id in list(pending):
+                state = states.get(instance_id)
+                if state == "running":
+                    pending.remove(instance_id)
+                    self.ready_latencies[instance_id] = time.monotonic() - self.launched_at.get(instance_id, start)
+                    yield instance_id
+                elif state in FAILED_INSTANCE_STATES:
+                    raise WaiterError(
+                        name="InstanceRunning",
+                        reason=f"Instance {instance_id} entered state '{state}'",
+                        last_response=response,
+                    )
+            if not pending:
+                return
+            if attempt < max_attempts:
+                time.sleep(delay)
+                delay = min(delay * backoff, max_delay)
+
+        raise WaiterError(
+            name="InstanceRunning",
+            reason=f"Max attempts exceeded, instance(s) not running: {', '.join(pending)}",
+            last_response=response,
+        )
 
-            # Check UserData size before calling AWS
-            user_data_size = len(params.get("UserData", ""))
-            if user_data_size > 16384:
-                raise ValueError(
-                    f"UserData exceeds AWS limit: {user_data_size} bytes (limit: 16384 bytes, "
-                    f"over by: {user_data_size - 16384} bytes). "
-                    f"Template needs to be reduced by at least {user_data_size - 16384} bytes."
-                )
+    def _describe_states(self, ids: list[str]) -> tuple[dict[str, str], dict]:
+        """Look up instance states with batched ``describe_instances`` calls.
 
-            try:
-                result = ec2.run_instances(**params)
-            except Exception as e:
-                if "User data is limited to 16384 bytes" in str(e):
-                    # This shouldn't happen if our check above works, but just in case
-                    raise ValueError(
-                        f"UserData exceeds AWS limit: {user_data_size} bytes (limit: 16384 bytes, "
-                        f"over by: {user_data_size - 16384} bytes)"
-                    ) from e
-                raise
-            instances = result["Instances"]
-            id = instances[0]["InstanceId"]
-            # For multiple runners per instance, store all labels
-            if self.runners_per_instance > 1:
-                all_labels = [config["labels"] for config in runner_configs]
-                id_dict[id] = all_labels
-            else:
-                # For backward compatibility, store single label as string
-                id_dict[id] = runner_configs[0]["labels"] if runner_configs else ""
-        return id_dict
+        Returns
+        -------
+        tuple[dict[str, str], dict]
+            State name per visible instance ID, and the last raw response.
+        """
+        ec2 = get_client("ec2", self.region_name)
+        states = {}
+        response = {}
+        for i in range(0, len(ids), 100):
+            # Filter (rather than `InstanceIds`) so not-yet-visible instances don't fail the whole batch
+            response = ec2.describe_instances(Filters=[{"Name": "instance-id", "Values": ids[i:i + 100]}])
+            for reservation in response.get("Reservations", []):
+                for instance in reservation["Instances"]:
+                    states[instance["InstanceId"]] = instance["State"]["Name"]
+        return states, response
 
     def wait_until_ready(self, ids: list[str], **kwargs):
         """Wait until instances are running.
 
-        Waits until the instances are running before continuing.
+        Waits until the instances are running before continuing (see ``iter_running``).
 
         Parameters
         ----------
         ids : list[str]
             A list of instance IDs to wait for.
         kwargs : dict
-            A dictionary of custom configuration options for the waiter.
+            Waiter-style configuration: ``MaxAttempts`` (maximum number of polls)
+            and ``Delay`` (maximum delay in seconds between polls).
 
         """
-        ec2 = boto3.client("ec2", self.region_name)
-        waiter = ec2.get_waiter("instance_running")
-        # Pass custom config for the waiter
-        if kwargs:
-            waiter.wait(InstanceIds=ids, WaiterConfig=kwargs)
-        # Otherwise, use the default config
-        else:
-            waiter.wait(InstanceIds=ids)
+        config = {}
+        if "MaxAttempts" in kwargs:
+            config["max_attempts"] = int(kwargs["MaxAttempts"])
+        if "Delay" in kwargs:
+            config["max_delay"] = float(kwargs["Delay"])
+        for instance_id in self.iter_running(ids, **config):
+            print(f"Instance {instance_id} running after {self.ready_latencies[instance_id]:.1f}s")
 
     def get_instance_details(self, ids: list[str]) -> dict[str, dict]:
         """Get instance details including DNS names.
@@ -533,7 +1685,7 @@ class StartAWS(CreateCloudInstance):
         dict[str, dict]
             A dictionary mapping instance IDs to their details.
         """
-        ec2 = boto3.client("ec2", self.region_name)
+        ec2 = get_client("ec2", self.region_name)
         response = ec2.describe_instances(InstanceIds=ids)
 
         details = {}
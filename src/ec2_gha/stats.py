@@ -0,0 +1,14 @@
+"""Summary statistics shared by the launcher and the log analysis scripts.
+
+Kept free of third-party imports, so scripts (e.g. ``scripts/instance-runtime.py``)
+can use it without pulling in the launcher's dependencies.
+"""
+
+import math
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of ``values`` (``q`` between 0 and 100)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
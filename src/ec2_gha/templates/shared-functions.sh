@@ -23,6 +23,32 @@ wait_for_dpkg_lock() {
   done
 }
 
+# Boot-phase profile: one JSON line per phase in $BOOT_PROFILE_LOG (CloudWatch stream
+# `boot-profile`), with start/end in seconds since boot (monotonic, from /proc/uptime). A phase's
+# start is kept in $RUNNER_STATE_DIR/phases, so it can end in another process (e.g. a runner hook).
+BOOT_PROFILE_LOG=/var/log/runner-boot-profile.log
+uptime_s() { cut -d' ' -f1 /proc/uptime; }
+phase_begin() {
+  mkdir -p $RUNNER_STATE_DIR/phases
+  echo "${2:-$(uptime_s)}" > $RUNNER_STATE_DIR/phases/$1
+}
+phase_end() {
+  local name=$1 status=${2:-ok} f=$RUNNER_STATE_DIR/phases/$1
+  [ -f $f ] || return 0
+  local start=$(cat $f) end=$(uptime_s)
+  rm -f $f
+  echo "{\"phase\": \"$name\", \"start\": $start, \"end\": $end, \"duration\": $(awk "BEGIN {printf \"%.2f\", $end - $start}"), \"status\": \"$status\", \"time\": \"$(date -u '+%Y-%m-%dT%H:%M:%SZ')\"}" >> $BOOT_PROFILE_LOG
+}
+
+# Wake the termination daemon (via the FIFO it waits on; opened read-write, so it never blocks)
+TERMINATION_EVENTS=$RUNNER_STATE_DIR/termination-events
+notify_termination_daemon() { [ -p $TERMINATION_EVENTS ] && echo "$*" 1<>$TERMINATION_EVENTS 2>$dn; return 0; }
+
+# Pre-baked AMIs (see `python -m ec2_gha bake`) record the provisioning phases they ran in a manifest
+BAKE_DIR=/opt/ec2-gha
+BAKE_MANIFEST=$BAKE_DIR/manifest.json
+is_baked() { [ -f "$BAKE_MANIFEST" ] && grep -q "\"$1\"" "$BAKE_MANIFEST"; }
+
 # Function to flush CloudWatch logs before shutdown
 flush_cloudwatch_logs() {
   log "Stopping CloudWatch agent to flush logs"
@@ -31,32 +57,139 @@ flush_cloudwatch_logs() {
   fi
 }
 
-# Get EC2 instance metadata (IMDSv2 compatible)
+# Check a file's SHA-256 (succeeds if no checksum is given)
+verify_sha256() {
+  local file=$1 expected=$2
+  [ -z "$expected" ] && return 0
+  echo "$expected  $file" | sha256sum -c --status 2>$dn
+}
+
+# Download a URL to a file, in parallel byte ranges (when the server supports them, and the file
+# is large enough to benefit), with retries
+download_file() {
+  local url=$1 dest=$2 parts=${3:-8}
+  if ! command -v curl >$dn 2>&1; then
+    wget -q --tries=5 "$url" -O "$dest"
+    return
+  fi
+  # A 1-byte range request (rather than HEAD, which presigned GET URLs reject) reveals the size
+  local total=$(curl -sfL -r 0-0 -o $dn -D - "$url" 2>$dn | tr -d '\r' | awk -F/ 'tolower($0) ~ /^content-range: bytes 0-0\// {n=$2} END {print n}')
+  if ! [[ "$total" =~ ^[0-9]+$ ]] || [ "$total" -lt $((parts * 1048576)) ]; then
+    curl -fsSL --retry 5 --retry-delay 2 "$url" -o "$dest"
+    return
+  fi
+  local size=$(((total + parts - 1) / parts)) pids=() failed=0 i
+  for ((i = 0; i < parts; i++)); do
+    local first=$((i * size)) last=$(((i + 1) * size - 1))
+    [ $last -ge $total ] && last=$((total - 1))
+    curl -fsSL --retry 5 --retry-delay 2 -r $first-$last "$url" -o "$dest.part$i" &
+    pids+=($!)
+  done
+  for i in ${!pids[@]}; do
+    wait ${pids[$i]} || failed=1
+  done
+  if [ $failed -eq 0 ]; then
+    for ((i = 0; i < parts; i++)); do cat "$dest.part$i"; done > "$dest"
+  fi
+  rm -f "$dest".part*
+  return $failed
+}
+
+# Instance metadata (IMDSv2, falling back to IMDSv1). The session token is cached in
+# $IMDS_TOKEN_FILE until shortly before it expires, so repeated lookups (from any script) cost one
+# request each.
+IMDS=http://169.254.169.254/latest
+IMDS_TOKEN_TTL=21600
+IMDS_TOKEN_FILE=$RUNNER_STATE_DIR/imds-token
+imds_token() {
+  local now=$(date +%s) expiry="" token=""
+  [ -s "$IMDS_TOKEN_FILE" ] && read -r expiry token < "$IMDS_TOKEN_FILE"
+  if [ -n "$token" ] && [ "$now" -lt "${expiry:-0}" ]; then
+    echo "$token"
+    return 0
+  fi
+  token=$(curl -sf -X PUT -H "X-aws-ec2-metadata-token-ttl-seconds: $IMDS_TOKEN_TTL" $IMDS/api/token 2>$dn || true)
+  if [ -n "$token" ] && [ -d "$RUNNER_STATE_DIR" ]; then
+    (umask 077; echo "$((now + IMDS_TOKEN_TTL - 300)) $token" > "$IMDS_TOKEN_FILE") 2>$dn || true
+  fi
+  echo "$token"
+}
+
+# Fetch an IMDS path (relative to /latest/, e.g. `meta-data/instance-id`)
+imds_fetch() {
+  local token=$(imds_token)
+  curl -sf ${token:+-H "X-aws-ec2-metadata-token: $token"} "$IMDS/$1" 2>$dn
+}
+
+# Instance type, ID, region and AZ, fetched once (from the instance identity document) and
+# persisted in $INSTANCE_IDENTITY (as shell variables), for the hooks and termination check to reuse
+INSTANCE_IDENTITY=$RUNNER_STATE_DIR/instance-identity
+identity_field() { echo "$1" | sed -n "s/.*\"$2\" *: *\"\([^\"]*\)\".*/\1/p" | head -1; }
+load_instance_identity() {
+  if [ ! -s "$INSTANCE_IDENTITY" ]; then
+    local doc=$(imds_fetch dynamic/instance-identity/document)
+    local id=$(identity_field "$doc" instanceId)
+    [ -n "$id" ] || return 1
+    cat > "$INSTANCE_IDENTITY.tmp" << EOF
+INSTANCE_ID=$id
+INSTANCE_TYPE=$(identity_field "$doc" instanceType)
+REGION=$(identity_field "$doc" region)
+AZ=$(identity_field "$doc" availabilityZone)
+EOF
+    mv "$INSTANCE_IDENTITY.tmp" "$INSTANCE_IDENTITY"
+  fi
+  source "$INSTANCE_IDENTITY"
+}
+
+# Get EC2 instance metadata (identity fields from the persisted identity, if loaded)
 get_metadata() {
-  local path="$1"
-  local token=$(curl -X PUT -H "X-aws-ec2-metadata-token-ttl-seconds: 300" http://169.254.169.254/latest/api/token 2>$dn || true)
-  if [ -n "$token" ]; then
-    curl -s -H "X-aws-ec2-metadata-token: $token" "http://169.254.169.254/latest/meta-data/$path" 2>$dn || echo "unknown"
-  else
-    curl -s "http://169.254.169.254/latest/meta-data/$path" 2>$dn || echo "unknown"
+  local path="$1" var=""
+  case "$path" in
+    instance-id) var=INSTANCE_ID ;;
+    instance-type) var=INSTANCE_TYPE ;;
+    placement/region) var=REGION ;;
+    placement/availability-zone) var=AZ ;;
+  esac
+  if [ -n "$var" ] && [ -s "$INSTANCE_IDENTITY" ]; then
+    sed -n "s/^$var=//p" "$INSTANCE_IDENTITY"
+    return 0
   fi
+  imds_fetch "meta-data/$path" || echo "unknown"
   return 0  # Always return success to avoid set -e issues
 }
 
+# Get an instance tag from instance metadata (requires InstanceMetadataTags); empty if unset
+get_instance_tag() {
+  imds_fetch "meta-data/tags/instance/$1" || true
+}
+
+# Function to stop and deregister the runner in a directory. JIT runners (marked by `.runner-jit`)
+# have no registration token: stopping them takes them offline (so GitHub stops assigning them jobs),
+# and their registration is removed by the stop job, or by GitHub (offline ephemeral runners are
+# removed after a day)
+deregister_runner() {
+  local RUNNER_DIR="$1"
+  if [ -d "$RUNNER_DIR" ] && [ -f "$RUNNER_DIR/config.sh" ]; then
+    if [ -f "$RUNNER_DIR/.runner-jit" ]; then
+      log "Stopping JIT runner in $RUNNER_DIR (its registration is removed by the stop job, or by GitHub)"
+    else
+      log "Deregistering runner in $RUNNER_DIR"
+    fi
+    cd "$RUNNER_DIR"
+    pkill -INT -f "$RUNNER_DIR/run.sh" 2>$dn || true
+    sleep 1
+    if [ -f "$RUNNER_DIR/.runner-token" ]; then
+      TOKEN=$(cat "$RUNNER_DIR/.runner-token")
+      RUNNER_ALLOW_RUNASROOT=1 ./config.sh remove --token $TOKEN 2>&1
+      log "Deregistration exit: $?"
+    fi
+  fi
+}
+
 # Function to deregister all runners
 deregister_all_runners() {
   for RUNNER_DIR in $homedir/runner-*; do
-    if [ -d "$RUNNER_DIR" ] && [ -f "$RUNNER_DIR/config.sh" ]; then
-      log "Deregistering runner in $RUNNER_DIR"
-      cd "$RUNNER_DIR"
-      pkill -INT -f "$RUNNER_DIR/run.sh" 2>$dn || true
-      sleep 1
-      if [ -f "$RUNNER_DIR/.runner-token" ]; then
-        TOKEN=$(cat "$RUNNER_DIR/.runner-token")
-        RUNNER_ALLOW_RUNASROOT=1 ./config.sh remove --token $TOKEN 2>&1
-        log "Deregistration exit: $?"
-      fi
-    fi
+    deregister_runner "$RUNNER_DIR"
   done
 }
 
@@ -69,7 +202,7 @@ debug_sleep_and_shutdown() {
     log "Debug: Sleeping ${sleep_minutes} minutes before shutdown..." || true
     # Detect the SSH user from the home directory
     local ssh_user=$(basename "$homedir" 2>$dn || echo "ec2-user")
-    local public_ip=$(curl -s http://169.254.169.254/latest/meta-data/public-ipv4)
+    local public_ip=$(get_metadata public-ipv4)
     log "SSH into instance with: ssh ${ssh_user}@${public_ip}" || true
     log "Then check: /var/log/runner-setup.log and /var/log/runner-debug.log" || true
     sleep "$sleep_seconds"
@@ -110,6 +243,10 @@ terminate_instance() {
   log "User: $(whoami)"
   log "Debug trace available in: /var/log/runner-debug.log"
   echo "========================================" | tee -a /var/log/runner-setup.log
+  # Tell the bake command (which reads the console output) not to create an AMI
+  if [ "${bake:-}" = "true" ]; then
+    echo "EC2-GHA-BAKE: failed: $reason" > /dev/console 2>$dn || true
+  fi
 
   # Try to remove runner if it was partially configured
   if [ -f "$homedir/config.sh" ] && [ -n "${RUNNER_TOKEN:-}" ]; then
@@ -121,6 +258,119 @@ terminate_instance() {
   exit 1
 }
 
+# Install the runner's dependencies (e.g. libicu), using its bundled script if present
+install_runner_dependencies() {
+  local runner_dir=$1
+  [ -f "$runner_dir/bin/installdependencies.sh" ] || return 0
+  # Quick check for common AMIs with pre-installed deps
+  if runner_dependencies_present; then
+    log "Dependencies exist, skipping install"
+    return 0
+  fi
+  log "Installing dependencies..."
+  set +e
+  sudo "$runner_dir/bin/installdependencies.sh" >$dn 2>&1
+  local deps_result=$?
+  set -e
+  if [ $deps_result -ne 0 ]; then
+    log "Dependencies script failed, installing manually..."
+    install_dependency_packages || true
+  fi
+}
+
+# Whether the runner's native dependencies (ICU, in particular) are installed
+runner_dependencies_present() {
+  if command -v dpkg >$dn 2>&1; then
+    dpkg -l 'libicu[0-9]*' 2>$dn | grep -q ^ii
+  else
+    ldconfig -p 2>$dn | grep -q libicuuc
+  fi
+}
+
+# Install the runner's dependencies with the package manager (needs no runner tarball)
+install_dependency_packages() {
+  if command -v dnf >$dn 2>&1; then
+    sudo dnf install -y libicu lttng-ust >$dn 2>&1
+  elif command -v yum >$dn 2>&1; then
+    sudo yum install -y libicu >$dn 2>&1
+  elif command -v apt-get >$dn 2>&1; then
+    wait_for_dpkg_lock
+    sudo apt-get update >$dn 2>&1 || true
+    wait_for_dpkg_lock
+    sudo apt-get install -y libicu-dev >$dn 2>&1
+  else
+    return 1
+  fi
+}
+
+# Outcome of the instance-level dependency phase: baked, present, installed, pending (the
+# runner's `bin/installdependencies.sh` is still needed) or failed
+RUNNER_DEPS_STATUS=$RUNNER_STATE_DIR/deps-status
+
+# Install the runner's dependencies once per instance, before any runner is configured (run in
+# the background by runner-setup.sh, concurrently with the runner download)
+prepare_runner_dependencies() {
+  local status
+  phase_begin dependencies
+  if is_baked deps; then
+    status=baked
+  elif runner_dependencies_present; then
+    status=present
+  elif install_dependency_packages && runner_dependencies_present; then
+    status=installed
+  else
+    status=pending
+  fi
+  echo $status > $RUNNER_DEPS_STATUS
+  log "Runner dependencies: $status"
+}
+
+# Finish the dependency phase with the extracted runner's `bin/installdependencies.sh`, if the
+# package manager alone didn't install them
+finish_runner_dependencies() {
+  local runner_dir=$1
+  [ "$(cat $RUNNER_DEPS_STATUS 2>$dn)" = "pending" ] || return 0
+  install_runner_dependencies "$runner_dir"
+  if runner_dependencies_present; then
+    echo installed > $RUNNER_DEPS_STATUS
+  else
+    echo failed > $RUNNER_DEPS_STATUS
+    log "WARNING: Runner dependencies may be missing"
+  fi
+}
+
+# Files the runner (or runner-setup) rewrites in place, which runner directories can't share
+RUNNER_MUTABLE_FILES=".env .path .runner .credentials .credentials_rsaparams run-helper.sh"
+
+# Extract the runner tarball once per instance, into a base directory that runner directories
+# are cloned from (and which is never modified itself)
+extract_runner_base() {
+  local tarball=$1 base=$2
+  rm -rf "$base"
+  mkdir -p "$base"
+  tar -xzf "$tarball" -C "$base"
+}
+
+# Create a runner directory from the base: reflinks (copy-on-write, on XFS/btrfs) or hardlinks,
+# so no file data is copied, with separate copies of the mutable files (`_work` and `_diag` are
+# created per runner, when it runs)
+clone_runner() {
+  local base=$1 dir=$2 f
+  rm -rf "$dir"
+  if ! cp -a --reflink=always "$base" "$dir" 2>$dn; then
+    rm -rf "$dir"
+    if ! cp -al "$base" "$dir" 2>$dn; then
+      rm -rf "$dir"
+      cp -a "$base" "$dir"
+      return
+    fi
+    for f in $RUNNER_MUTABLE_FILES; do
+      [ -f "$base/$f" ] && cp --remove-destination "$base/$f" "$dir/$f"
+    done
+  fi
+  return 0
+}
+
 # Function to configure a single GitHub Actions runner
 configure_runner() {
   local idx=$1
@@ -131,43 +381,35 @@ configure_runner() {
   local instance_id=$6
   local runner_grace_period=$7
   local runner_initial_grace_period=$8
+  # "true" if $token is a just-in-time runner config (already registered, with its labels)
+  local jit=${9:-false}
 
   log "Configuring runner $idx..."
+  phase_begin runner-config-$idx
 
-  # Create runner directory and extract runner binary
+  # Create runner directory from the extracted base (or, without one, extract runner binary)
   local runner_dir="$homedir/runner-$idx"
-  mkdir -p "$runner_dir"
-  cd "$runner_dir"
-  tar -xzf /tmp/runner.tar.gz
-
-  # Install dependencies if needed
-  if [ -f ./bin/installdependencies.sh ]; then
-    # Quick check for common AMIs with pre-installed deps
-    if command -v dpkg >$dn 2>&1 && dpkg -l libicu[0-9]* 2>$dn | grep -q ^ii; then
-      log "Dependencies exist, skipping install"
-    else
-      log "Installing dependencies..."
-      set +e
-      sudo ./bin/installdependencies.sh >$dn 2>&1
-      local deps_result=$?
-      set -e
-      if [ $deps_result -ne 0 ]; then
-        log "Dependencies script failed, installing manually..."
-        if command -v dnf >$dn 2>&1; then
-          sudo dnf install -y libicu lttng-ust >$dn 2>&1 || true
-        elif command -v yum >$dn 2>&1; then
-          sudo yum install -y libicu >$dn 2>&1 || true
-        elif command -v apt-get >$dn 2>&1; then
-          wait_for_dpkg_lock
-          sudo apt-get update >$dn 2>&1 || true
-          sudo apt-get install -y libicu-dev >$dn 2>&1 || true
-        fi
-      fi
-    fi
+  if [ -n "${RUNNER_BASE_DIR:-}" ] && [ -d "$RUNNER_BASE_DIR" ]; then
+    clone_runner "$RUNNER_BASE_DIR" "$runner_dir"
+    cd "$runner_dir"
+  else
+    mkdir -p "$runner_dir"
+    cd "$runner_dir"
+    tar -xzf "${RUNNER_TARBALL:-/tmp/runner.tar.gz}"
   fi
 
-  # Save token for deregistration
-  echo "$token" > .runner-token
+  # Dependencies are installed once per instance (see `prepare_runner_dependencies`); only
+  # install them here if that phase didn't run
+  if [ ! -s "$RUNNER_DEPS_STATUS" ] && ! is_baked deps; then
+    install_runner_dependencies "$runner_dir"
+  fi
+
+  # Save token for deregistration (JIT runners have none; see `deregister_runner`)
+  if [ "$jit" = "true" ]; then
+    touch .runner-jit
+  else
+    echo "$token" > .runner-token
+  fi
 
   # Create env file with runner hooks
   cat > .env << EOF
@@ -179,6 +421,15 @@ RUNNER_GRACE_PERIOD=$runner_grace_period
 RUNNER_INITIAL_GRACE_PERIOD=$runner_initial_grace_period
 EOF
 
+  if [ "$jit" = "true" ]; then
+    # Registered before launch; start immediately, with no config.sh round trip to GitHub
+    RUNNER_ALLOW_RUNASROOT=1 nohup ./run.sh --jitconfig "$token" > $dn 2>&1 &
+    local pid=$!
+    log "Started JIT runner $idx in $runner_dir (PID: $pid)"
+    phase_end runner-config-$idx
+    return 0
+  fi
+
   # Configure runner with GitHub
   local runner_name="ec2-$instance_id-$idx"
   RUNNER_ALLOW_RUNASROOT=1 ./config.sh --url "https://github.com/$repo" --token "$token" --labels "$labels" --name "$runner_name" --disableupdate --unattended 2>&1 | tee /tmp/runner-$idx-config.log
@@ -187,6 +438,7 @@ EOF
     log "Runner $idx registered successfully"
   else
     log_error "Failed to register runner $idx"
+    phase_end runner-config-$idx failed
     return 1
   fi
 
@@ -194,6 +446,7 @@ EOF
   RUNNER_ALLOW_RUNASROOT=1 nohup ./run.sh > $dn 2>&1 &
   local pid=$!
   log "Started runner $idx in $runner_dir (PID: $pid)"
+  phase_end runner-config-$idx
 
   return 0
 }
@@ -0,0 +1,228 @@
+"""Warm pool of stopped instances, reused across workflow runs.
+
+With ``warm_pool`` enabled, instances are launched with
+``InstanceInitiatedShutdownBehavior: stop``, so that when their runners go idle
+(or reach ``max_instance_lifetime``) they stop instead of terminating. Stopped
+instances are tagged with a hash of their configuration (``ec2-gha:pool``), and
+later runs with the same configuration claim them, replace their UserData (with
+fresh runner tokens) and start them again, which skips the AMI boot from
+snapshot and most of the runner setup's downloads.
+
+Each run tags the instances it wants with a unique claim ID (and claim time),
+then re-reads the tags and keeps only those it won. Tags can't be written
+conditionally, so that only reduces contention; ``start_claimed`` is the
+arbiter: UserData can only be replaced while an instance is stopped, so once
+it has been started, the run whose UserData it booted with owns it. The pool is
+trimmed at the start of each run: stopped instances older than ``max_age``
+minutes, and the oldest ones beyond ``size``, are terminated (except those
+claimed in the last ``CLAIM_TIMEOUT`` seconds, which a run is about to start).
+
+Instances only join the pool once their runners have registered: they're
+launched (or, when claimed, re-tagged) with ``ec2-gha:pool-pending`` instead of
+``ec2-gha:pool``, and the launcher swaps the tags back after registration (see
+``WarmPool.admit``). An instance whose setup fails (and which therefore stops,
+rather than terminating) stays pending, and is terminated by the next ``trim``.
+"""
+
+import base64
+import hashlib
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+POOL_TAG = "ec2-gha:pool"
+# Marks instances of a pool whose runners haven't registered (yet)
+PENDING_TAG = "ec2-gha:pool-pending"
+CLAIM_TAG = "ec2-gha:claim"
+# Epoch seconds at which the instance was last claimed
+CLAIMED_AT_TAG = "ec2-gha:claimed-at"
+# Claims younger than this (in seconds) are left alone by ``WarmPool.trim``
+CLAIM_TIMEOUT = 600
+# Epoch seconds at which the instance was first launched (``LaunchTime`` resets on every start)
+CREATED_TAG = "ec2-gha:pool-created"
+
+
+def config_hash(data: dict) -> str:
+    """SHA-256 of a JSON-serializable configuration (key order doesn't matter)."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _tags(instance: dict) -> dict[str, str]:
+    return {tag["Key"]: tag["Value"] for tag in instance.get("Tags", [])}
+
+
+def _created_at(instance: dict) -> float:
+    """When a pooled instance was first launched (falling back to its last start)."""
+    try:
+        return float(_tags(instance)[CREATED_TAG])
+    except (KeyError, ValueError):
+        launch_time = instance.get("LaunchTime")
+        if isinstance(launch_time, datetime):
+            return launch_time.replace(tzinfo=launch_time.tzinfo or timezone.utc).timestamp()
+        return 0.0
+
+
+def _claimed_recently(instance: dict, now: float) -> bool:
+    try:
+        return now - float(_tags(instance)[CLAIMED_AT_TAG]) < CLAIM_TIMEOUT
+    except (KeyError, ValueError):
+        return False
+
+
+def start_claimed(ec2, instance_id: str, user_data: bytes) -> bool:
+    """Replace a claimed instance's UserData and start it, unless a concurrent run got it first.
+
+    Parameters
+    ----------
+    ec2
+        The EC2 client object.
+    instance_id : str
+        ID of the stopped (and claimed, see ``WarmPool.acquire``) pool instance.
+    user_data : bytes
+        The UserData to boot the instance with.
+
+    Returns
+    -------
+    bool
+        Whether the instance was started with ``user_data`` (and so belongs to this run).
+
+    Raises
+    ------
+    ClientError
+        If the instance can't be modified (e.g. it's no longer stopped) or started.
+    """
+    ec2.modify_instance_attribute(InstanceId=instance_id, UserData={"Value": user_data})
+    ec2.start_instances(InstanceIds=[instance_id])
+    # The instance is no longer stopped, so its UserData can't change anymore
+    attribute = ec2.describe_instance_attribute(InstanceId=instance_id, Attribute="userData")
+    return attribute.get("UserData", {}).get("Value") == base64.b64encode(user_data).decode()
+
+
+class WarmPool:
+    """Stopped instances with a given configuration hash.
+
+    Parameters
+    ----------
+    ec2
+        The EC2 client object.
+    key : str
+        Configuration hash identifying interchangeable instances (see ``config_hash``).
+    size : int
+        Maximum number of stopped instances to keep.
+    max_age : float
+        Maximum age (in minutes, since first launch) of pooled instances.
+
+    """
+
+    def __init__(self, ec2, key: str, size: int, max_age: float):
+        self.ec2 = ec2
+        self.key = key
+        self.size = size
+        self.max_age = max_age
+        self.claim_id = uuid.uuid4().hex
+
+    @property
+    def tags(self) -> list[dict[str, str]]:
+        """Tags marking a newly launched instance as a pending member of this pool (see ``admit``)."""
+        return [
+            {"Key": PENDING_TAG, "Value": self.key},
+            {"Key": CREATED_TAG, "Value": str(int(time.time()))},
+        ]
+
+    def _describe(self, ids: list[str] | None = None, tag: str = POOL_TAG) -> list[dict]:
+        """Stopped pool members (or, with ``tag=PENDING_TAG``, pending ones; optionally restricted to ``ids``)."""
+        kwargs = {"Filters": [
+            {"Name": f"tag:{tag}", "Values": [self.key]},
+            {"Name": "instance-state-name", "Values": ["stopped"]},
+        ]}
+        if ids:
+            kwargs["InstanceIds"] = ids
+        instances = []
+        for page in self.ec2.get_paginator("describe_instances").paginate(**kwargs):
+            for reservation in page["Reservations"]:
+                instances.extend(reservation["Instances"])
+        return instances
+
+    def _expired(self, instance: dict, now: float) -> bool:
+        return now - _created_at(instance) > self.max_age * 60
+
+    def acquire(self, count: int) -> list[str]:
+        """Claim up to ``count`` stopped instances, newest first.
+
+        Claimed instances leave the pool (they're tagged pending, see ``admit``) until
+        their new runners register.
+
+        Returns
+        -------
+        list[str]
+            IDs of the claimed instances (possibly fewer than ``count``, or none).
+        """
+        if count <= 0:
+            return []
+        now = time.time()
+        candidates = [instance for instance in self._describe() if not self._expired(instance, now)]
+        candidates.sort(key=_created_at, reverse=True)
+        ids = [instance["InstanceId"] for instance in candidates[:count]]
+        if not ids:
+            return []
+        self.ec2.create_tags(Resources=ids, Tags=[
+            {"Key": CLAIM_TAG, "Value": self.claim_id},
+            {"Key": CLAIMED_AT_TAG, "Value": str(int(now))},
+        ])
+        # Concurrent runs may have claimed the same instances; the last tag write wins (see ``start_claimed``)
+        claimed = {
+            instance["InstanceId"]
+            for instance in self._describe(ids)
+            if _tags(instance).get(CLAIM_TAG) == self.claim_id
+        }
+        claimed = [instance_id for instance_id in ids if instance_id in claimed]
+        if claimed:
+            self.ec2.create_tags(Resources=claimed, Tags=[{"Key": PENDING_TAG, "Value": self.key}])
+            self.ec2.delete_tags(Resources=claimed, Tags=[{"Key": POOL_TAG}])
+        return claimed
+
+    def admit(self, ids: list[str]):
+        """Add (or return) instances whose runners have registered to the pool."""
+        if not ids:
+            return
+        self.ec2.create_tags(Resources=ids, Tags=[{"Key": POOL_TAG, "Value": self.key}])
+        self.ec2.delete_tags(Resources=ids, Tags=[{"Key": PENDING_TAG}])
+
+    def trim(self, exclude: list[str] = ()) -> list[str]:
+        """Terminate expired pool members, the oldest ones beyond ``size``, and stopped pending ones.
+
+        Pending instances that are stopped never had their runners register (e.g. after a
+        setup failure). Instances claimed in the last ``CLAIM_TIMEOUT`` seconds (by any
+        run) are left alone.
+
+        Parameters
+        ----------
+        exclude : list[str]
+            Instances to leave alone (e.g. those just claimed by this run).
+
+        Returns
+        -------
+        list[str]
+            IDs of the terminated instances.
+        """
+        now = time.time()
+
+        def unclaimed(instances: list[dict]) -> list[dict]:
+            return [
+                instance
+                for instance in instances
+                if instance["InstanceId"] not in exclude and not _claimed_recently(instance, now)
+            ]
+
+        instances = unclaimed(self._describe())
+        instances.sort(key=_created_at, reverse=True)
+        doomed = [
+            instance["InstanceId"]
+            for i, instance in enumerate(instances)
+            if i >= self.size or self._expired(instance, now)
+        ]
+        doomed += [instance["InstanceId"] for instance in unclaimed(self._describe(tag=PENDING_TAG))]
+        if doomed:
+            self.ec2.terminate_instances(InstanceIds=doomed)
+        return doomed
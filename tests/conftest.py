@@ -0,0 +1,11 @@
+import pytest
+
+from ec2_gha.aws import clear_clients
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    """Don't share cached AWS clients between tests (which patch `boto3.client` or mock AWS)"""
+    clear_clients()
+    yield
+    clear_clients()
@@ -0,0 +1,101 @@
+import json
+from unittest.mock import Mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from ec2_gha.ami_cache import AmiMetadataCache
+
+
+IMAGE = {
+    "RootDeviceName": "/dev/sda1",
+    "Architecture": "x86_64",
+    "BlockDeviceMappings": [
+        {"DeviceName": "/dev/sda1", "Ebs": {"VolumeSize": 8, "VolumeType": "gp3"}},
+    ],
+}
+
+
+@pytest.fixture(scope="function")
+def client():
+    """EC2 client mock that grants describe_images access"""
+    def mock_describe_images(**kwargs):
+        if kwargs.get("DryRun", False):
+            raise ClientError(
+                error_response={"Error": {"Code": "DryRunOperation"}},
+                operation_name="DescribeImages",
+            )
+        return {"Images": [IMAGE]}
+
+    client = Mock()
+    client.describe_images.side_effect = mock_describe_images
+    return client
+
+
+def test_memory_cache(client):
+    """The permission probe and lookup happen once; callers get independent copies"""
+    cache = AmiMetadataCache()
+    first = cache.describe_image(client, "us-east-1", "ami-1")
+    first["BlockDeviceMappings"][0]["Ebs"]["VolumeSize"] = 100
+    second = cache.describe_image(client, "us-east-1", "ami-1")
+
+    assert client.describe_images.call_count == 2
+    assert second["BlockDeviceMappings"][0]["Ebs"]["VolumeSize"] == 8
+    assert second["Architecture"] == "x86_64"
+
+
+def test_permission_probe_cached_per_region(client):
+    cache = AmiMetadataCache()
+    cache.describe_image(client, "us-east-1", "ami-1")
+    cache.describe_image(client, "us-east-1", "ami-2")
+    dry_runs = [c for c in client.describe_images.call_args_list if c.kwargs.get("DryRun")]
+    assert len(dry_runs) == 1
+
+
+def test_disk_cache(client, tmp_path):
+    """Entries persist across cache instances (i.e. across workflow runs)"""
+    AmiMetadataCache(str(tmp_path)).describe_image(client, "us-east-1", "ami-1")
+    assert (tmp_path / "us-east-1" / "ami-1.json").exists()
+
+    client.describe_images.reset_mock()
+    image = AmiMetadataCache(str(tmp_path)).describe_image(client, "us-east-1", "ami-1")
+    assert image["RootDeviceName"] == "/dev/sda1"
+    client.describe_images.assert_not_called()
+
+
+def test_disk_cache_expired(client, tmp_path):
+    AmiMetadataCache(str(tmp_path)).describe_image(client, "us-east-1", "ami-1")
+    path = tmp_path / "us-east-1" / "ami-1.json"
+    entry = json.loads(path.read_text())
+    entry["fetched_at"] -= 2 * 86400
+    path.write_text(json.dumps(entry))
+
+    client.describe_images.reset_mock()
+    AmiMetadataCache(str(tmp_path), ttl=86400).describe_image(client, "us-east-1", "ami-1")
+    assert client.describe_images.call_count == 2  # Probe and metadata refetched
+
+
+def test_permission_probe_not_persisted(client, tmp_path):
+    """Another run (possibly with other credentials) re-probes, rather than trusting an earlier run's result"""
+    AmiMetadataCache(str(tmp_path)).describe_image(client, "us-east-1", "ami-1")
+    assert [p.name for p in (tmp_path / "us-east-1").iterdir()] == ["ami-1.json"]
+
+    denied = Mock()
+    denied.describe_images.side_effect = ClientError(
+        error_response={"Error": {"Code": "AccessDenied"}},
+        operation_name="DescribeImages",
+    )
+    with pytest.raises(ClientError, match="AccessDenied"):
+        AmiMetadataCache(str(tmp_path)).describe_image(denied, "us-east-1", "ami-2")
+
+
+def test_permission_denied(tmp_path):
+    client = Mock()
+    client.describe_images.side_effect = ClientError(
+        error_response={"Error": {"Code": "AccessDenied"}},
+        operation_name="DescribeImages",
+    )
+    cache = AmiMetadataCache(str(tmp_path))
+    with pytest.raises(ClientError, match="AccessDenied"):
+        cache.describe_image(client, "us-east-1", "ami-1")
+    assert not (tmp_path / "us-east-1").exists()
@@ -0,0 +1,27 @@
+from unittest.mock import patch
+
+from ec2_gha.aws import CLIENT_CONFIG, get_client
+
+
+def test_clients_cached():
+    with patch("boto3.client") as mock_client:
+        mock_client.side_effect = lambda *args, **kwargs: object()
+        ec2 = get_client("ec2", "us-east-1")
+        assert get_client("ec2", "us-east-1") is ec2
+        assert get_client("ec2", "us-west-2") is not ec2
+    assert mock_client.call_count == 2
+    assert mock_client.call_args.kwargs["config"] is CLIENT_CONFIG
+
+
+def test_client_cache_disabled(monkeypatch):
+    monkeypatch.setenv("EC2_GHA_CLIENT_CACHE", "0")
+    with patch("boto3.client") as mock_client:
+        mock_client.side_effect = lambda *args, **kwargs: object()
+        assert get_client("ec2", "us-east-1") is not get_client("ec2", "us-east-1")
+    assert mock_client.call_count == 2
+
+
+def test_client_config():
+    assert CLIENT_CONFIG.retries["mode"] == "adaptive"
+    assert CLIENT_CONFIG.max_pool_connections >= 16
+    assert CLIENT_CONFIG.tcp_keepalive
@@ -0,0 +1,71 @@
+import base64
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ec2_gha.bake import bake, console_output
+
+
+@pytest.fixture(scope="function")
+def builder():
+    """Mock ``StartAWS`` and EC2 client for a builder whose console shows ``builder.console``"""
+    ec2 = Mock()
+    ec2.run_instances.return_value = {"Instances": [{"InstanceId": "i-builder"}]}
+    ec2.create_image.return_value = {"ImageId": "ami-baked"}
+    ec2.get_console_output.side_effect = lambda **kwargs: {"Output": base64.b64encode(aws.console.encode()).decode()}
+    plan = Mock(user_data_params={"runner_release": "runner.tar.gz"}, shared_tags=(), block_device_mappings=())
+    aws = Mock(image_id="ami-base", runner_release="runner.tar.gz", console="")
+    aws.prepare_launch.return_value = (ec2, plan)
+    aws._build_aws_params.return_value = {"UserData": "#!/bin/bash", "InstanceInitiatedShutdownBehavior": "terminate"}
+    return aws, ec2
+
+
+def test_bake(builder):
+    aws, ec2 = builder
+    aws.console = "cloud-init ...\nEC2-GHA-BAKE: complete\n"
+    assert bake(aws, "baked") == "ami-baked"
+
+    user_data_params = aws._build_aws_params.call_args.args[0]
+    assert user_data_params["bake"] == "true"
+    assert ec2.run_instances.call_args.kwargs["InstanceInitiatedShutdownBehavior"] == "stop"
+    assert ec2.create_image.call_args.kwargs["InstanceId"] == "i-builder"
+    ec2.terminate_instances.assert_called_once_with(InstanceIds=["i-builder"])
+
+
+def test_bake_failed(builder):
+    """A failure reported on the console aborts the bake (and still terminates the builder)"""
+    aws, ec2 = builder
+    aws.console = "EC2-GHA-BAKE: failed: Setup script failed with error on line 42\n"
+    with pytest.raises(RuntimeError, match="line 42"):
+        bake(aws, "baked")
+    ec2.create_image.assert_not_called()
+    ec2.terminate_instances.assert_called_once_with(InstanceIds=["i-builder"])
+
+
+def test_bake_incomplete(builder):
+    """Without the completion line on the console, no AMI is created (unless forced)"""
+    aws, ec2 = builder
+    aws.console = "cloud-init ...\n"
+    with patch("ec2_gha.bake.CONSOLE_TIMEOUT", 0):
+        with pytest.raises(RuntimeError, match="--force"):
+            bake(aws, "baked")
+        ec2.create_image.assert_not_called()
+        ec2.terminate_instances.assert_called_once_with(InstanceIds=["i-builder"])
+
+        assert bake(aws, "baked", force=True) == "ami-baked"
+
+
+def test_bake_console_lag(builder):
+    """The console output is polled until the completion line shows up"""
+    aws, ec2 = builder
+    outputs = iter(["cloud-init ...\n", "cloud-init ...\nEC2-GHA-BAKE: complete\n"])
+    ec2.get_console_output.side_effect = lambda **kwargs: {"Output": base64.b64encode(next(outputs).encode()).decode()}
+    with patch("ec2_gha.bake.CONSOLE_POLL_INTERVAL", 0):
+        assert bake(aws, "baked") == "ami-baked"
+    assert ec2.get_console_output.call_count == 2
+
+
+def test_console_output_decoded():
+    ec2 = Mock()
+    ec2.get_console_output.return_value = {"Output": "already decoded: output"}
+    assert console_output(ec2, "i-0") == "already decoded: output"
@@ -0,0 +1,156 @@
+import threading
+import time
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+
+import pytest
+from gha_runner.gh import TokenRetrievalError
+
+from ec2_gha.gh import JitRunnerConfig, PooledGitHubInstance, gather_futures, retry_delay
+
+
+def response(status=200, headers=None, json=None):
+    resp = Mock()
+    resp.status_code = status
+    resp.ok = status < 400
+    resp.headers = headers or {}
+    resp.json.return_value = json
+    resp.content = b"error"
+    return resp
+
+
+def test_retry_delay():
+    assert retry_delay(response(200), 0) is None
+    assert retry_delay(response(404), 0) is None
+    # Plain 403s (e.g. missing permissions) aren't retried
+    assert retry_delay(response(403), 0) is None
+    assert retry_delay(response(429, {"Retry-After": "7"}), 0) == 7
+    # Secondary rate limit
+    assert retry_delay(response(403, {"Retry-After": "3"}), 0) == 3
+    # Primary rate limit: wait for the reset
+    headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1010"}
+    assert retry_delay(response(403, headers), 0, now=1000) == 11
+    # ... unless it's too far away
+    headers["X-RateLimit-Reset"] = "5000"
+    assert retry_delay(response(403, headers), 0, now=1000) is None
+    # Transient errors back off exponentially (with jitter)
+    assert 4 <= retry_delay(response(503), 2) <= 6
+
+
+def test_rate_limited_request_is_retried():
+    gh = PooledGitHubInstance(token="t", repo="owner/repo")
+    gh.session = Mock()
+    gh.session.post.side_effect = [
+        response(429, {"Retry-After": "2"}),
+        response(201, json={"token": "abc"}),
+    ]
+    with patch("ec2_gha.gh.time.sleep") as mock_sleep:
+        assert gh.create_runner_token() == "abc"
+    mock_sleep.assert_called_once_with(2.0)
+    url = gh.session.post.call_args.args[0]
+    assert url == "https://api.github.com/repos/owner/repo/actions/runners/registration-token"
+
+
+def test_request_gives_up_after_max_retries():
+    gh = PooledGitHubInstance(token="t", repo="owner/repo", max_retries=2)
+    gh.session = Mock()
+    gh.session.post.return_value = response(429, {"Retry-After": "1"})
+    with patch("ec2_gha.gh.time.sleep"), pytest.raises(TokenRetrievalError):
+        gh.create_runner_token()
+    assert gh.session.post.call_count == 3
+
+
+def test_create_runner_tokens_concurrently():
+    gh = PooledGitHubInstance(token="t", repo="owner/repo", concurrency=4)
+    gh.session = Mock()
+    active, peak, lock = [0], [0], threading.Lock()
+    counter = iter(range(100))
+
+    def post(url, **kwargs):
+        with lock:
+            n = next(counter)
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return response(201, json={"token": f"t{n}"})
+
+    gh.session.post.side_effect = post
+    tokens = gh.create_runner_tokens(8)
+    assert sorted(tokens) == sorted(f"t{i}" for i in range(8))
+    assert peak[0] == 4
+
+
+def test_submit_runner_tokens_groups():
+    gh = PooledGitHubInstance(token="t", repo="owner/repo")
+    gh.session = Mock()
+    counter = iter(range(100))
+    lock = threading.Lock()
+
+    def post(url, **kwargs):
+        with lock:
+            return response(201, json={"token": f"t{next(counter)}"})
+
+    gh.session.post.side_effect = post
+    groups = [future.result() for future in gh.submit_runner_tokens(3, group_size=2)]
+    assert [len(group) for group in groups] == [2, 2, 2]
+    assert len({token for group in groups for token in group}) == 6
+
+
+def test_gather_futures():
+    first, second = Future(), Future()
+    combined = gather_futures([first, second])
+    second.set_result("b")
+    assert not combined.done()
+    first.set_result("a")
+    assert combined.result() == ["a", "b"]
+
+    failed = Future()
+    combined = gather_futures([failed])
+    failed.set_exception(TokenRetrievalError("boom"))
+    with pytest.raises(TokenRetrievalError):
+        combined.result()
+
+    assert gather_futures([]).result() == []
+
+
+def test_create_jit_config():
+    gh = PooledGitHubInstance(token="t", repo="owner/repo")
+    gh.session = Mock()
+    gh.session.post.return_value = response(201, json={"runner": {"id": 1}, "encoded_jit_config": "ZW5jb2RlZA=="})
+    config = gh.create_jit_config(labels="gpu, big")
+
+    assert config == JitRunnerConfig(label=config.label, encoded="ZW5jb2RlZA==", runner_id=1)
+    assert config.label.startswith("runner-")
+    url = gh.session.post.call_args.args[0]
+    assert url.endswith("/repos/owner/repo/actions/runners/generate-jitconfig")
+    body = gh.session.post.call_args.kwargs["json"]
+    assert body["name"] == f"ec2-{config.label}"
+    assert body["labels"] == ["self-hosted", "linux", "gpu", "big", config.label]
+
+
+def test_add_runner_labels():
+    gh = PooledGitHubInstance(token="t", repo="owner/repo")
+    gh.session = Mock()
+    gh.session.post.return_value = response(200, json={"total_count": 5, "labels": []})
+    gh.add_runner_labels(42, ["i-0", "t3.large"])
+
+    assert gh.session.post.call_args.args[0].endswith("/repos/owner/repo/actions/runners/42/labels")
+    assert gh.session.post.call_args.kwargs["json"] == {"labels": ["i-0", "t3.large"]}
+
+
+def test_delete_runner():
+    gh = PooledGitHubInstance(token="t", repo="owner/repo")
+    gh.session = Mock()
+    gh.session.delete.return_value = response(204)
+    gh.delete_runner(42)
+    assert gh.session.delete.call_args.args[0].endswith("/repos/owner/repo/actions/runners/42")
+
+
+def test_create_jit_config_error():
+    gh = PooledGitHubInstance(token="t", repo="owner/repo")
+    gh.session = Mock()
+    gh.session.post.return_value = response(422)
+    with pytest.raises(TokenRetrievalError, match="JIT runner config"):
+        gh.create_jit_config()
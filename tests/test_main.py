@@ -1,4 +1,9 @@
+import io
+import os
 import re
+import subprocess
+import sys
+
 import pytest
 from unittest.mock import patch
 from ec2_gha.__main__ import main
@@ -8,3 +13,40 @@ def test_missing_env_vars():
     with patch.dict('os.environ', clear=True):
         with pytest.raises(Exception, match=match):
             main()
+
+
+def test_validation_does_not_import_boto3():
+    """Input validation fails fast, before boto3/botocore/requests are imported"""
+    code = (
+        "import sys\n"
+        "from ec2_gha.__main__ import main\n"
+        "try:\n"
+        "    main()\n"
+        "except Exception:\n"
+        "    pass\n"
+        "assert 'boto3' not in sys.modules, 'boto3 imported before validation'\n"
+        "assert 'ec2_gha.start' not in sys.modules\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], env={"PATH": os.environ.get("PATH", "")}, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_profile_startup_report():
+    from ec2_gha import profiling
+    with patch.dict('os.environ', {"EC2_GHA_PROFILE_STARTUP": "1"}), patch.object(profiling, "_marks", []):
+        profiling.mark("inputs validated")
+        profiling.mark("first run_instances call", once=True)
+        profiling.mark("first run_instances call", once=True)
+        out = io.StringIO()
+        profiling.report(out)
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith("Startup profile")
+    assert sum("first run_instances call" in line for line in lines) == 1
+    assert any("inputs validated" in line for line in lines)
+
+
+def test_invalid_pipeline():
+    env = {"GH_PAT": "x", "AWS_ACCESS_KEY_ID": "x", "AWS_SECRET_ACCESS_KEY": "x", "INPUT_PIPELINE": "parallel"}
+    with patch.dict('os.environ', env, clear=True):
+        with pytest.raises(ValueError, match="Invalid pipeline 'parallel'"):
+            main()
@@ -0,0 +1,320 @@
+import re
+import time
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+from gha_runner.gh import SelfHostedRunner
+
+from ec2_gha import pipeline
+from ec2_gha.pipeline import AsyncDeployInstance, PrefetchDeployInstance, format_histogram, resolve_min_ready
+from ec2_gha.gh import JitRunnerConfig
+from ec2_gha.start import StartAWS
+from ec2_gha.stats import percentile
+
+
+@pytest.fixture(scope="function")
+def cloud_params(monkeypatch):
+    monkeypatch.setenv("INPUT_ACTION_REF", "v2")
+    monkeypatch.setattr(pipeline, "RUNNING_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(pipeline, "REGISTRATION_POLL_INTERVAL", 0.01)
+    return {
+        "home_dir": "/home/ec2-user",
+        "image_id": "ami-0772db4c976d21e9b",
+        "instance_type": "t2.micro",
+        "region_name": "us-east-1",
+        "repo": "omsf-eco-infra/awsinfratesting",
+    }
+
+
+class FakeCloud:
+    """Fake EC2 client and GitHub instance; instances run, and runners register, after per-instance delays"""
+
+    def __init__(self, fail_launch=(), boot_delay=lambda idx: 0, launch_delay=0):
+        self.fail_launch = set(fail_launch)
+        self.boot_delay = boot_delay
+        self.launch_delay = launch_delay
+        self.launched = {}  # instance ID -> (launch time, labels)
+        self.tokens = iter(f"t{i}" for i in range(100))
+        self.registered = []
+
+        self.ec2 = Mock()
+        self.ec2.run_instances.side_effect = self.run_instances
+        self.ec2.describe_instances.side_effect = self.describe_instances
+        self.gh = Mock()
+        self.gh.create_runner_tokens.side_effect = lambda n: [next(self.tokens) for _ in range(n)]
+        self.gh.get_latest_runner_release.return_value = "https://example.com/runner.tar.gz"
+        self.gh.get_runners.side_effect = self.get_runners
+
+    def run_instances(self, **params):
+        tags = {tag["Key"]: tag["Value"] for tag in params["TagSpecifications"][0]["Tags"]}
+        idx = int(tags["Name"].split("#")[1])
+        time.sleep(self.launch_delay)
+        if idx in self.fail_launch:
+            raise ClientError(
+                error_response={"Error": {"Code": "InsufficientInstanceCapacity"}},
+                operation_name="RunInstances",
+            )
+        instance_id = f"i-{idx}"
+        labels = re.search(r'runner_labels="([^"]*)"', params["UserData"]).group(1).split("|")
+        self.launched[instance_id] = (time.monotonic() + self.boot_delay(idx), labels)
+        return {"Instances": [{"InstanceId": instance_id}]}
+
+    def describe_instances(self, **kwargs):
+        now = time.monotonic()
+        return {"Reservations": [{"Instances": [
+            {"InstanceId": instance_id, "State": {"Name": "running" if now >= self.launched[instance_id][0] else "pending"}}
+            for instance_id in kwargs["Filters"][0]["Values"]
+        ]}]}
+
+    def get_runners(self):
+        now = time.monotonic()
+        runners = [
+            SelfHostedRunner(i, label, "linux", [label])
+            for i, (ready_at, labels) in enumerate(self.launched.values())
+            for label in labels
+            if now >= ready_at
+        ]
+        for runner in runners:
+            if runner.name not in self.registered:
+                self.registered.append(runner.name)
+        return runners or None
+
+
+def deploy(cloud_params, cloud, count, timeout=5, min_ready="", **kwargs):
+    cloud_params = cloud_params | {"instance_name": "test#$idx"} | kwargs
+    with patch("boto3.client", return_value=cloud.ec2), \
+         patch("ec2_gha.start.resolve_ref_to_sha", return_value="abc123"), \
+         patch.object(StartAWS, "set_instance_mapping") as mock_mapping:
+        deployment = AsyncDeployInstance(StartAWS, cloud_params, cloud.gh, count=count, timeout=timeout, min_ready=min_ready)
+        try:
+            deployment.start_runner_instances()
+        finally:
+            deployment.mock_mapping = mock_mapping
+    return deployment
+
+
+def test_async_pipeline(cloud_params, capsys):
+    cloud = FakeCloud()
+    deployment = deploy(cloud_params, cloud, 3)
+
+    mapping = deployment.mock_mapping.call_args.args[0]
+    assert list(mapping) == ["i-0", "i-1", "i-2"]
+    assert all(isinstance(label, str) for label in mapping.values())
+    assert sorted(cloud.registered) == sorted(mapping.values())
+    assert cloud.gh.get_latest_runner_release.call_count == 1
+    assert all(len(deployment.latencies[stage]) == 3 for stage in pipeline.STAGES)
+    out = capsys.readouterr().out
+    assert "3 runner(s) registered in" in out
+    assert "Stage latencies (seconds):" in out
+    assert set(deployment.provider.ready_latencies) == {"i-0", "i-1", "i-2"}
+
+
+def test_async_pipeline_instances_progress_independently(cloud_params):
+    """A slow-booting instance doesn't delay the others' registration"""
+    cloud = FakeCloud(boot_delay=lambda idx: 0.3 if idx == 0 else 0)
+    deploy(cloud_params, cloud, 3)
+    slow_label = cloud.launched["i-0"][1][0]
+    assert cloud.registered[-1] == slow_label
+
+
+def test_async_pipeline_runners_per_instance(cloud_params):
+    cloud = FakeCloud()
+    deployment = deploy(cloud_params, cloud, 2, runners_per_instance=2)
+    mapping = deployment.mock_mapping.call_args.args[0]
+    assert all(len(labels) == 2 for labels in mapping.values())
+    assert [c.args for c in cloud.gh.create_runner_tokens.call_args_list] == [(2,), (2,)]
+
+
+def test_async_pipeline_partial_launch_failure(cloud_params, capsys):
+    cloud = FakeCloud(fail_launch={1})
+    deployment = deploy(cloud_params, cloud, 3)
+    assert list(deployment.mock_mapping.call_args.args[0]) == ["i-0", "i-2"]
+    assert "::warning title=Failed to launch instance 1::" in capsys.readouterr().out
+
+
+def test_async_pipeline_not_ready(cloud_params):
+    """Launched instances that never start are still published (so the stop job removes them), then fail the run"""
+    cloud = FakeCloud(boot_delay=lambda idx: 60 if idx == 1 else 0)
+    with pytest.raises(RuntimeError, match="1 instance\\(s\\) launched but not ready: i-1"):
+        deploy(cloud_params, cloud, 2, timeout=0.5)
+
+
+def test_async_pipeline_admits_registered_to_pool(cloud_params):
+    """Only instances whose runners registered join the warm pool; failed ones stay pending, for trim"""
+    cloud = FakeCloud(boot_delay=lambda idx: 60 if idx == 1 else 0)
+    with patch.object(StartAWS, "admit_to_pool") as admit, pytest.raises(RuntimeError, match="not ready: i-1"):
+        deploy(cloud_params, cloud, 2, timeout=0.5)
+    admit.assert_called_once_with(["i-0"])
+
+
+def test_prefetch_deploy_admits_registered_to_pool(cloud_params):
+    cloud = FakeCloud(boot_delay=lambda idx: 60 if idx == 0 else 0)
+    futures = [Future() for _ in range(3)]
+    for i, future in enumerate(futures):
+        future.set_result([f"t{i}"])
+    cloud.gh.submit_runner_tokens.return_value = futures
+    with patch("boto3.client", return_value=cloud.ec2), \
+         patch("ec2_gha.start.resolve_ref_to_sha", return_value="abc123"), \
+         patch("ec2_gha.pipeline.REGISTRATION_POLL_INTERVAL", 0.01), \
+         patch.object(StartAWS, "set_instance_mapping"), \
+         patch.object(StartAWS, "admit_to_pool") as admit:
+        PrefetchDeployInstance(
+            StartAWS, cloud_params | {"instance_name": "test#$idx"}, cloud.gh, count=3, timeout=5, min_ready="2",
+        ).start_runner_instances()
+    admit.assert_called_once_with(["i-1", "i-2"])
+
+
+def test_async_pipeline_min_ready(cloud_params, capsys):
+    """Outputs are published once min_ready runners register, without waiting for stragglers (which are still included)"""
+    cloud = FakeCloud(boot_delay=lambda idx: 60 if idx == 1 else 0)
+    start = time.monotonic()
+    deployment = deploy(cloud_params, cloud, 3, timeout=30, min_ready="0.5")
+    assert time.monotonic() - start < 10
+    assert deployment.required == 2
+    mapping = deployment.mock_mapping.call_args.args[0]
+    assert list(mapping) == ["i-0", "i-1", "i-2"]
+    assert mapping["i-1"] not in deployment._registered_labels
+    assert "not waiting for the rest" in capsys.readouterr().out
+
+
+def test_async_pipeline_min_ready_launch_bottleneck(cloud_params):
+    """Reaching min_ready doesn't cancel launches still queued behind launch_concurrency"""
+    cloud = FakeCloud(launch_delay=0.3)
+    deployment = deploy(cloud_params, cloud, 4, timeout=30, min_ready="1", launch_concurrency=1)
+    assert list(cloud.launched) == ["i-0", "i-1", "i-2", "i-3"]
+    assert list(deployment.mock_mapping.call_args.args[0]) == ["i-0", "i-1", "i-2", "i-3"]
+    assert cloud.gh.create_runner_tokens.call_count == 4
+
+
+def test_async_pipeline_min_ready_unreachable(cloud_params, capsys):
+    """Launch failures leaving fewer than min_ready runners fail the run (after publishing the launched instances)"""
+    cloud = FakeCloud(fail_launch={1, 2})
+    with pytest.raises(RuntimeError, match="Only 1 runner\\(s\\) registered, fewer than min_ready \\(2\\)"):
+        deploy(cloud_params, cloud, 3, min_ready="2")
+    assert "::warning title=Failed to launch instance 1::" in capsys.readouterr().out
+
+
+def test_async_pipeline_nothing_launched(cloud_params):
+    cloud = FakeCloud(fail_launch={0})
+    with pytest.raises(ClientError, match="InsufficientInstanceCapacity"):
+        deploy(cloud_params, cloud, 1)
+
+
+def test_prefetch_deploy_min_ready(cloud_params):
+    cloud = FakeCloud(boot_delay=lambda idx: 60 if idx == 0 else 0)
+    futures = [Future() for _ in range(3)]
+    for i, future in enumerate(futures):
+        future.set_result([f"t{i}"])
+    cloud.gh.submit_runner_tokens.return_value = futures
+    with patch("boto3.client", return_value=cloud.ec2), \
+         patch("ec2_gha.start.resolve_ref_to_sha", return_value="abc123"), \
+         patch("ec2_gha.pipeline.REGISTRATION_POLL_INTERVAL", 0.01), \
+         patch.object(StartAWS, "set_instance_mapping") as mock_mapping:
+        deployment = PrefetchDeployInstance(
+            StartAWS, cloud_params | {"instance_name": "test#$idx"}, cloud.gh, count=3, timeout=5, min_ready="2",
+        )
+        deployment.start_runner_instances()
+    # The straggler (i-0, not yet registered) is still published
+    mapping = mock_mapping.call_args.args[0]
+    assert list(mapping) == ["i-0", "i-1", "i-2"]
+    registered = {label for runner in cloud.gh.get_runners() for label in runner.labels}
+    assert mapping["i-0"] not in registered
+
+
+def test_resolve_min_ready():
+    assert resolve_min_ready("", 20) == 20
+    assert resolve_min_ready("all", 20) == 20
+    assert resolve_min_ready("15", 20) == 15
+    assert resolve_min_ready("50", 20) == 20
+    assert resolve_min_ready("0.75", 20) == 15
+    assert resolve_min_ready("0.01", 20) == 1
+    assert resolve_min_ready("75%", 20) == 15
+    with pytest.raises(ValueError, match="Invalid min_ready"):
+        resolve_min_ready("most", 20)
+    with pytest.raises(ValueError, match="must be positive"):
+        resolve_min_ready("0", 20)
+
+
+def test_percentile():
+    values = [5, 1, 4, 2, 3]
+    assert percentile(values, 50) == 3
+    assert percentile(values, 95) == 5
+    assert percentile(values, 0) == 1
+
+
+def test_format_histogram():
+    report = format_histogram({"token": [0.2, 0.4, 1.5], "launch": [], "running": [400]})
+    lines = report.splitlines()
+    assert lines[0] == "Stage latencies (seconds):"
+    assert not any("launch" in line for line in lines)
+    assert re.search(r"token\s+n=3\s+p50=\s*0.40\s+p95=\s*1.50\s+max=\s*1.50", report)
+    assert re.search(r"<=1s #+ 2$", report, re.M)
+    assert re.search(r"<=2s #+ 1$", report, re.M)
+    assert re.search(r">300s #+ 1$", report, re.M)
+
+
+def test_prefetch_deploy_launches_as_tokens_arrive(cloud_params):
+    """With token futures, the first instance launches before later instances' tokens exist"""
+    cloud = FakeCloud()
+    futures = [Future() for _ in range(2)]
+    cloud.gh.submit_runner_tokens.return_value = futures
+    launched_before_tokens = []
+
+    def run_instances(**params):
+        launched_before_tokens.append(not futures[1].done())
+        if not futures[1].done():
+            futures[1].set_result(["t1"])
+        return cloud.run_instances(**params)
+
+    cloud.ec2.run_instances.side_effect = run_instances
+    futures[0].set_result(["t0"])
+    with patch("boto3.client", return_value=cloud.ec2), \
+         patch("ec2_gha.start.resolve_ref_to_sha", return_value="abc123"):
+        deployment = PrefetchDeployInstance(StartAWS, cloud_params | {"instance_name": "test#$idx"}, cloud.gh, count=2, timeout=5)
+        mapping = deployment.provider.create_instances()
+
+    cloud.gh.submit_runner_tokens.assert_called_once_with(2, 1)
+    cloud.gh.create_runner_tokens.assert_not_called()
+    assert launched_before_tokens[0]
+    assert list(mapping) == ["i-0", "i-1"]
+
+
+def test_prefetch_deploy_jit_config(cloud_params):
+    cloud = FakeCloud()
+    cloud.gh.submit_jit_configs.return_value = []
+    with patch("ec2_gha.start.resolve_ref_to_sha", return_value="abc123"):
+        PrefetchDeployInstance(StartAWS, cloud_params | {"jit_config": "true", "labels": "gpu"}, cloud.gh, count=2, timeout=5)
+    cloud.gh.submit_jit_configs.assert_called_once_with(2, 1, labels="gpu")
+    cloud.gh.submit_runner_tokens.assert_not_called()
+
+
+def jit_configs(n: int) -> list[list[JitRunnerConfig]]:
+    return [[JitRunnerConfig(label=f"runner-jit{i}", encoded="ZW5jb2RlZA==", runner_id=i + 1)] for i in range(n)]
+
+
+def test_prefetch_deploy_jit_config_invalid(cloud_params):
+    """JIT runners registered before the provider's validation fails are removed"""
+    cloud = FakeCloud()
+    futures = [Future() for _ in range(2)]
+    for future, configs in zip(futures, jit_configs(2)):
+        future.set_result(configs)
+    cloud.gh.submit_jit_configs.return_value = futures
+    with pytest.raises(ValueError, match="userdata_mode"):
+        PrefetchDeployInstance(StartAWS, cloud_params | {"jit_config": "true", "userdata_mode": "bogus"}, cloud.gh, count=2, timeout=5)
+    assert sorted(c.args[0] for c in cloud.gh.delete_runner.call_args_list) == [1, 2]
+
+
+def test_async_pipeline_jit_config_failed_launch(cloud_params, capsys):
+    """The JIT runners of an instance that fails to launch are removed"""
+    cloud = FakeCloud(fail_launch={1})
+    configs = iter(jit_configs(2))
+    cloud.gh.create_jit_configs.side_effect = lambda n, labels: next(configs)
+    deployment = deploy(cloud_params, cloud, 2, jit_config="true")
+
+    launched = {label for _, labels in cloud.launched.values() for label in labels}
+    assert len(deployment.mock_mapping.call_args.args[0]) == 1
+    cloud.gh.delete_runner.assert_called_once()
+    removed = cloud.gh.delete_runner.call_args.args[0]
+    assert f"runner-jit{removed - 1}" not in launched
@@ -0,0 +1,85 @@
+import hashlib
+import io
+from unittest.mock import Mock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+
+from ec2_gha.runner_mirror import DOWNLOAD_TIMEOUT, resolve_runner_source, tarball_name
+
+RELEASE = "https://github.com/actions/runner/releases/download/v2.328.0/actions-runner-linux-x64-2.328.0.tar.gz"
+TARBALL = b"runner tarball"
+SHA256 = hashlib.sha256(TARBALL).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    resolve_runner_source.cache_clear()
+    yield
+    resolve_runner_source.cache_clear()
+
+
+@pytest.fixture(scope="function")
+def s3():
+    s3 = Mock()
+    s3.generate_presigned_url.return_value = "https://bucket.s3.amazonaws.com/runners/tarball?X-Amz-Signature=sig"
+    with patch("ec2_gha.runner_mirror.get_client", return_value=s3):
+        yield s3
+
+
+def test_tarball_name():
+    assert tarball_name(RELEASE) == "actions-runner-linux-x64-2.328.0.tar.gz"
+
+
+def test_s3_hit(s3):
+    s3.head_object.return_value = {"Metadata": {"sha256": SHA256}}
+    source = resolve_runner_source("s3://bucket/runners/", RELEASE, "us-east-1")
+    assert source.sha256 == SHA256
+    assert source.url.startswith("https://bucket.s3.amazonaws.com/")
+    s3.head_object.assert_called_once_with(Bucket="bucket", Key="runners/actions-runner-linux-x64-2.328.0.tar.gz")
+    s3.upload_fileobj.assert_not_called()
+
+
+def test_s3_miss_populates(s3):
+    """On first use, the release is downloaded, hashed and uploaded (with a checksum sidecar)"""
+    s3.head_object.side_effect = ClientError({"Error": {"Code": "404"}}, "HeadObject")
+    uploaded = {}
+
+    def upload_fileobj(f, bucket, key, **kwargs):
+        uploaded[key] = (f.read(), kwargs["ExtraArgs"])
+
+    s3.upload_fileobj.side_effect = upload_fileobj
+    with patch("ec2_gha.runner_mirror.urllib.request.urlopen", return_value=io.BytesIO(TARBALL)):
+        source = resolve_runner_source("s3://bucket", RELEASE, "us-east-1")
+
+    assert source.sha256 == SHA256
+    assert uploaded["actions-runner-linux-x64-2.328.0.tar.gz"] == (TARBALL, {"Metadata": {"sha256": SHA256}})
+    sidecar = s3.put_object.call_args.kwargs
+    assert sidecar["Key"] == "actions-runner-linux-x64-2.328.0.tar.gz.sha256"
+    assert sidecar["Body"].decode().startswith(SHA256)
+
+
+def test_s3_access_denied(s3):
+    s3.head_object.side_effect = ClientError({"Error": {"Code": "403"}}, "HeadObject")
+    with pytest.raises(ClientError):
+        resolve_runner_source("s3://bucket", RELEASE, "us-east-1")
+
+
+def test_http_mirror():
+    sidecar = io.BytesIO(f"{SHA256}  actions-runner-linux-x64-2.328.0.tar.gz\n".encode())
+    with patch("ec2_gha.runner_mirror.urllib.request.urlopen", return_value=sidecar) as urlopen:
+        source = resolve_runner_source("https://mirror.example.com/runners/", RELEASE, "us-east-1")
+    assert source.url == "https://mirror.example.com/runners/actions-runner-linux-x64-2.328.0.tar.gz"
+    assert source.sha256 == SHA256
+    urlopen.assert_called_once_with(f"{source.url}.sha256", timeout=DOWNLOAD_TIMEOUT)
+
+
+def test_http_mirror_without_checksum():
+    with patch("ec2_gha.runner_mirror.urllib.request.urlopen", side_effect=OSError("404")):
+        source = resolve_runner_source("https://mirror.example.com", RELEASE, "us-east-1")
+    assert source.sha256 == ""
+
+
+def test_invalid_mirror():
+    with pytest.raises(ValueError, match="Invalid runner_mirror"):
+        resolve_runner_source("ftp://mirror", RELEASE, "us-east-1")
@@ -1,11 +1,17 @@
+import base64
+import gzip
+import random
+import re
+import time
 from unittest.mock import patch, mock_open, Mock
 
 import pytest
-from botocore.exceptions import WaiterError, ClientError
+from botocore.exceptions import NoCredentialsError, WaiterError, ClientError
 from moto import mock_aws
 
-from ec2_gha.start import StartAWS
+from ec2_gha.start import EMBEDDED_SCRIPTS, StartAWS, verify_packaged_scripts
 from ec2_gha.defaults import AUTO
+from ec2_gha.gh import JitRunnerConfig
 
 
 @pytest.fixture(scope="function")
@@ -112,6 +118,61 @@ def test_build_user_data_missing_params(aws):
         aws._build_user_data(**params)
 
 
+def test_build_user_data_embedded(aws, aws_params_user_data):
+    """Embedded UserData is gzipped, self-contained, and well under the 16KB limit"""
+    aws.userdata_mode = "embedded"
+    user_data = aws._build_user_data(**aws_params_user_data)
+    assert isinstance(user_data, bytes)
+    assert len(user_data) < 16384
+    script = gzip.decompress(user_data).decode()
+    header = script.split("cat > ")[0]
+    assert "curl" not in header and "wget" not in header
+    for dest in EMBEDDED_SCRIPTS.values():
+        assert f"cat > {dest} << 'EC2_GHA_EOF'" in script
+    assert script.rstrip().endswith("exec /tmp/runner-setup.sh")
+    # Deterministic output (no gzip timestamp)
+    assert aws._build_user_data(**aws_params_user_data) == user_data
+
+
+def test_user_data_templates_export_same_vars(aws, aws_params_user_data):
+    """Both UserData modes export the same variables to runner-setup.sh"""
+    fetch = aws._build_user_data(**aws_params_user_data)
+    aws.userdata_mode = "embedded"
+    embedded = gzip.decompress(aws._build_user_data(**aws_params_user_data)).decode().split("cat > ")[0]
+
+    def exports(script):
+        return set(re.findall(r"^export (\w+)=", script, re.M))
+
+    assert exports(embedded) - exports(fetch) == {"scripts_embedded"}
+
+
+def test_build_user_data_embedded_too_large(aws, aws_params_user_data, capsys):
+    """Embedded UserData over the 16KB limit (gzipped) falls back to fetch mode"""
+    aws.userdata_mode = "embedded"
+    # Incompressible custom userdata
+    aws_params_user_data["userdata"] = base64.b64encode(random.randbytes(16384)).decode()
+    user_data = aws._build_user_data(**aws_params_user_data)
+    assert isinstance(user_data, str)
+    assert "scripts_embedded" not in user_data
+    assert "SCRIPT_URL=" in user_data
+    assert "falling back to fetch mode" in capsys.readouterr().out
+
+
+def test_invalid_userdata_mode(base_aws_params):
+    with pytest.raises(ValueError, match="Invalid userdata_mode"):
+        StartAWS(**base_aws_params, userdata_mode="inline")
+
+
+def test_verify_packaged_scripts_mismatch():
+    """Packaged scripts that differ from the resolved SHA are rejected"""
+    stdout = "".join(
+        f"100644 blob {'0' * 40}\tsrc/ec2_gha/{name}\n" for name in EMBEDDED_SCRIPTS
+    )
+    with patch("ec2_gha.start.subprocess.run", return_value=Mock(stdout=stdout)):
+        with pytest.raises(RuntimeError, match="does not match"):
+            verify_packaged_scripts("abc123")
+
+
 @pytest.fixture(scope="function")
 def complete_params(base_aws_params):
     """Extended parameters including AWS-specific configurations"""
@@ -397,6 +458,432 @@ def test_create_instances(aws):
     assert len(ids) == 1
 
 
+def test_create_instances_parallel_preserves_order(aws):
+    """Instances launch concurrently, but the mapping follows instance-index order"""
+    aws.gh_runner_tokens = ["t0", "t1", "t2", "t3"]
+    launched = []
+
+    def mock_run_instances(**params):
+        # Finish launches in reverse order of submission
+        user_data = params["UserData"]
+        idx = next(i for i in range(4) if f'runner_tokens="t{i}"' in user_data)
+        time.sleep((4 - idx) * 0.05)
+        launched.append(idx)
+        return {"Instances": [{"InstanceId": f"i-{idx}"}]}
+
+    with patch("boto3.client") as mock_client:
+        mock_client.return_value.run_instances.side_effect = mock_run_instances
+        result = aws.create_instances()
+
+    assert launched != sorted(launched)
+    assert list(result) == ["i-0", "i-1", "i-2", "i-3"]
+    assert set(aws.launch_latencies) == set(result)
+
+
+def test_create_instances_jit_config(aws):
+    """JIT configs replace registration tokens in the UserData, and keep their registered labels"""
+    aws.jit_config = "true"
+    aws.gh_runner_tokens = []
+    aws.grouped_runner_tokens = [[JitRunnerConfig(label="runner-jit00001", encoded="ZW5jb2RlZA==")]]
+    with patch("boto3.client") as mock_client:
+        mock_client.return_value.run_instances.return_value = {"Instances": [{"InstanceId": "i-0"}]}
+        result = aws.create_instances()
+
+    assert result == {"i-0": "runner-jit00001"}
+    user_data = mock_client.return_value.run_instances.call_args.kwargs["UserData"]
+    assert 'runner_tokens="ZW5jb2RlZA=="' in user_data
+    assert 'runner_labels="runner-jit00001"' in user_data
+    assert 'runner_jit="true"' in user_data
+
+
+def test_create_instances_jit_config_failed_launch(aws):
+    """JIT runners (registered before launch) of instances that fail to launch are removed"""
+    aws.jit_config = "true"
+    aws.gh_runner_tokens = []
+    aws.grouped_runner_tokens = [
+        [JitRunnerConfig(label="runner-a", encoded="YQ==", runner_id=1)],
+        [JitRunnerConfig(label="runner-b", encoded="Yg==", runner_id=2)],
+    ]
+    aws.runner_remover = Mock()
+    with patch("boto3.client") as mock_client:
+        mock_client.return_value.run_instances.side_effect = lambda **params: (
+            {"Instances": [{"InstanceId": "i-0"}]} if 'runner_labels="runner-a"' in params["UserData"]
+            else (_ for _ in ()).throw(ClientError({"Error": {"Code": "InsufficientInstanceCapacity"}}, "RunInstances"))
+        )
+        assert aws.create_instances() == {"i-0": "runner-a"}
+        aws.runner_remover.assert_called_once_with(2)
+
+        # If every launch fails, every runner is removed
+        aws.runner_remover.reset_mock()
+        mock_client.return_value.run_instances.side_effect = ClientError({"Error": {"Code": "InsufficientInstanceCapacity"}}, "RunInstances")
+        with pytest.raises(ClientError):
+            aws.create_instances()
+    assert sorted(c.args[0] for c in aws.runner_remover.call_args_list) == [1, 2]
+
+
+def test_create_instances_jit_config_metadata_labels(aws):
+    """JIT runners get the instance ID/type/name labels (set at boot for other runners) once launched"""
+    aws.jit_config = "true"
+    aws.instance_name = "repo/ci#7 $idx"
+    aws.gh_runner_tokens = []
+    aws.grouped_runner_tokens = [[JitRunnerConfig(label="runner-jit00001", encoded="ZW5jb2RlZA==", runner_id=42)]]
+    aws.runner_labeler = Mock()
+    with patch("boto3.client") as mock_client:
+        mock_client.return_value.run_instances.return_value = {"Instances": [{"InstanceId": "i-0"}]}
+        aws.create_instances()
+
+    aws.runner_labeler.assert_called_once_with(42, ["i-0", "t2.micro", "repo-ci#7-0"])
+
+
+def test_jit_config_user_data_size(base_aws_params):
+    """Too many JIT configs per instance for the 16KB UserData are rejected up front"""
+    with pytest.raises(ValueError, match="over the 16KB limit"):
+        StartAWS(**base_aws_params, jit_config="true", runners_per_instance=8)
+    StartAWS(**base_aws_params, jit_config="true", runners_per_instance=4)
+
+
+def test_create_instances_warm_pool(aws):
+    """Claimed pool instances are resumed with new UserData, the rest are launched into the pool"""
+    aws.warm_pool = "true"
+    aws.gh_runner_tokens = ["t0", "t1"]
+    with (
+        patch("ec2_gha.start.WarmPool.acquire", return_value=["i-pooled"]),
+        patch("ec2_gha.start.WarmPool.trim", return_value=[]) as trim,
+        patch("boto3.client") as mock_client,
+    ):
+        ec2 = mock_client.return_value
+        ec2.run_instances.return_value = {"Instances": [{"InstanceId": "i-new"}]}
+        ec2.describe_instance_attribute.side_effect = lambda **kwargs: {"UserData": {
+            "Value": base64.b64encode(ec2.modify_instance_attribute.call_args.kwargs["UserData"]["Value"]).decode(),
+        }}
+        result = aws.create_instances()
+
+    assert list(result) == ["i-pooled", "i-new"]
+    trim.assert_called_once_with(exclude=("i-pooled",))
+    user_data = ec2.modify_instance_attribute.call_args.kwargs["UserData"]["Value"].decode()
+    assert 'runner_tokens="t0"' in user_data
+    assert 'warm_pool="true"' in user_data
+    ec2.start_instances.assert_called_once_with(InstanceIds=["i-pooled"])
+
+    params = ec2.run_instances.call_args.kwargs
+    assert 'runner_tokens="t1"' in params["UserData"]
+    assert params["InstanceInitiatedShutdownBehavior"] == "stop"
+    tag_keys = {tag["Key"] for tag in params["TagSpecifications"][0]["Tags"]}
+    # Only pending, until its runners register (see `admit_to_pool`)
+    assert {"ec2-gha:pool-pending", "ec2-gha:pool-created"} <= tag_keys
+    assert "ec2-gha:pool" not in tag_keys
+
+
+def test_create_instances_runner_mirror_unavailable(aws, capsys):
+    """Mirror errors (including botocore ones, e.g. missing credentials) fall back to the GitHub release"""
+    aws.runner_mirror = "s3://bucket/runners"
+    with (
+        patch("ec2_gha.start.resolve_runner_source", side_effect=NoCredentialsError()),
+        patch("boto3.client") as mock_client,
+    ):
+        mock_client.return_value.run_instances.return_value = {"Instances": [{"InstanceId": "i-0"}]}
+        assert list(aws.create_instances()) == ["i-0"]
+
+    assert "::warning title=Runner mirror unavailable::" in capsys.readouterr().out
+
+
+def test_create_instances_warm_pool_lost(aws, capsys):
+    """A pooled instance started (with its own UserData) by a concurrent run is replaced by a new one"""
+    aws.warm_pool = "true"
+    aws.gh_runner_tokens = ["t0"]
+    with (
+        patch("ec2_gha.start.WarmPool.acquire", return_value=["i-pooled"]),
+        patch("ec2_gha.start.WarmPool.trim", return_value=[]),
+        patch("boto3.client") as mock_client,
+    ):
+        ec2 = mock_client.return_value
+        ec2.run_instances.return_value = {"Instances": [{"InstanceId": "i-new"}]}
+        ec2.describe_instance_attribute.return_value = {"UserData": {"Value": "b3RoZXI="}}
+        result = aws.create_instances()
+
+    assert list(result) == ["i-new"]
+    ec2.create_tags.assert_not_called()
+    assert "resumed by a concurrent run" in capsys.readouterr().out
+
+
+def test_warm_pool_incompatible_with_spot(base_aws_params):
+    with pytest.raises(ValueError, match="spot"):
+        StartAWS(**base_aws_params, warm_pool="true", spot="true")
+
+
+def test_create_instances_partial_failure(aws, capsys):
+    """Failed launches are reported, successful ones are still returned"""
+    aws.gh_runner_tokens = ["t0", "t1", "t2"]
+
+    def mock_run_instances(**params):
+        if 'runner_tokens="t1"' in params["UserData"]:
+            raise ClientError(
+                error_response={"Error": {"Code": "InsufficientInstanceCapacity"}},
+                operation_name="RunInstances",
+            )
+        idx = 0 if 'runner_tokens="t0"' in params["UserData"] else 2
+        return {"Instances": [{"InstanceId": f"i-{idx}"}]}
+
+    with patch("boto3.client") as mock_client:
+        mock_client.return_value.run_instances.side_effect = mock_run_instances
+        result = aws.create_instances()
+
+    assert list(result) == ["i-0", "i-2"]
+    assert "::warning title=Failed to launch instance 1::" in capsys.readouterr().out
+
+
+def test_create_instances_all_failed(aws):
+    aws.gh_runner_tokens = ["t0", "t1"]
+    with patch("boto3.client") as mock_client:
+        mock_client.return_value.run_instances.side_effect = ClientError(
+            error_response={"Error": {"Code": "InsufficientInstanceCapacity"}},
+            operation_name="RunInstances",
+        )
+        with pytest.raises(ClientError, match="InsufficientInstanceCapacity"):
+            aws.create_instances()
+
+
+def test_create_instances_computes_launch_plan_once(aws):
+    """SHA resolution and AMI lookups happen once per run, not once per instance"""
+    aws.gh_runner_tokens = ["t0", "t1", "t2"]
+    aws.root_device_size = "+5"
+    image = {
+        "RootDeviceName": "/dev/sda1",
+        "BlockDeviceMappings": [{"DeviceName": "/dev/sda1", "Ebs": {"VolumeSize": 8}}],
+    }
+
+    def mock_describe_images(**kwargs):
+        if kwargs.get("DryRun"):
+            raise ClientError(
+                error_response={"Error": {"Code": "DryRunOperation"}},
+                operation_name="DescribeImages",
+            )
+        return {"Images": [image]}
+
+    with patch("boto3.client") as mock_client, patch("ec2_gha.start.resolve_ref_to_sha", return_value="abc123") as mock_resolve:
+        mock_ec2 = mock_client.return_value
+        mock_ec2.describe_images.side_effect = mock_describe_images
+        mock_ec2.run_instances.side_effect = [{"Instances": [{"InstanceId": f"i-{i}"}]} for i in range(3)]
+        aws.create_instances()
+
+    assert mock_resolve.call_count == 1
+    assert mock_ec2.describe_images.call_count == 2
+    launches = [call.kwargs for call in mock_ec2.run_instances.call_args_list]
+    assert all(params["BlockDeviceMappings"][0]["Ebs"]["VolumeSize"] == 13 for params in launches)
+    # Each instance gets its own copy of the block device mappings
+    assert launches[0]["BlockDeviceMappings"] is not launches[1]["BlockDeviceMappings"]
+
+
+def test_create_instances_launch_template(aws):
+    """Launch templates are keyed by config hash and reused across runs"""
+    import boto3
+    aws.launch_template = "true"
+    aws.gh_runner_tokens = ["t0", "t1"]
+    ids = aws.create_instances()
+    assert len(ids) == 2
+
+    ec2 = boto3.client("ec2", region_name="us-east-1")
+    templates = ec2.describe_launch_templates()["LaunchTemplates"]
+    assert len(templates) == 1
+    assert templates[0]["LaunchTemplateName"].startswith("ec2-gha-")
+    instances = ec2.describe_instances(InstanceIds=list(ids))["Reservations"][0]["Instances"]
+    assert {i["ImageId"] for i in instances} == {"ami-0772db4c976d21e9b"}
+
+    # A later run with the same configuration reuses the template
+    aws.create_instances()
+    assert len(ec2.describe_launch_templates()["LaunchTemplates"]) == 1
+
+    # A different configuration gets its own template
+    aws.instance_type = "t3.micro"
+    aws.create_instances()
+    assert len(ec2.describe_launch_templates()["LaunchTemplates"]) == 2
+
+
+def test_create_instances_launch_template_overrides_only(aws):
+    """With a launch template, run_instances only carries per-instance overrides"""
+    aws.launch_template = "true"
+    aws.subnet_id = "subnet-123"
+    with patch("boto3.client") as mock_client:
+        client = mock_client.return_value
+        client.describe_launch_templates.return_value = {"LaunchTemplates": [{"LaunchTemplateId": "lt-123"}]}
+        client.run_instances.return_value = {"Instances": [{"InstanceId": "i-0"}]}
+        aws.create_instances()
+
+    client.create_launch_template.assert_not_called()
+    params = client.run_instances.call_args.kwargs
+    assert params["LaunchTemplate"] == {"LaunchTemplateId": "lt-123", "Version": "$Default"}
+    assert set(params) == {"LaunchTemplate", "MinCount", "MaxCount", "UserData", "SubnetId", "TagSpecifications"}
+
+
+def test_fleet_overrides(aws):
+    """Overrides cover each (type, subnet) pair, in priority order"""
+    aws.instance_types = "g5.xlarge, g6.xlarge"
+    aws.subnet_ids = "subnet-a,subnet-b"
+    assert aws.use_fleet
+    assert aws._fleet_overrides() == [
+        {"InstanceType": "g5.xlarge", "Priority": 0.0, "SubnetId": "subnet-a"},
+        {"InstanceType": "g5.xlarge", "Priority": 1.0, "SubnetId": "subnet-b"},
+        {"InstanceType": "g6.xlarge", "Priority": 2.0, "SubnetId": "subnet-a"},
+        {"InstanceType": "g6.xlarge", "Priority": 3.0, "SubnetId": "subnet-b"},
+    ]
+
+
+def test_create_instances_fleet(aws, capsys):
+    """One CreateFleet call launches all instances; each is tagged with its index and its own runner tokens"""
+    aws.gh_runner_tokens = ["t0", "t1", "t2"]
+    aws.labels = "gpu"
+    aws.instance_types = "g5.xlarge,g6.xlarge"
+    with patch("boto3.client") as mock_client:
+        client = mock_client.return_value
+        client.describe_launch_templates.return_value = {"LaunchTemplates": [{"LaunchTemplateId": "lt-123"}]}
+        client.create_launch_template_version.return_value = {"LaunchTemplateVersion": {"VersionNumber": 7}}
+        client.create_fleet.return_value = {
+            "Instances": [{"InstanceIds": ["i-a", "i-b"]}],
+            "Errors": [{"ErrorCode": "InsufficientInstanceCapacity", "ErrorMessage": "No capacity"}],
+        }
+        result = aws.create_instances()
+
+    client.run_instances.assert_not_called()
+    assert client.create_fleet.call_count == 1
+    fleet = client.create_fleet.call_args.kwargs
+    assert fleet["Type"] == "instant"
+    assert fleet["TargetCapacitySpecification"]["TotalTargetCapacity"] == 3
+    assert fleet["LaunchTemplateConfigs"][0]["LaunchTemplateSpecification"] == {"LaunchTemplateId": "lt-123", "Version": "7"}
+
+    version_data = client.create_launch_template_version.call_args.kwargs["LaunchTemplateData"]
+    assert version_data["MetadataOptions"]["InstanceMetadataTags"] == "enabled"
+    user_data = base64.b64decode(version_data["UserData"]).decode()
+    # No instance's tokens are in the shared UserData
+    assert 'runner_tokens=""' in user_data
+    assert 'runner_labels="gpu"' in user_data
+    assert "t0" not in user_data
+    client.delete_launch_template_versions.assert_called_once_with(LaunchTemplateId="lt-123", Versions=["7"])
+
+    # Each instance is tagged with its index, and its runner's token and generated label
+    tags = {
+        c.kwargs["Resources"][0]: {t["Key"]: t["Value"] for t in c.kwargs["Tags"]}
+        for c in client.create_tags.call_args_list
+    }
+    assert {instance_id: t["ec2-gha:index"] for instance_id, t in tags.items()} == {"i-a": "0", "i-b": "1"}
+    runner_tags = {instance_id: t["ec2-gha:runner-0"].split() for instance_id, t in tags.items()}
+    assert [token for token, _ in runner_tags.values()] == ["t0", "t1"]
+    assert list(result.items()) == [(instance_id, f"gpu,{label}") for instance_id, (_, label) in runner_tags.items()]
+    assert "::warning title=Fleet launched 2/3 instances::InsufficientInstanceCapacity" in capsys.readouterr().out
+
+
+def test_create_instances_fleet_jit_falls_back(aws, capsys):
+    """JIT configs don't fit in tags, so fleet launches fall back to run_instances"""
+    aws.grouped_runner_tokens = [[JitRunnerConfig("runner-a", "x" * 2048)], [JitRunnerConfig("runner-b", "y" * 2048)]]
+    aws.jit_config = "true"
+    aws.instance_types = "g5.xlarge,g6.xlarge"
+    with patch("boto3.client") as mock_client:
+        client = mock_client.return_value
+        client.describe_launch_templates.return_value = {"LaunchTemplates": [{"LaunchTemplateId": "lt-123"}]}
+        client.run_instances.side_effect = [{"Instances": [{"InstanceId": "i-0"}]}, {"Instances": [{"InstanceId": "i-1"}]}]
+        result = aws.create_instances()
+
+    client.create_fleet.assert_not_called()
+    assert client.run_instances.call_count == 2
+    assert sorted(result.values()) == ["runner-a", "runner-b"]
+    assert "::warning title=Fleet launch unavailable::" in capsys.readouterr().out
+
+
+def test_create_instances_fleet_no_capacity(aws):
+    aws.subnet_ids = "subnet-a"
+    with patch("boto3.client") as mock_client:
+        client = mock_client.return_value
+        client.describe_launch_templates.return_value = {"LaunchTemplates": [{"LaunchTemplateId": "lt-123"}]}
+        client.create_launch_template_version.return_value = {"LaunchTemplateVersion": {"VersionNumber": 2}}
+        client.create_fleet.return_value = {"Instances": [], "Errors": [{"ErrorCode": "InsufficientInstanceCapacity"}]}
+        with pytest.raises(RuntimeError, match="Fleet launched no instances"):
+            aws.create_instances()
+
+
+def spot_capacity_error():
+    return ClientError(
+        error_response={"Error": {"Code": "InsufficientInstanceCapacity"}},
+        operation_name="RunInstances",
+    )
+
+
+def test_create_instances_spot(aws):
+    aws.spot = "true"
+    aws.spot_max_price = "0.05"
+    with patch("boto3.client") as mock_client:
+        client = mock_client.return_value
+        client.run_instances.return_value = {"Instances": [{"InstanceId": "i-0"}]}
+        aws.create_instances()
+
+    params = client.run_instances.call_args.kwargs
+    assert params["InstanceMarketOptions"] == {
+        "MarketType": "spot",
+        "SpotOptions": {"SpotInstanceType": "one-time", "InstanceInterruptionBehavior": "terminate", "MaxPrice": "0.05"},
+    }
+    assert {"Key": "Market", "Value": "spot"} in params["TagSpecifications"][0]["Tags"]
+
+
+def test_create_instances_spot_fallback(aws):
+    """Spot capacity errors are retried until spot_timeout, then launched on-demand"""
+    aws.spot = "true"
+    aws.spot_timeout = "0.2"
+    with patch("boto3.client") as mock_client:
+        client = mock_client.return_value
+
+        def mock_run_instances(**params):
+            if "InstanceMarketOptions" in params:
+                raise spot_capacity_error()
+            return {"Instances": [{"InstanceId": "i-0"}]}
+
+        client.run_instances.side_effect = mock_run_instances
+        assert list(aws.create_instances()) == ["i-0"]
+
+    calls = client.run_instances.call_args_list
+    assert len(calls) >= 3  # At least one retry before falling back
+    params = calls[-1].kwargs
+    assert "InstanceMarketOptions" not in params
+    assert {"Key": "Market", "Value": "on-demand"} in params["TagSpecifications"][0]["Tags"]
+
+
+def test_create_instances_spot_no_fallback(aws):
+    aws.spot = "true"
+    aws.spot_fallback = "false"
+    aws.spot_timeout = "0"
+    with patch("boto3.client") as mock_client:
+        mock_client.return_value.run_instances.side_effect = spot_capacity_error()
+        with pytest.raises(ClientError, match="InsufficientInstanceCapacity"):
+            aws.create_instances()
+    assert mock_client.return_value.run_instances.call_count == 1
+
+
+def test_create_instances_spot_fleet_fallback(aws):
+    """Unfulfilled spot fleet capacity is launched on-demand; each instance is tagged with its market"""
+    aws.spot = "true"
+    aws.spot_timeout = "0"
+    aws.gh_runner_tokens = ["t0", "t1"]
+    aws.instance_types = "g5.xlarge,g6.xlarge"
+    aws.fleet_allocation_strategy = "prioritized"
+    with patch("boto3.client") as mock_client:
+        client = mock_client.return_value
+        client.describe_launch_templates.return_value = {"LaunchTemplates": [{"LaunchTemplateId": "lt-123"}]}
+        client.create_launch_template_version.return_value = {"LaunchTemplateVersion": {"VersionNumber": 2}}
+        client.create_fleet.side_effect = [
+            {"Instances": [{"InstanceIds": ["i-spot"]}], "Errors": [{"ErrorCode": "InsufficientInstanceCapacity"}]},
+            {"Instances": [{"InstanceIds": ["i-od"]}]},
+        ]
+        result = aws.create_instances()
+
+    assert list(result) == ["i-spot", "i-od"]
+    spot, on_demand = [c.kwargs for c in client.create_fleet.call_args_list]
+    assert spot["SpotOptions"]["AllocationStrategy"] == "capacity-optimized-prioritized"
+    assert spot["TargetCapacitySpecification"] == {"TotalTargetCapacity": 2, "DefaultTargetCapacityType": "spot", "SpotTargetCapacity": 2}
+    assert on_demand["TargetCapacitySpecification"] == {"TotalTargetCapacity": 1, "DefaultTargetCapacityType": "on-demand", "OnDemandTargetCapacity": 1}
+    markets = {
+        c.kwargs["Resources"][0]: {t["Key"]: t["Value"] for t in c.kwargs["Tags"]}["Market"]
+        for c in client.create_tags.call_args_list
+    }
+    assert markets == {"i-spot": "spot", "i-od": "on-demand"}
+
+
 def test_create_instances_missing_release(aws):
     aws.runner_release = ""
     with pytest.raises(
@@ -502,6 +989,42 @@ def test_wait_until_ready_dne(aws):
         aws.wait_until_ready(ids, **params)
 
 
+def test_iter_running_yields_as_ready(aws):
+    """Instances are yielded as they start, polled in one batch per attempt with growing delays"""
+    states = iter([
+        {"i-0": "pending", "i-1": "pending"},
+        {"i-0": "pending", "i-1": "running"},
+        {"i-0": "pending"},
+        {"i-0": "running"},
+    ])
+
+    def mock_describe_instances(**kwargs):
+        assert "InstanceIds" not in kwargs
+        return {"Reservations": [{"Instances": [
+            {"InstanceId": instance_id, "State": {"Name": state}}
+            for instance_id, state in next(states).items()
+        ]}]}
+
+    with patch("boto3.client") as mock_client, patch("ec2_gha.start.time.sleep") as mock_sleep:
+        client = mock_client.return_value
+        client.describe_instances.side_effect = mock_describe_instances
+        ready = list(aws.iter_running(["i-0", "i-1"], initial_delay=1, backoff=2, max_delay=3))
+
+    assert ready == ["i-1", "i-0"]
+    assert client.describe_instances.call_count == 4
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [1, 2, 3]
+    assert set(aws.ready_latencies) == {"i-0", "i-1"}
+
+
+def test_iter_running_failed_state(aws):
+    with patch("boto3.client") as mock_client, patch("ec2_gha.start.time.sleep"):
+        mock_client.return_value.describe_instances.return_value = {"Reservations": [{"Instances": [
+            {"InstanceId": "i-0", "State": {"Name": "terminated"}},
+        ]}]}
+        with pytest.raises(WaiterError, match="terminated"):
+            list(aws.iter_running(["i-0"]))
+
+
 @pytest.mark.slow
 def test_wait_until_ready_dne_long(aws):
     # This is a fake instance id
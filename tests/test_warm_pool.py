@@ -0,0 +1,160 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from ec2_gha.warm_pool import CLAIM_TAG, CLAIMED_AT_TAG, CREATED_TAG, PENDING_TAG, POOL_TAG, WarmPool, config_hash, start_claimed
+
+
+def instance(instance_id: str, age: float, claim: str = "", claim_age: float = 0, pending: bool = False) -> dict:
+    """A stopped pool (or pending) instance, first launched ``age`` seconds ago (and claimed ``claim_age`` seconds ago)"""
+    tags = [
+        {"Key": PENDING_TAG if pending else POOL_TAG, "Value": "key"},
+        {"Key": CREATED_TAG, "Value": str(int(time.time() - age))},
+    ]
+    if claim:
+        tags.append({"Key": CLAIM_TAG, "Value": claim})
+        tags.append({"Key": CLAIMED_AT_TAG, "Value": str(int(time.time() - claim_age))})
+    return {"InstanceId": instance_id, "Tags": tags}
+
+
+@pytest.fixture(scope="function")
+def ec2():
+    """EC2 client mock whose `describe_instances` pages list (tag-filtered) ``ec2.instances``, and whose tags can change"""
+    ec2 = Mock()
+    ec2.instances = []
+
+    def matches(i: dict, filters: list[dict]) -> bool:
+        tags = {tag["Key"]: tag["Value"] for tag in i["Tags"]}
+        return all(tags.get(f["Name"][len("tag:"):]) in f["Values"] for f in filters if f["Name"].startswith("tag:"))
+
+    def paginate(**kwargs):
+        ids = kwargs.get("InstanceIds")
+        instances = [i for i in ec2.instances if (not ids or i["InstanceId"] in ids) and matches(i, kwargs["Filters"])]
+        return [{"Reservations": [{"Instances": instances}]}]
+
+    def create_tags(**kwargs):
+        for i in ec2.instances:
+            if i["InstanceId"] in kwargs["Resources"]:
+                i["Tags"] = i["Tags"] + kwargs["Tags"]
+
+    def delete_tags(**kwargs):
+        keys = {tag["Key"] for tag in kwargs["Tags"]}
+        for i in ec2.instances:
+            if i["InstanceId"] in kwargs["Resources"]:
+                i["Tags"] = [tag for tag in i["Tags"] if tag["Key"] not in keys]
+
+    ec2.get_paginator.return_value.paginate.side_effect = paginate
+    ec2.create_tags.side_effect = ec2.tag = create_tags
+    ec2.delete_tags.side_effect = delete_tags
+    return ec2
+
+
+def tags(i: dict) -> dict[str, str]:
+    return {tag["Key"]: tag["Value"] for tag in i["Tags"]}
+
+
+def test_config_hash_ignores_key_order():
+    assert config_hash({"a": 1, "b": 2}) == config_hash({"b": 2, "a": 1})
+    assert config_hash({"a": 1}) != config_hash({"a": 2})
+
+
+def test_acquire_newest_first(ec2):
+    pool = WarmPool(ec2, "key", size=4, max_age=60)
+    ec2.instances = [instance("i-old", 600), instance("i-new", 60), instance("i-expired", 7200)]
+
+    assert pool.acquire(2) == ["i-new", "i-old"]
+    kwargs = ec2.create_tags.call_args_list[0].kwargs
+    assert kwargs["Resources"] == ["i-new", "i-old"]
+    assert kwargs["Tags"][0] == {"Key": CLAIM_TAG, "Value": pool.claim_id}
+    assert kwargs["Tags"][1]["Key"] == CLAIMED_AT_TAG
+    # Claimed instances leave the pool until their runners register
+    for i in ec2.instances[:2]:
+        assert POOL_TAG not in tags(i)
+        assert tags(i)[PENDING_TAG] == "key"
+    assert POOL_TAG in tags(ec2.instances[2])
+
+
+def test_acquire_skips_lost_claims(ec2):
+    """Instances re-tagged by a concurrent run are left to that run"""
+    pool = WarmPool(ec2, "key", size=4, max_age=60)
+    ec2.instances = [instance("i-0", 60), instance("i-1", 120)]
+
+    def create_tags(**kwargs):
+        ec2.tag(**kwargs)
+        if kwargs["Tags"][0]["Key"] == CLAIM_TAG:
+            # A concurrent run's claim of i-1 lands right after this one
+            ec2.tag(Resources=["i-1"], Tags=[{"Key": CLAIM_TAG, "Value": "other-run"}])
+
+    ec2.create_tags.side_effect = create_tags
+    assert pool.acquire(2) == ["i-0"]
+    assert POOL_TAG in tags(ec2.instances[1])
+
+
+def test_acquire_empty_pool(ec2):
+    pool = WarmPool(ec2, "key", size=4, max_age=60)
+    assert pool.acquire(2) == []
+    assert pool.acquire(0) == []
+    ec2.create_tags.assert_not_called()
+
+
+def test_trim(ec2):
+    """Expired instances, and the oldest beyond ``size``, are terminated"""
+    pool = WarmPool(ec2, "key", size=2, max_age=60)
+    ec2.instances = [
+        instance("i-claimed", 10),
+        instance("i-0", 60),
+        instance("i-1", 120),
+        instance("i-2", 180),
+        instance("i-expired", 7200),
+    ]
+    assert pool.trim(exclude=["i-claimed"]) == ["i-2", "i-expired"]
+    ec2.terminate_instances.assert_called_once_with(InstanceIds=["i-2", "i-expired"])
+
+
+def test_trim_pending(ec2):
+    """Stopped pending instances (whose runners never registered, e.g. after a setup failure) are terminated"""
+    pool = WarmPool(ec2, "key", size=4, max_age=60)
+    ec2.instances = [
+        instance("i-0", 60),
+        instance("i-failed", 60, pending=True),
+        instance("i-resuming", 60, claim="other-run", claim_age=30, pending=True),
+    ]
+    assert pool.trim() == ["i-failed"]
+
+
+def test_admit(ec2):
+    """Instances whose runners registered (re)join the pool"""
+    pool = WarmPool(ec2, "key", size=4, max_age=60)
+    ec2.instances = [instance("i-0", 60, pending=True)]
+    pool.admit(["i-0"])
+    assert tags(ec2.instances[0])[POOL_TAG] == "key"
+    assert PENDING_TAG not in tags(ec2.instances[0])
+    assert pool.acquire(1) == ["i-0"]
+
+
+def test_trim_skips_fresh_claims(ec2):
+    """Instances recently claimed by any run are about to be resumed, and aren't trimmed"""
+    pool = WarmPool(ec2, "key", size=1, max_age=60)
+    ec2.instances = [
+        instance("i-0", 60),
+        instance("i-claimed", 120, claim="other-run", claim_age=30),
+        instance("i-stale-claim", 180, claim="other-run", claim_age=3600),
+    ]
+    assert pool.trim() == ["i-stale-claim"]
+
+
+def test_start_claimed(ec2):
+    """The run whose UserData the started instance has wins it"""
+    ec2.describe_instance_attribute.return_value = {"UserData": {"Value": "b3Vycw=="}}
+    assert start_claimed(ec2, "i-0", b"ours")
+    ec2.modify_instance_attribute.assert_called_once_with(InstanceId="i-0", UserData={"Value": b"ours"})
+    ec2.start_instances.assert_called_once_with(InstanceIds=["i-0"])
+    assert not start_claimed(ec2, "i-0", b"theirs")
+
+
+def test_trim_nothing(ec2):
+    pool = WarmPool(ec2, "key", size=2, max_age=60)
+    ec2.instances = [instance("i-0", 60)]
+    assert pool.trim() == []
+    ec2.terminate_instances.assert_not_called()